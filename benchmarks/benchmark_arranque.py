@@ -0,0 +1,79 @@
+"""
+Mide el tiempo desde el inicio del proceso hasta el primer frame procesado por
+DetectorPersonas, y el tiempo de carga y memoria de cada modelo del registro.
+
+Uso:
+    python -m benchmarks.benchmark_arranque [--video clip.mp4] [--precargar] [--caras]
+"""
+import time
+T_IMPORT = time.time()  # Antes de cualquier import pesado
+
+import argparse, tempfile, numpy as np, cv2
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+class _DBNula:
+    """Reemplazo de DBManager que no escribe nada (el benchmark no necesita MySQL)."""
+    def registrar_track(self, *args, **kwargs): pass
+    def guardar_imagen_cuerpo(self, *args, **kwargs): pass
+    def guardar_imagen_cara(self, *args, **kwargs): pass
+    def guardar_descripcion(self, *args, **kwargs): pass
+
+def primer_frame(ruta_video):
+    if ruta_video:
+        video = cv2.VideoCapture(ruta_video)
+        ret, frame = video.read()
+        video.release()
+        if ret:
+            return frame
+        print(f"[ADVERTENCIA] No se pudo leer {ruta_video}, se usa un frame sintético")
+    return np.random.default_rng(0).integers(0, 255, (1080, 1920, 3), dtype=np.uint8)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="Clip del que se toma el primer frame (por defecto, sintético)")
+    parser.add_argument("--modelo", default="models/yolo11-person.pt")
+    parser.add_argument("--precargar", action="store_true", help="Precargar los modelos del registro en segundo plano")
+    parser.add_argument("--caras", action="store_true", help="Activar la detección de caras")
+    args = parser.parse_args()
+
+    inicio_proceso = psutil.Process().create_time() if psutil else T_IMPORT
+
+    from utils.registro_modelos import registro
+    from detectores.detector_personas import DetectorPersonas
+    from utils.ejecutor_clases import EjecutorPorClases
+    t_imports = time.time()
+
+    if args.precargar:
+        registro.precargar()
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ejecutor = EjecutorPorClases()
+        detector = DetectorPersonas(carpeta, lambda *a: None, _DBNula(), ruta_modelo=args.modelo,
+                                    executor=ejecutor, detectar_caras=args.caras)
+        t_detector = time.time()
+
+        detector.procesar_frame(primer_frame(args.video))
+        t_frame = time.time()
+        detector.finalizar()
+        ejecutor.detener()
+
+    print(f"{'imports':>24}: {t_imports - inicio_proceso:7.2f} s")
+    print(f"{'detector construido':>24}: {t_detector - inicio_proceso:7.2f} s")
+    print(f"{'primer frame procesado':>24}: {t_frame - inicio_proceso:7.2f} s")
+    if psutil:
+        print(f"{'RSS final':>24}: {psutil.Process().memory_info().rss / 2**20:7.1f} MB")
+
+    print("\nModelos del registro:")
+    for nombre, datos in registro.estadisticas().items():
+        if datos["cargado"]:
+            memoria = f"{datos['memoria_mb']:.1f} MB" if datos["memoria_mb"] is not None else "?"
+            print(f"  {nombre}: {datos['segundos_carga']:.2f} s, {memoria}")
+        else:
+            print(f"  {nombre}: sin cargar")
+
+if __name__ == "__main__":
+    main()
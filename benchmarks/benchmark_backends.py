@@ -0,0 +1,136 @@
+"""
+Compara velocidad y precisión de los backends de modelo (PyTorch, ONNX Runtime,
+OpenVINO, FP32 e INT8) sobre frames de un clip grabado.
+
+La referencia de precisión es PyTorch: para cada variante se reportan la
+latencia por frame (p50/p95), el speedup, y cuánto coinciden sus detecciones
+con las de PyTorch (recall y precisión a IoU >= 0.5, IoU medio y diferencia de
+confianza). Las variantes que no se pueden exportar (p. ej. sin openvino/nncf
+instalados) se informan y se saltean.
+
+Uso:
+    python -m benchmarks.benchmark_backends --video clip.mp4 [--modelo models/yolo11-person.pt]
+    python -m benchmarks.benchmark_backends --video clip.mp4 --variantes onnx onnx-int8 --salida informe.json
+"""
+import argparse, json, time, numpy as np
+from benchmarks.benchmark_lotes import leer_frames
+from benchmarks.benchmark_replay import percentiles
+from detectores.backends_modelo import cargar_yolo, leer_frames_calibracion
+from detectores.detector_personas import CONFIANZA_MIN, IOU_NMS
+
+VARIANTES = ("pytorch", "onnx", "onnx-int8", "openvino", "openvino-int8")
+
+def iou_matriz(a, b):
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    interseccion = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return interseccion / np.maximum(area_a[:, None] + area_b[None, :] - interseccion, 1e-6)
+
+def emparejar(referencia, candidata, umbral=0.5):
+    """
+    Emparejamiento voraz por IoU (y misma clase) entre las detecciones de un frame.
+
+    Parámetros:
+        referencia, candidata (np.array): Filas (x1, y1, x2, y2, conf, clase).
+
+    Retorna:
+        list[tuple]: Pares (i_referencia, i_candidata, iou).
+    """
+    if not len(referencia) or not len(candidata):
+        return []
+    ious = iou_matriz(referencia[:, :4], candidata[:, :4])
+    ious[referencia[:, None, 5] != candidata[None, :, 5]] = 0.0
+    pares = []
+    while True:
+        i, j = np.unravel_index(ious.argmax(), ious.shape)
+        if ious[i, j] < umbral:
+            return pares
+        pares.append((i, j, float(ious[i, j])))
+        ious[i, :] = 0.0
+        ious[:, j] = 0.0
+
+def medir(modelo, frames):
+    modelo.predict(frames[0], conf=CONFIANZA_MIN, iou=IOU_NMS, verbose=False)  # Calentamiento
+    tiempos, detecciones = [], []
+    for frame in frames:
+        inicio = time.perf_counter()
+        resultado = modelo.predict(frame, conf=CONFIANZA_MIN, iou=IOU_NMS, verbose=False)[0]
+        tiempos.append(time.perf_counter() - inicio)
+        detecciones.append(resultado.boxes.data.cpu().numpy() if resultado.boxes is not None else np.zeros((0, 6)))
+    return tiempos, detecciones
+
+def comparar_detecciones(referencia, candidata):
+    total_ref = total_cand = coincidencias = 0
+    ious, diferencias_conf = [], []
+    for ref, cand in zip(referencia, candidata):
+        pares = emparejar(ref, cand)
+        total_ref += len(ref)
+        total_cand += len(cand)
+        coincidencias += len(pares)
+        ious.extend(iou for _, _, iou in pares)
+        diferencias_conf.extend(abs(float(ref[i, 4]) - float(cand[j, 4])) for i, j, _ in pares)
+    return {
+        "recall": coincidencias / total_ref if total_ref else 1.0,
+        "precision": coincidencias / total_cand if total_cand else 1.0,
+        "iou_medio": float(np.mean(ious)) if ious else None,
+        "dif_conf_media": float(np.mean(diferencias_conf)) if diferencias_conf else None,
+        "detecciones": total_cand,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True, help="Clip grabado de la escena real")
+    parser.add_argument("--modelo", default="models/yolo11-person.pt")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--cada-n", type=int, default=5, help="Submuestreo como en producción")
+    parser.add_argument("--tam", type=int, default=640, help="Lado de entrada del grafo exportado")
+    parser.add_argument("--variantes", nargs="+", choices=VARIANTES, default=list(VARIANTES))
+    parser.add_argument("--calibracion", help="Video o carpeta para calibrar INT8 (por defecto, el mismo clip)")
+    parser.add_argument("--salida", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    frames = leer_frames(args.video, args.frames, args.cada_n)
+    if not frames:
+        print(f"[ERROR] No se pudieron leer frames de {args.video}")
+        return
+    # Mejor calibrar con otro clip: sobre los mismos frames se sobreestima la precisión de INT8
+    calibracion = leer_frames_calibracion(args.calibracion or args.video)
+    print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]}), calibración: {len(calibracion)}")
+
+    variantes = ["pytorch"] + [v for v in args.variantes if v != "pytorch"]
+    informe, referencia = {}, None
+    for variante in variantes:
+        backend, _, cuantizacion = variante.partition("-")
+        try:
+            modelo = cargar_yolo(args.modelo, backend, int8=cuantizacion == "int8", tam=args.tam,
+                                 frames_calibracion=calibracion)
+            tiempos, detecciones = medir(modelo, frames)
+        except Exception as e:
+            print(f"[ADVERTENCIA] {variante}: no disponible ({e})")
+            continue
+
+        if referencia is None:
+            referencia = detecciones
+        informe[variante] = {"latencia_ms": percentiles(tiempos), **comparar_detecciones(referencia, detecciones)}
+
+    base = informe["pytorch"]["latencia_ms"]["p50"]
+    print(f"\n{'variante':>14} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8} {'recall':>7} {'prec.':>7} {'IoU':>6} {'Δconf':>6}")
+    for variante, datos in informe.items():
+        latencia = datos["latencia_ms"]
+        datos["speedup"] = base / latencia["p50"]
+        iou = f"{datos['iou_medio']:.3f}" if datos["iou_medio"] is not None else "-"
+        conf = f"{datos['dif_conf_media']:.3f}" if datos["dif_conf_media"] is not None else "-"
+        print(f"{variante:>14} {latencia['p50']:8.1f} {latencia['p95']:8.1f} {datos['speedup']:7.2f}x "
+              f"{datos['recall']:7.3f} {datos['precision']:7.3f} {iou:>6} {conf:>6}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "variantes": informe}, f, indent=2)
+        print(f"\nInforme guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Consultas de investigación sobre una tabla sintética de millones de personas,
+antes y después de la migración de esquema (clave por cámara/sesión/track,
+índices por fecha y FULLTEXT de descripciones).
+
+Crea su propia tabla (por defecto registro_personas_bench, que se borra y se
+vuelve a crear) en la base de dbconfig, la llena con filas sintéticas
+repartidas en `--dias` días y `--camaras` cámaras, y mide:
+
+  - rango de 2 h, cámara + rango y texto + rango ("campera roja" ayer 14-16 h),
+    primero sin índices (tabla en la versión 1, texto con LIKE) y después con
+    DBManager.buscar sobre el esquema migrado;
+  - una página profunda con OFFSET contra la paginación por clave;
+  - la misma búsqueda repetida, servida por la cache de resultados.
+
+Uso:
+    python -m benchmarks.benchmark_consultas [--filas 2000000] [--camaras 8] [--dias 30]
+    python -m benchmarks.benchmark_consultas --filas 200000 --repeticiones 5 --salida consultas.json
+"""
+import argparse, datetime, json, time, numpy as np
+from benchmarks.benchmark_replay import percentiles
+from db_manager import DBManager, terminos_fulltext
+from migraciones_db import TABLA_VERSIONES
+
+COLORES = ["roja", "azul", "negra", "blanca", "verde", "gris", "amarilla", "marrón", "celeste", "bordó"]
+PRENDAS = ["campera", "remera", "buzo", "camisa", "chaleco", "mochila", "gorra", "bufanda"]
+PANTALONES = ["jean", "jogging", "bermuda", "pollera", "pantalón de vestir"]
+
+ESTRUCTURA = {
+    "ID": "INT PRIMARY KEY",
+    "Camara": "VARCHAR(64) NOT NULL DEFAULT ''",
+    "Sesion": "BIGINT NOT NULL DEFAULT 0",
+    "Track": "INT NULL",
+    "Imagen_cuerpo": "VARCHAR(50)",
+    "Imagen_cara": "VARCHAR(50)",
+    "Descripcion": "TEXT",
+    "Fecha_registro": "DATETIME",
+}
+
+def descripcion_sintetica(rng):
+    prenda, color = rng.choice(PRENDAS), rng.choice(COLORES)
+    return (f"**Apariencia General**\n- Adulto de contextura media\n**Ropa**\n- {prenda.capitalize()} {color}\n"
+            f"- {rng.choice(PANTALONES).capitalize()} {rng.choice(COLORES)}\n**Acciones**\n- Camina hacia el surtidor")
+
+def llenar(db, filas, camaras, dias, lote, rng):
+    fin = datetime.datetime.now().replace(microsecond=0)
+    segundos = dias * 86400
+    sql = (f"INSERT INTO `{db.nombre_tabla}` (`ID`, `Camara`, `Sesion`, `Track`, `Imagen_cuerpo`, "
+           "`Descripcion`, `Fecha_registro`) VALUES (%s, %s, %s, %s, %s, %s, %s)")
+    conn = db.pool.get_connection()
+    cursor = conn.cursor()
+    inicio = time.perf_counter()
+    for base in range(0, filas, lote):
+        n = min(lote, filas - base)
+        desfasajes = rng.integers(0, segundos, n)
+        datos = [(base + i + 1, f"camara_{rng.integers(camaras)}", 1, base + i + 1, f"seg:0:{base + i}",
+                  descripcion_sintetica(rng), fin - datetime.timedelta(seconds=int(d)))
+                 for i, d in enumerate(desfasajes)]
+        cursor.executemany(sql, datos)
+        conn.commit()
+        print(f"\r  {base + n}/{filas} filas", end="", flush=True)
+    print()
+    cursor.close()
+    conn.close()
+    return time.perf_counter() - inicio
+
+def medir(funcion, repeticiones):
+    tiempos, resultado = [], None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return percentiles(tiempos), resultado
+
+def consultar(db, sql, params):
+    return db._consultar(sql, params, "Benchmark")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tabla", default="registro_personas_bench")
+    parser.add_argument("--filas", type=int, default=2_000_000)
+    parser.add_argument("--camaras", type=int, default=8)
+    parser.add_argument("--dias", type=int, default=30)
+    parser.add_argument("--lote", type=int, default=5000)
+    parser.add_argument("--texto", default="campera roja")
+    parser.add_argument("--pagina", type=int, default=50, help="Página profunda para comparar OFFSET y clave")
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--salida", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    db = DBManager(args.tabla, ESTRUCTURA, escritura_diferida=False, migrar_esquema=False)
+    db._ejecutar_sql(f"DROP TABLE IF EXISTS `{args.tabla}`", (), "Borrado de la tabla de benchmark")
+    db.migrar(hasta=1)  # Solo crea la tabla de versiones si no existe
+    db._ejecutar_sql(f"DELETE FROM `{TABLA_VERSIONES}` WHERE `Tabla` = %s", (args.tabla,), "Versión de benchmark")
+    db.crear_tabla(args.tabla, ESTRUCTURA)
+
+    print(f"Llenando {args.tabla} con {args.filas} filas...")
+    informe = {"carga_s": llenar(db, args.filas, args.camaras, args.dias, args.lote, rng)}
+
+    ayer = datetime.datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - datetime.timedelta(days=1)
+    desde, hasta = ayer.replace(hour=14), ayer.replace(hour=16)
+    camara = "camara_0"
+    palabras = args.texto.split()
+    limite = 50
+
+    # Sin índices: misma semántica que buscar(), con LIKE en lugar de FULLTEXT
+    base = f"SELECT * FROM `{args.tabla}` WHERE `Fecha_registro` >= %s AND `Fecha_registro` < %s"
+    orden = " ORDER BY `Fecha_registro` DESC, `ID` DESC LIMIT %s"
+    like = "".join(" AND `Descripcion` LIKE %s" for _ in palabras)
+    sin_indices = {
+        "rango_2h": (base + orden, (desde, hasta, limite)),
+        "camara_rango": (base + " AND `Camara` = %s" + orden, (desde, hasta, camara, limite)),
+        "texto_rango": (base + like + orden, (desde, hasta, *[f"%{p}%" for p in palabras], limite)),
+    }
+    antes = {}
+    for nombre, (sql, params) in sin_indices.items():
+        antes[nombre], _ = medir(lambda: consultar(db, sql, params), args.repeticiones)
+
+    print("Migrando el esquema...")
+    inicio = time.perf_counter()
+    version = db.migrar()
+    informe["migracion_s"] = time.perf_counter() - inicio
+    print(f"  versión {version} en {informe['migracion_s']:.1f} s")
+
+    consultas = {
+        "rango_2h": dict(desde=desde, hasta=hasta),
+        "camara_rango": dict(desde=desde, hasta=hasta, camara=camara),
+        "texto_rango": dict(desde=desde, hasta=hasta, texto=args.texto),
+    }
+    despues, resultados = {}, {}
+    for nombre, filtros in consultas.items():
+        despues[nombre], (filas, _) = medir(lambda: db.buscar(limite=limite, usar_cache=False, **filtros),
+                                            args.repeticiones)
+        resultados[nombre] = len(filas)
+
+    # Página profunda de los últimos 7 días: OFFSET contra clave
+    semana = {"desde": datetime.datetime.now() - datetime.timedelta(days=7)}
+    cursor = None
+    for _ in range(args.pagina):
+        _, cursor = db.buscar(limite=limite, cursor=cursor, usar_cache=False, **semana)
+    paginacion = {
+        "offset": medir(lambda: consultar(
+            db, f"SELECT * FROM `{args.tabla}` WHERE `Fecha_registro` >= %s "
+                "ORDER BY `Fecha_registro` DESC, `ID` DESC, `Sesion` DESC, `Camara` DESC LIMIT %s OFFSET %s",
+            (semana["desde"], limite, limite * args.pagina)), args.repeticiones)[0],
+        "clave": medir(lambda: db.buscar(limite=limite, cursor=cursor, usar_cache=False, **semana),
+                       args.repeticiones)[0],
+    }
+
+    db.buscar(limite=limite, **consultas["texto_rango"])
+    cache, _ = medir(lambda: db.buscar(limite=limite, **consultas["texto_rango"]), args.repeticiones)
+
+    print(f"\nTexto: {args.texto!r} -> {terminos_fulltext(args.texto)!r}, ventana {desde:%Y-%m-%d %H:%M}-{hasta:%H:%M}")
+    print(f"{'consulta':>14} {'filas':>6} {'sin índices p50':>16} {'con índices p50':>16} {'p95':>9} {'mejora':>8}")
+    for nombre in consultas:
+        p_antes, p_despues = antes[nombre]["p50"], despues[nombre]["p50"]
+        print(f"{nombre:>14} {resultados[nombre]:6d} {p_antes:13.1f} ms {p_despues:13.1f} ms "
+              f"{despues[nombre]['p95']:6.1f} ms {p_antes / max(p_despues, 1e-6):7.1f}x")
+    print(f"\nPágina {args.pagina}: OFFSET {paginacion['offset']['p50']:.1f} ms, "
+          f"por clave {paginacion['clave']['p50']:.1f} ms")
+    print(f"Cache: {cache['p50']:.3f} ms por consulta repetida")
+
+    informe.update({"sin_indices": antes, "con_indices": despues, "filas": resultados,
+                    "paginacion": paginacion, "cache": cache})
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), **informe}, f, indent=2)
+        print(f"\nInforme guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+CPU de decodificación del modo doble stream contra el modo actual, sobre
+archivos locales con las dos resoluciones de una cámara (p. ej. grabaciones de
+subtype=0 y subtype=1, `ffmpeg -rtsp_transport tcp -i rtsp://... -t 60 -c copy
+principal.mp4`). Sin archivos, genera un par sintético (1920x1080 y 640x360,
+MPEG-4) en una carpeta temporal.
+
+Se mide el CPU del proceso (incluye los hilos de FFmpeg) por segundo de video:
+
+  - principal: decodificar y convertir a BGR todos los frames del stream
+    principal (lo que hace la captura con subtype=0);
+  - substream: decodificar y convertir todo el substream;
+  - principal con grab: decodificar todo el principal pero convertir solo 1 de
+    cada `--cada` frames (los que van a detección), como StreamAlta;
+  - doble: substream siempre + principal con grab durante la fracción del
+    tiempo con personas a la vista (`--ocupacion`); sin personas StreamAlta
+    cierra el principal y no decodifica nada.
+
+Uso:
+    python -m benchmarks.benchmark_doble_stream [--frames 750] [--ocupacion 0 0.25 0.5 1]
+    python -m benchmarks.benchmark_doble_stream --principal principal.mp4 --substream sub.mp4 --cada 5
+"""
+import argparse, cv2, json, os, tempfile, time
+from benchmarks.simulados import FramesSinteticos
+
+def generar_par(carpeta, frames, fps):
+    """
+    Escribe el mismo video sintético a 1920x1080 y a 640x360.
+
+    Retorna:
+        tuple: (ruta_principal, ruta_substream)
+    """
+    sinteticos = FramesSinteticos(1920, 1080)
+    rutas = os.path.join(carpeta, "principal.mp4"), os.path.join(carpeta, "substream.mp4")
+    codec = cv2.VideoWriter_fourcc(*"mp4v")
+    principal = cv2.VideoWriter(rutas[0], codec, fps, (1920, 1080))
+    substream = cv2.VideoWriter(rutas[1], codec, fps, (640, 360))
+    for i in range(frames):
+        frame = sinteticos.frame(i)
+        principal.write(frame)
+        substream.write(cv2.resize(frame, (640, 360), interpolation=cv2.INTER_AREA))
+    principal.release()
+    substream.release()
+    return rutas
+
+def medir_decodificacion(ruta, frames, cada=1):
+    """
+    Decodifica `frames` frames de `ruta` (volviendo al inicio si el archivo es
+    más corto), convirtiendo a BGR solo 1 de cada `cada`.
+
+    Retorna:
+        dict: Segundos de CPU y de reloj, frames y resolución.
+    """
+    video = cv2.VideoCapture(ruta, cv2.CAP_FFMPEG)
+    if not video.isOpened():
+        raise FileNotFoundError(f"No se pudo abrir {ruta}")
+    resolucion = (int(video.get(cv2.CAP_PROP_FRAME_WIDTH)), int(video.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+
+    cpu, reloj = time.process_time(), time.perf_counter()
+    leidos = 0
+    while leidos < frames:
+        ok = video.grab()
+        if not ok:
+            video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            if not video.grab():
+                break
+        if leidos % cada == 0:
+            video.retrieve()
+        leidos += 1
+    resultado = {"cpu_s": time.process_time() - cpu, "reloj_s": time.perf_counter() - reloj,
+                 "frames": leidos, "resolucion": resolucion}
+    video.release()
+    return resultado
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--principal", help="Video del stream principal")
+    parser.add_argument("--substream", help="Video del substream (misma escena)")
+    parser.add_argument("--frames", type=int, default=750, help="Frames a decodificar por medición")
+    parser.add_argument("--fps", type=float, default=25.0, help="FPS del stream (para CPU por segundo de video)")
+    parser.add_argument("--cada", type=int, default=5, help="Uno de cada N frames va a detección")
+    parser.add_argument("--ocupacion", type=float, nargs="+", default=[0.0, 0.25, 0.5, 1.0],
+                        help="Fracción del tiempo con personas a la vista")
+    parser.add_argument("--salida", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    carpeta = None
+    if not (args.principal and args.substream):
+        carpeta = tempfile.mkdtemp(prefix="doble_stream_")
+        print(f"Generando videos sintéticos en {carpeta}...")
+        args.principal, args.substream = generar_par(carpeta, min(args.frames, 250), args.fps)
+
+    mediciones = {
+        "principal": medir_decodificacion(args.principal, args.frames),
+        "substream": medir_decodificacion(args.substream, args.frames),
+        "principal_grab": medir_decodificacion(args.principal, args.frames, args.cada),
+    }
+    segundos_video = args.frames / args.fps
+    cpu = {nombre: m["cpu_s"] / segundos_video for nombre, m in mediciones.items()}
+
+    print(f"\n{'modo':>16} {'resolución':>11} {'CPU por s de video':>19} {'fps de decodificación':>22}")
+    for nombre, m in mediciones.items():
+        print(f"{nombre:>16} {m['resolucion'][0]:>5}x{m['resolucion'][1]:<5} {1000 * cpu[nombre]:16.0f} ms "
+              f"{m['frames'] / m['reloj_s']:22.0f}")
+
+    # El modo doble es una combinación lineal: substream siempre y principal con grab mientras hay personas
+    print(f"\n{'ocupación':>10} {'CPU doble':>12} {'CPU actual':>12} {'ahorro':>8}")
+    doble = {}
+    for ocupacion in args.ocupacion:
+        doble[ocupacion] = cpu["substream"] + ocupacion * cpu["principal_grab"]
+        print(f"{ocupacion:10.0%} {1000 * doble[ocupacion]:9.0f} ms {1000 * cpu['principal']:9.0f} ms "
+              f"{1 - doble[ocupacion] / cpu['principal']:8.0%}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "mediciones": mediciones, "cpu_por_segundo": cpu,
+                       "doble": {str(k): v for k, v in doble.items()}}, f, indent=2)
+        print(f"\nInforme guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compara FPS de detección frame a frame contra detección por lotes sobre un
+clip grabado.
+
+Uso:
+    python -m benchmarks.benchmark_lotes --video clip.mp4 --lote 8 --frames 200
+"""
+import argparse, time, cv2
+from ultralytics import YOLO
+from detectores.detector_personas import CONFIANZA_MIN, IOU_NMS
+from detectores.inferencia_lotes import InferenciaPorLotes
+
+def leer_frames(ruta_video, cantidad, cada_n_frames=1):
+    video = cv2.VideoCapture(ruta_video)
+    frames = []
+    indice = 0
+    while len(frames) < cantidad:
+        ret, frame = video.read()
+        if not ret:
+            break
+        if indice % cada_n_frames == 0:
+            frames.append(frame)
+        indice += 1
+    video.release()
+    return frames
+
+def medir_individual(modelo, frames):
+    inicio = time.perf_counter()
+    for frame in frames:
+        modelo.predict(frame, conf=CONFIANZA_MIN, iou=IOU_NMS, verbose=False)
+    return len(frames) / (time.perf_counter() - inicio)
+
+def medir_lotes(modelo, frames, tam_lote):
+    lotes = InferenciaPorLotes(modelo, tam_lote_max=tam_lote)
+    inicio = time.perf_counter()
+    for i in range(0, len(frames), tam_lote):
+        lotes.inferir(frames[i:i + tam_lote])
+    return len(frames) / (time.perf_counter() - inicio)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True, help="Clip grabado a reproducir")
+    parser.add_argument("--modelo", default="models/yolo11-person.pt")
+    parser.add_argument("--lote", type=int, nargs="+", default=[4, 8], help="Tamaños de lote a probar")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--cada-n", type=int, default=5, help="Submuestreo como en producción")
+    args = parser.parse_args()
+
+    frames = leer_frames(args.video, args.frames, args.cada_n)
+    if not frames:
+        print(f"[ERROR] No se pudieron leer frames de {args.video}")
+        return
+
+    modelo = YOLO(args.modelo)
+    modelo.predict(frames[0], verbose=False)  # Calentamiento
+
+    print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+    fps_base = medir_individual(modelo, frames)
+    print(f"{'individual':>12}: {fps_base:7.2f} FPS")
+    for tam in args.lote:
+        fps = medir_lotes(modelo, frames, tam)
+        print(f"{'lote ' + str(tam):>12}: {fps:7.2f} FPS  (x{fps / fps_base:.2f})")
+
+if __name__ == "__main__":
+    main()
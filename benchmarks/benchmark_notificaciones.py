@@ -0,0 +1,99 @@
+"""
+Ejercita el despachador de notificaciones contra un webhook local (servidor HTTP
+de prueba con latencia y tasa de error configurables) y reporta cuánto bloquea
+`notificar`, cuántos mensajes se agruparon, reintentos y fallidos.
+
+Uso:
+    python -m benchmarks.benchmark_notificaciones [--alertas 200] [--rafaga 10] [--tasa-error 0.2]
+"""
+import argparse, json, os, random, tempfile, time, numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Lock
+
+from notificaciones.canales import CanalWebhook
+from notificaciones.despachador import DespachadorNotificaciones
+
+def servidor_prueba(latencia, tasa_error, semilla=0, fallas_iniciales=0):
+    """
+    Webhook local. Responde 503 a las primeras `fallas_iniciales` solicitudes y
+    después a una proporción `tasa_error`.
+
+    Retorna:
+        tuple: (servidor, recibidos). `recibidos` son los mensajes aceptados;
+               `servidor.solicitudes` guarda (instante monotonic, ruta, mensaje,
+               código) de cada POST, aceptado o no.
+    """
+    azar = random.Random(semilla)
+    recibidos = []
+    solicitudes = []
+    lock = Lock()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            cuerpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(latencia)
+            with lock:
+                falla = len(solicitudes) < fallas_iniciales or azar.random() < tasa_error
+                if not falla:
+                    recibidos.append(cuerpo["mensaje"])
+                solicitudes.append((time.monotonic(), self.path, cuerpo["mensaje"], 503 if falla else 200))
+            self.send_response(503 if falla else 200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.solicitudes = solicitudes
+    Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, recibidos
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alertas", type=int, default=200)
+    parser.add_argument("--rafaga", type=int, default=10, help="Alertas por ráfaga")
+    parser.add_argument("--pausa", type=float, default=0.5, help="Segundos entre ráfagas")
+    parser.add_argument("--latencia", type=float, default=0.05, help="Latencia del webhook (s)")
+    parser.add_argument("--tasa-error", type=float, default=0.2, help="Proporción de respuestas 503")
+    parser.add_argument("--ventana", type=float, default=2.0)
+    parser.add_argument("--max-por-minuto", type=float, default=60)
+    args = parser.parse_args()
+
+    servidor, recibidos = servidor_prueba(args.latencia, args.tasa_error)
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/alertas"
+
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_fallidos = os.path.join(carpeta, "fallidos.jsonl")
+        despachador = DespachadorNotificaciones(
+            [CanalWebhook(url)], ventana=args.ventana, max_por_minuto=args.max_por_minuto,
+            espera_base=0.1, espera_max=2.0, ruta_fallidos=ruta_fallidos)
+
+        bloqueos = []
+        inicio = time.perf_counter()
+        for i in range(args.alertas):
+            t = time.perf_counter()
+            despachador.notificar(f"Persona {i} entró al área.")
+            bloqueos.append(time.perf_counter() - t)
+            if (i + 1) % args.rafaga == 0:
+                time.sleep(args.pausa)
+        despachador.detener(timeout=30)
+        total = time.perf_counter() - inicio
+
+        fallidos = 0
+        if os.path.exists(ruta_fallidos):
+            with open(ruta_fallidos, encoding="utf-8") as f:
+                fallidos = sum(1 for _ in f)
+    servidor.shutdown()
+
+    bloqueos = np.array(bloqueos) * 1e6
+    print(f"{'alertas generadas':>24}: {args.alertas}")
+    print(f"{'POST exitosos':>24}: {len(recibidos)}")
+    print(f"{'notificar p50 / p99':>24}: {np.percentile(bloqueos, 50):.1f} / {np.percentile(bloqueos, 99):.1f} us")
+    print(f"{'duración total':>24}: {total:.2f} s")
+    print(f"{'en dead-letter':>24}: {fallidos}")
+    for clave, valor in despachador.estadisticas().items():
+        print(f"{clave:>24}: {valor}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Tiempo de recuperación de la captura ante cortes del stream, con la política
+anterior (reintento fijo cada 5 s) y con la espera exponencial con jitter de
+CapturaStream.
+
+Usa una FuenteInterrumpible (stream simulado en tiempo real, sintético o
+repitiendo `--video`) y el mismo camino de decodificación que el supervisor
+(Camara.leer sobre su PoolFrames). Cada corte de `--cortes` segundos se repite
+`--repeticiones` veces con el stream estable en medio, y se mide:
+
+  - recuperación: desde que el stream vuelve hasta el primer frame entregado;
+  - caída: segundos sin frames vistos por la captura (lo que llega al detector
+    como `discontinuidad`);
+  - frames perdidos del stream en vivo durante la caída;
+  - si el pool de frames sobrevivió a las reconexiones (pipeline caliente).
+
+Uso:
+    python -m benchmarks.benchmark_reconexion [--cortes 0.2 1 3 10] [--repeticiones 3]
+    python -m benchmarks.benchmark_reconexion --video prueba.mp4 --latencia-apertura 0.5 --salida reconexion.json
+"""
+import argparse, json, time
+from benchmarks.benchmark_replay import percentiles
+from benchmarks.simulados import FuenteInterrumpible
+from supervisor_camaras import Camara
+from utils.captura import CapturaStream
+
+def medir_politica(nombre, parametros, args):
+    fuente = FuenteInterrumpible(args.fps, ruta_video=args.video, latencia_apertura=args.latencia_apertura,
+                                 timeout_lectura=args.timeout_lectura)
+    camara = Camara(nombre, "simulado", detector=None)
+    vueltas = []  # (instante del primer frame tras el corte, segundos de caída)
+
+    def entregar(slot):
+        if slot is not None:
+            camara.pool.publicar(slot, camara.contador_frames, detectar=False)
+        camara.contador_frames += 1
+
+    captura = CapturaStream(nombre, "simulado", camara.leer, entregar, abrir=fuente.abrir,
+                            al_reconectar=lambda segundos: vueltas.append((time.monotonic(), segundos)),
+                            **parametros)
+    captura.iniciar()
+    while not captura.conectada:
+        time.sleep(0.01)
+    pool = camara.pool
+
+    resultados = {}
+    for duracion in args.cortes:
+        recuperaciones, caidas, perdidos = [], [], []
+        for _ in range(args.repeticiones):
+            time.sleep(args.estable)
+            anteriores = len(vueltas)
+            corte = time.monotonic()
+            fuente.cortar(duracion)
+            limite = corte + duracion + parametros["espera_max"] * 2 + 10
+            while len(vueltas) == anteriores and time.monotonic() < limite:
+                time.sleep(0.005)
+            if len(vueltas) == anteriores:
+                print(f"  [{nombre}] sin reconexión tras un corte de {duracion} s")
+                continue
+            vuelta, caida = vueltas[-1]
+            recuperaciones.append(vuelta - (corte + duracion))
+            caidas.append(caida)
+            perdidos.append(int((vuelta - corte) * args.fps))
+        resultados[duracion] = {"recuperacion_ms": percentiles(recuperaciones), "caida_ms": percentiles(caidas),
+                                "frames_perdidos": sorted(perdidos)}
+        print(f"  [{nombre}] corte {duracion:g} s: recuperación p50 "
+              f"{resultados[duracion]['recuperacion_ms'].get('p50', float('nan')):.0f} ms")
+
+    captura.detener(timeout=5)
+    return {"cortes": resultados, "captura": captura.estadisticas(), "aperturas": fuente.aperturas,
+            "pool_reutilizado": camara.pool is pool}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cortes", type=float, nargs="+", default=[0.2, 1.0, 3.0, 10.0],
+                        help="Duración de cada corte, en segundos")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--estable", type=float, default=1.0, help="Segundos de stream estable entre cortes")
+    parser.add_argument("--fps", type=float, default=25.0)
+    parser.add_argument("--video", help="Video a repetir como stream (por defecto, frames sintéticos)")
+    parser.add_argument("--latencia-apertura", type=float, default=0.3,
+                        help="Segundos que tarda cada apertura del stream (negociación RTSP y análisis)")
+    parser.add_argument("--timeout-lectura", type=float, default=0.0,
+                        help="Segundos que bloquea una lectura al caer el stream")
+    parser.add_argument("--espera-min", type=float, default=0.05)
+    parser.add_argument("--espera-max", type=float, default=10.0)
+    parser.add_argument("--salida", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    politicas = {
+        "anterior": dict(espera_inicial=5.0, espera_max=5.0, jitter=0.0),
+        "exponencial": dict(espera_inicial=args.espera_min, espera_max=args.espera_max, jitter=0.5),
+    }
+    informe = {}
+    for nombre, parametros in politicas.items():
+        print(f"Política {nombre}: {parametros}")
+        informe[nombre] = medir_politica(nombre, parametros, args)
+
+    print(f"\n{'política':>12} {'corte':>7} {'recup. p50':>11} {'p95':>9} {'caída p50':>10} {'frames perdidos':>16}")
+    for nombre, datos in informe.items():
+        for duracion, r in datos["cortes"].items():
+            recuperacion, caida, perdidos = r["recuperacion_ms"], r["caida_ms"], r["frames_perdidos"]
+            if not perdidos:
+                print(f"{nombre:>12} {duracion:6g}s {'sin reconexión':>11}")
+                continue
+            print(f"{nombre:>12} {duracion:6g}s {recuperacion['p50']:8.0f} ms {recuperacion['p95']:6.0f} ms "
+                  f"{caida['p50'] / 1000:9.2f}s {perdidos[len(perdidos) // 2]:16d}")
+    for nombre, datos in informe.items():
+        print(f"{nombre}: {datos['captura']['reconexiones']} reconexiones, {datos['aperturas']} aperturas, "
+              f"pool de frames {'reutilizado' if datos['pool_reutilizado'] else 'reconstruido'}")
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), **{n: {**d, "cortes": {str(k): v for k, v in d["cortes"].items()}}
+                                                for n, d in informe.items()}}, f, indent=2)
+        print(f"\nInforme guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Compara los modos de detección 'completo', 'roi' y 'mosaico' sobre un mismo
+clip grabado: FPS, píxeles por inferencia, personas detectadas dentro de las
+zonas y cuántas de ellas son chicas (personas lejanas).
+
+Uso:
+    python -m benchmarks.benchmark_regiones --video clip.mp4 [--zonas zonas.json] [--frames 100]
+"""
+import argparse, time
+from ultralytics import YOLO
+from benchmarks.benchmark_lotes import leer_frames
+from detectores.detector_personas import CONFIANZA_MIN, IOU_NMS
+from detectores.regiones import DetectorRegiones, MODOS
+from utils.zonas import MotorZonas, cargar_zonas
+
+def medir(modelo, frames, regiones, motor_zonas, alto_chico):
+    detectadas = chicas = 0
+    inicio = time.perf_counter()
+    for frame in frames:
+        resultados = modelo.predict(regiones.preparar(frame), conf=CONFIANZA_MIN, iou=IOU_NMS, verbose=False)
+        cajas = regiones.combinar(frame, resultados).boxes.xyxy.cpu().numpy()
+        if len(cajas):
+            dentro = motor_zonas.contener(motor_zonas.anclas(cajas)).any(axis=1)
+            detectadas += int(dentro.sum())
+            chicas += int((dentro & ((cajas[:, 3] - cajas[:, 1]) < alto_chico)).sum())
+    segundos = time.perf_counter() - inicio
+    return {
+        "fps": len(frames) / segundos,
+        "mpx_por_frame": regiones.pixeles_inferidos / len(frames) / 1e6,
+        "recortes_por_frame": len(regiones.ventanas(frames[0].shape)),
+        "en_zonas": detectadas,
+        "chicas": chicas,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", required=True, help="Clip grabado a reproducir")
+    parser.add_argument("--modelo", default="models/yolo11-person.pt")
+    parser.add_argument("--zonas", help="JSON de zonas (por defecto, el área histórica)")
+    parser.add_argument("--camara", help="ID de cámara dentro del JSON de zonas")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--cada-n", type=int, default=5)
+    parser.add_argument("--margen", type=int, default=64)
+    parser.add_argument("--tam-mosaico", type=int, default=640)
+    parser.add_argument("--alto-chico", type=int, default=96, help="Alto (px) por debajo del cual una persona cuenta como chica")
+    args = parser.parse_args()
+
+    frames = leer_frames(args.video, args.frames, args.cada_n)
+    if not frames:
+        print(f"[ERROR] No se pudieron leer frames de {args.video}")
+        return
+
+    zonas = cargar_zonas(args.zonas, args.camara)
+    motor_zonas = MotorZonas(zonas)
+    modelo = YOLO(args.modelo)
+    modelo.predict(frames[0], verbose=False)  # Calentamiento
+
+    print(f"Frames: {len(frames)} ({frames[0].shape[1]}x{frames[0].shape[0]}), zonas: {[z.nombre for z in zonas]}")
+    print(f"{'modo':>10} {'FPS':>8} {'Mpx/frame':>10} {'recortes':>9} {'en zonas':>9} {'chicas':>7}")
+    for modo in MODOS:
+        regiones = DetectorRegiones(modo, [z.poligono for z in zonas], margen=args.margen, tam_mosaico=args.tam_mosaico)
+        r = medir(modelo, frames, regiones, motor_zonas, args.alto_chico)
+        print(f"{modo:>10} {r['fps']:8.2f} {r['mpx_por_frame']:10.2f} {r['recortes_por_frame']:9d} "
+              f"{r['en_zonas']:9d} {r['chicas']:7d}")
+
+if __name__ == "__main__":
+    main()
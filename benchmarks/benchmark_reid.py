@@ -0,0 +1,105 @@
+"""
+Latencia de consulta de los índices de re-identificación con 10k y 1M
+embeddings guardados (por defecto), sobre embeddings sintéticos: identidades
+al azar y varias vistas ruidosas de cada una.
+
+Para cada tamaño se mide el índice por fuerza bruta y el cuantizado (IVF) con
+distintas cantidades de sondeos: latencia por consulta (p50/p95), recall@1
+del cuantizado respecto del bruto (mismo vecino más cercano) y memoria. Las
+consultas se hacen con la ventana de tiempo activa (la mitad más reciente).
+
+Uso:
+    python -m benchmarks.benchmark_reid [--tamanos 10000 1000000] [--dim 128]
+    python -m benchmarks.benchmark_reid --tamanos 100000 --sondeos 4 16 64 --salida reid.json
+"""
+import argparse, json, time, numpy as np
+from benchmarks.benchmark_replay import percentiles
+from utils.indice_vectores import IndiceBruto, IndiceCuantizado, normalizar
+
+def embeddings_sinteticos(cantidad, dim, vistas, ruido, rng):
+    """
+    Retorna:
+        tuple: (ids, vectores, centros) con `vistas` vectores ruidosos por identidad.
+    """
+    identidades = max(1, cantidad // vistas)
+    centros = normalizar(rng.standard_normal((identidades, dim), dtype=np.float32))
+    ids = rng.integers(0, identidades, cantidad)
+    vectores = centros[ids] + ruido * rng.standard_normal((cantidad, dim), dtype=np.float32) / np.sqrt(dim)
+    return ids, normalizar(vectores), centros
+
+def medir_consultas(indice, consultas, desde):
+    indice.buscar(consultas[0], k=10, desde=desde)  # Calentamiento
+    tiempos, mejores = [], []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        resultado = indice.buscar(consulta, k=10, desde=desde)
+        tiempos.append(time.perf_counter() - inicio)
+        mejores.append(resultado[0][0] if resultado else -1)
+    return tiempos, mejores
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=128, help="128 = embedding de histograma")
+    parser.add_argument("--vistas", type=int, default=5, help="Embeddings por identidad")
+    parser.add_argument("--ruido", type=float, default=0.5)
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--listas", type=int, help="Centroides del IVF (por defecto 4*sqrt(n))")
+    parser.add_argument("--sondeos", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--salida", help="Guardar el informe en JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    informe = {}
+    for tamano in args.tamanos:
+        ids, vectores, centros = embeddings_sinteticos(tamano, args.dim, args.vistas, args.ruido, rng)
+        instantes = np.arange(tamano, dtype=np.float64)
+        desde = tamano / 2.0
+        # Consultas: vistas nuevas de identidades vistas dentro de la ventana
+        elegidos = ids[rng.integers(tamano // 2, tamano, args.consultas)]
+        consultas = normalizar(centros[elegidos] + args.ruido * rng.standard_normal(
+            (args.consultas, args.dim), dtype=np.float32) / np.sqrt(args.dim))
+        print(f"\n{tamano} embeddings de dimensión {args.dim}, {len(centros)} identidades")
+
+        inicio = time.perf_counter()
+        bruto = IndiceBruto(capacidad=tamano)
+        bruto.agregar_lote(ids, vectores, instantes)
+        construccion = time.perf_counter() - inicio
+        tiempos, referencia = medir_consultas(bruto, consultas, desde)
+        resultados = {"bruto": {"construccion_s": construccion, "latencia_ms": percentiles(tiempos),
+                                "acierto_identidad": float(np.mean(np.asarray(referencia) == elegidos)),
+                                **bruto.estadisticas()}}
+        del bruto
+
+        listas = args.listas or int(4 * np.sqrt(tamano))
+        inicio = time.perf_counter()
+        cuantizado = IndiceCuantizado(listas=listas)
+        cuantizado.agregar_lote(ids, vectores, instantes)
+        construccion = time.perf_counter() - inicio
+        for sondeos in args.sondeos:
+            cuantizado.sondeos = sondeos
+            tiempos, mejores = medir_consultas(cuantizado, consultas, desde)
+            resultados[f"ivf{listas}-s{sondeos}"] = {
+                "construccion_s": construccion,
+                "latencia_ms": percentiles(tiempos),
+                "recall_1": float(np.mean(np.asarray(mejores) == np.asarray(referencia))),
+                "acierto_identidad": float(np.mean(np.asarray(mejores) == elegidos)),
+                **cuantizado.estadisticas(),
+            }
+        del cuantizado
+
+        print(f"{'índice':>16} {'constr. s':>9} {'p50 ms':>8} {'p95 ms':>8} {'recall@1':>8} {'identidad':>9} {'MB':>7}")
+        for nombre, datos in resultados.items():
+            latencia = datos["latencia_ms"]
+            recall = f"{datos['recall_1']:.3f}" if "recall_1" in datos else "-"
+            print(f"{nombre:>16} {datos['construccion_s']:9.2f} {latencia['p50']:8.3f} {latencia['p95']:8.3f} "
+                  f"{recall:>8} {datos['acierto_identidad']:9.3f} {datos['memoria_mb']:7.0f}")
+        informe[tamano] = resultados
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "tamanos": informe}, f, indent=2)
+        print(f"\nInforme guardado en {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Reproduce un video grabado (o frames sintéticos) a través del pipeline real
+DetectorPersonas -> alertas -> guardado de imágenes -> base de datos, con los
+modelos, el servidor de rostros, el VLM y MySQL reemplazados por simulados
+deterministas de latencia configurable (ver benchmarks/simulados.py).
+
+Reporta FPS, latencia por frame (p50/p95/p99), tiempo por etapa y RSS pico, y
+guarda todo en JSON. Con --comparar se contrasta contra un JSON anterior y el
+proceso termina con código 1 si hay una regresión mayor a --tolerancia.
+
+Uso:
+    python -m benchmarks.benchmark_replay [--video clip.mp4] [--frames 300] [--salida resultado.json]
+    python -m benchmarks.benchmark_replay --comparar base.json --tolerancia 0.1
+"""
+import argparse, json, os, sys, time, resource, subprocess, tempfile, numpy as np, cv2
+
+from benchmarks.simulados import FramesSinteticos, ModeloSimulado, ModeloCarasSimulado, DBSimulada, servidor_rostros
+from descripciones.backends import BackendFalso
+from descripciones.planificador import PlanificadorDescripciones
+from detectores import detector_personas as dp
+from detectores.detector_caras import DetectorCaras
+from utils import imagenes_utils as iu
+from utils.ejecutor_clases import EjecutorPorClases
+from utils.gestor_alertas import GestorAlertas
+from utils.registro_modelos import registro
+
+ESTRUCTURA = ["ID", "Imagen_cuerpo", "Imagen_cara", "Descripcion", "Fecha_registro"]
+
+# Etapas que corren dentro de procesar_frame; "otros" es el resto del tiempo del frame
+ETAPAS_DETECCION = ("inferencia", "tracker", "puntaje", "zonas", "alertas", "caras")
+
+def percentiles(valores):
+    if not valores:
+        return {"n": 0}
+    ms = np.asarray(valores) * 1000
+    return {
+        "n": len(ms),
+        "media": float(ms.mean()),
+        "p50": float(np.percentile(ms, 50)),
+        "p95": float(np.percentile(ms, 95)),
+        "p99": float(np.percentile(ms, 99)),
+        "max": float(ms.max()),
+    }
+
+def cronometrar(funcion, tiempos):
+    """
+    Envuelve `funcion` para que agregue su duración a la lista `tiempos`.
+    """
+    def envoltura(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            tiempos.append(time.perf_counter() - inicio)
+    return envoltura
+
+def rss_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / 1024 / 1024 if sys.platform == "darwin" else pico / 1024
+
+def version_codigo():
+    try:
+        return subprocess.check_output(["git", "describe", "--always", "--dirty"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+def fuente_frames(args):
+    """
+    Generador de frames: del video (en bucle si es corto) o sintéticos.
+    """
+    if not args.video:
+        sinteticos = FramesSinteticos(args.ancho, args.alto, args.personas, args.semilla)
+        for indice in range(args.frames):
+            yield sinteticos.frame(indice)
+        return
+
+    video = cv2.VideoCapture(args.video)
+    leidos = 0
+    while leidos < args.frames:
+        ret, frame = video.read()
+        if not ret:
+            if leidos == 0:
+                print(f"[ERROR] No se pudieron leer frames de {args.video}")
+                return
+            video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        leidos += 1
+        yield frame
+    video.release()
+
+def ejecutar(args):
+    etapas = {nombre: [] for nombre in ("lectura",) + ETAPAS_DETECCION + ("otros", "total")}
+    segundo_plano = {"guardado_imagenes": []}
+    latencias = []
+
+    servidor = None
+    url_rostros = None
+    if args.modo_caras == "remoto":
+        servidor, url_rostros = servidor_rostros(args.latencia_rostros)
+
+    # Los simulados se registran antes que los detectores: el registro conserva el primero
+    modelo = ModeloSimulado(args.latencia_modelo)
+    modelo.predict = cronometrar(modelo.predict, etapas["inferencia"])
+    registro.registrar("yolo_caras:models/yolov11m-face.pt", lambda: ModeloCarasSimulado(args.latencia_caras),
+                       thread_safe=False)
+
+    # Instrumentación de funciones de módulo que el detector busca en tiempo de ejecución
+    iu.guardar_imagen = cronometrar(iu.guardar_imagen, segundo_plano["guardado_imagenes"])
+    dp.puntuar_cajas = cronometrar(dp.puntuar_cajas, etapas["puntaje"])
+
+    eventos = []
+    with tempfile.TemporaryDirectory() as carpeta:
+        db = DBSimulada(ESTRUCTURA, latencia=args.latencia_db)
+        ejecutor = EjecutorPorClases()
+        gestor = GestorAlertas(ejecutor=ejecutor)
+        gestor.suscribir(eventos.append)
+        planificador = PlanificadorDescripciones(BackendFalso(latencia=args.latencia_vlm), db,
+                                                 max_por_segundo=args.descripciones_por_segundo, ejecutor=ejecutor)
+        caras = DetectorCaras(carpeta, ejecutor, db, modo="remoto" if args.modo_caras == "remoto" else "local",
+                              url_rostros=url_rostros or "")
+        detector = dp.DetectorPersonas(
+            carpeta, cronometrar(gestor.actualizar, etapas["alertas"]), db, executor=ejecutor, modelo=modelo,
+            detector_caras=caras, planificador_descripciones=planificador,
+            detectar_caras=args.modo_caras != "ninguno", modo_region=args.modo_region)
+        detector.tracker.update = cronometrar(detector.tracker.update, etapas["tracker"])
+        detector.zonas.actualizar = cronometrar(detector.zonas.actualizar, etapas["zonas"])
+        caras.detectar_caras_en_lote = cronometrar(caras.detectar_caras_en_lote, etapas["caras"])
+
+        periodo = 1.0 / args.fps if args.fps else 0.0
+        frames = fuente_frames(args)
+        inicio = time.perf_counter()
+        procesados = 0
+        while True:
+            # Con --fps el frame "llega" en su instante programado; la latencia se mide desde ahí
+            llegada = inicio + procesados * periodo if periodo else time.perf_counter()
+            espera = llegada - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+            t = time.perf_counter()
+            frame = next(frames, None)
+            etapas["lectura"].append(time.perf_counter() - t)
+            if frame is None:
+                break
+
+            antes = {nombre: len(etapas[nombre]) for nombre in ETAPAS_DETECCION}
+            t = time.perf_counter()
+            detector.procesar_frame(frame)
+            fin = time.perf_counter()
+            etapas["total"].append(fin - t)
+            medido = sum(sum(etapas[nombre][antes[nombre]:]) for nombre in ETAPAS_DETECCION)
+            etapas["otros"].append(max(0.0, fin - t - medido))
+            latencias.append(fin - min(llegada, t))
+            procesados += 1
+        duracion = time.perf_counter() - inicio
+
+        # Drenaje: lo que queda en segundo plano al terminar el video
+        t = time.perf_counter()
+        detector.finalizar()
+        gestor.detener()
+        ejecutor.detener()
+        planificador.detener()
+        db.close()
+        drenaje = time.perf_counter() - t
+        filas = db.filas()
+
+    if servidor:
+        servidor.shutdown()
+
+    medidas = {nombre: percentiles(valores) for nombre, valores in etapas.items()}
+
+    return {
+        "version": version_codigo(),
+        "fecha": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "config": vars(args),
+        "frames": procesados,
+        "segundos": duracion,
+        "fps": procesados / duracion if duracion else 0.0,
+        "latencia_ms": percentiles(latencias),
+        "etapas_ms": medidas,
+        "segundo_plano": {
+            "guardado_imagenes_ms": percentiles(segundo_plano["guardado_imagenes"]),
+            "db": db.estadisticas(),
+            "descripciones": planificador.estadisticas(),
+            "carriles": ejecutor.estadisticas(),
+            "drenaje_s": drenaje,
+        },
+        "conteos": {
+            "llamadas_modelo": modelo.llamadas,
+            "eventos_alerta": len(eventos),
+            "filas_db": filas,
+        },
+        "rss_pico_mb": rss_pico_mb(),
+    }
+
+def imprimir(resultado):
+    latencia = resultado["latencia_ms"]
+    print(f"Frames: {resultado['frames']} en {resultado['segundos']:.2f} s -> {resultado['fps']:.2f} FPS")
+    print(f"Latencia por frame: p50 {latencia['p50']:.1f} ms, p95 {latencia['p95']:.1f} ms, p99 {latencia['p99']:.1f} ms")
+    print(f"RSS pico: {resultado['rss_pico_mb']:.1f} MB")
+    print(f"\n{'etapa':>12} {'n':>6} {'media':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for nombre, m in resultado["etapas_ms"].items():
+        if m["n"]:
+            print(f"{nombre:>12} {m['n']:6d} {m['media']:8.2f} {m['p50']:8.2f} {m['p95']:8.2f} {m['p99']:8.2f}")
+    fondo = resultado["segundo_plano"]
+    print(f"\nGuardado de imágenes: {fondo['guardado_imagenes_ms'].get('n', 0)} archivos, "
+          f"p95 {fondo['guardado_imagenes_ms'].get('p95', 0):.1f} ms")
+    print(f"DB: {fondo['db']['filas_escritas']} filas en {fondo['db']['lotes']} lotes")
+    print(f"Descripciones: {fondo['descripciones']['enviadas']} enviadas")
+    for nombre, carril in fondo.get("carriles", {}).items():
+        print(f"Carril {nombre}: {carril['ejecutadas']} ejecutadas, {carril['descartadas']} descartadas, "
+              f"{carril['coalescidas']} coalescidas")
+    print(f"Drenaje al cerrar: {fondo['drenaje_s']:.2f} s")
+    print(f"Conteos: {resultado['conteos']}")
+
+def comparar(resultado, base, tolerancia):
+    """
+    Retorna:
+        bool: True si hay alguna regresión mayor a `tolerancia` (fracción).
+    """
+    regresion = False
+    print(f"\nComparación contra {base.get('version')} ({base.get('fecha')}):")
+    metricas = [("fps", resultado["fps"], base["fps"], True)]
+    for p in ("p50", "p95", "p99"):
+        metricas.append((f"latencia {p}", resultado["latencia_ms"][p], base["latencia_ms"][p], False))
+    metricas.append(("rss_pico_mb", resultado["rss_pico_mb"], base["rss_pico_mb"], False))
+
+    for nombre, actual, anterior, mayor_es_mejor in metricas:
+        cambio = (actual - anterior) / anterior if anterior else 0.0
+        empeora = -cambio if mayor_es_mejor else cambio
+        marca = "REGRESIÓN" if empeora > tolerancia else ""
+        regresion |= empeora > tolerancia
+        print(f"{nombre:>14}: {anterior:10.2f} -> {actual:10.2f} ({cambio:+.1%}) {marca}")
+    return regresion
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--video", help="Clip a reproducir (por defecto, frames sintéticos)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=0, help="Ritmo de llegada de frames (0 = lo más rápido posible)")
+    parser.add_argument("--ancho", type=int, default=1920)
+    parser.add_argument("--alto", type=int, default=1080)
+    parser.add_argument("--personas", type=int, default=6, help="Personas en los frames sintéticos")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--modo-region", default="completo", choices=["completo", "roi", "mosaico"])
+    parser.add_argument("--modo-caras", default="local", choices=["local", "remoto", "ninguno"])
+    parser.add_argument("--latencia-modelo", type=float, default=0.03, help="Segundos por inferencia de personas")
+    parser.add_argument("--latencia-caras", type=float, default=0.01, help="Segundos por inferencia de caras")
+    parser.add_argument("--latencia-rostros", type=float, default=0.05, help="Segundos del servidor de rostros")
+    parser.add_argument("--latencia-vlm", type=float, default=0.5, help="Segundos por descripción")
+    parser.add_argument("--latencia-db", type=float, default=0.005, help="Segundos por lote escrito")
+    parser.add_argument("--descripciones-por-segundo", type=float, default=1.0)
+    parser.add_argument("--salida", help="Archivo JSON donde guardar el resultado")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior contra el cual comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.1, help="Regresión tolerada (fracción)")
+    args = parser.parse_args()
+
+    resultado = ejecutar(args)
+    imprimir(resultado)
+
+    if args.salida:
+        carpeta = os.path.dirname(args.salida)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False, default=str)
+        print(f"\nResultado guardado en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        if comparar(resultado, base, args.tolerancia):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Microbenchmark del motor de zonas: 50 zonas poligonales x 100 cajas por frame.
+Compara un bucle Python (una prueba por caja y zona, como el chequeo original),
+la tabla de aristas vectorizada y el mapa de bits precalculado.
+
+Uso:
+    python -m benchmarks.benchmark_zonas [--zonas 50] [--cajas 100] [--repeticiones 200]
+"""
+import argparse, time, numpy as np, cv2
+from utils.zonas import MotorZonas, Zona
+
+def zonas_aleatorias(cantidad, ancho, alto, rng):
+    zonas = []
+    for i in range(cantidad):
+        cx, cy = rng.uniform(0, ancho), rng.uniform(0, alto)
+        radio = rng.uniform(40, 250)
+        angulos = np.sort(rng.uniform(0, 2 * np.pi, rng.integers(4, 10)))
+        poligono = np.stack([cx + radio * np.cos(angulos), cy + radio * np.sin(angulos)], axis=1)
+        zonas.append(Zona(f"zona_{i}", poligono))
+    return zonas
+
+def cajas_aleatorias(cantidad, ancho, alto, rng):
+    x1 = rng.uniform(0, ancho - 100, cantidad)
+    y1 = rng.uniform(0, alto - 200, cantidad)
+    return np.stack([x1, y1, x1 + rng.uniform(40, 100, cantidad), y1 + rng.uniform(100, 200, cantidad)], axis=1)
+
+def medir(funcion, repeticiones):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        funcion()
+    return 1e6 * (time.perf_counter() - inicio) / repeticiones
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zonas", type=int, default=50)
+    parser.add_argument("--cajas", type=int, default=100)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    args = parser.parse_args()
+
+    ancho, alto = 1920, 1080
+    rng = np.random.default_rng(0)
+    zonas = zonas_aleatorias(args.zonas, ancho, alto, rng)
+    cajas = cajas_aleatorias(args.cajas, ancho, alto, rng)
+
+    motor_aristas = MotorZonas(zonas)
+    motor_mascara = MotorZonas(zonas, forma_frame=(alto, ancho))
+    puntos = motor_aristas.anclas(cajas)
+    contornos = [zona.poligono.reshape(-1, 1, 2) for zona in zonas]
+
+    def bucle_python():
+        return [[cv2.pointPolygonTest(c, (float(x), float(y)), False) >= 0 for c in contornos] for x, y in puntos]
+
+    print(f"{args.zonas} zonas x {args.cajas} cajas")
+    print(f"{'bucle Python':>20}: {medir(bucle_python, args.repeticiones):9.1f} us/frame")
+    print(f"{'aristas vectorizado':>20}: {medir(lambda: motor_aristas.contener(puntos), args.repeticiones):9.1f} us/frame")
+    print(f"{'mapa de bits':>20}: {medir(lambda: motor_mascara.contener(puntos), args.repeticiones):9.1f} us/frame")
+    ids = list(range(args.cajas))
+    print(f"{'actualizar (eventos)':>20}: "
+          f"{medir(lambda: motor_aristas.actualizar(ids, cajas, time.time()), args.repeticiones):9.1f} us/frame")
+
+if __name__ == "__main__":
+    main()
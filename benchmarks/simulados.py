@@ -0,0 +1,341 @@
+"""
+Reemplazos deterministas de los componentes externos (modelos YOLO, servidor de
+rostros, MySQL, stream de la cámara) para medir el pipeline sin pesos, GPU, base
+de datos ni cámaras. Cada uno tiene una latencia configurable.
+"""
+import cv2, json, time, sqlite3, numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Lock, Timer
+from escritor_db import EscritorDiferido
+
+def _esperar_hasta(inicio, latencia):
+    restante = latencia - (time.perf_counter() - inicio)
+    if restante > 0:
+        time.sleep(restante)
+
+class FramesSinteticos:
+    def __init__(self, ancho=1920, alto=1080, personas=6, semilla=0):
+        """
+        Genera frames con `personas` rectángulos claros que cruzan la escena sobre
+        un fondo oscuro. Siempre la misma secuencia para la misma semilla.
+        """
+        self.ancho = ancho
+        self.alto = alto
+        azar = np.random.default_rng(semilla)
+        self.fondo = azar.integers(20, 60, (alto, ancho, 3), dtype=np.uint8)
+        self.posiciones = azar.uniform([0, 0], [ancho, alto], (personas, 2))
+        self.velocidades = azar.uniform(-12, 12, (personas, 2))
+        self.tamanos = azar.uniform([40, 100], [140, 380], (personas, 2))
+
+    def frame(self, indice):
+        imagen = self.fondo.copy()
+        posiciones = (self.posiciones + indice * self.velocidades) % [self.ancho, self.alto]
+        for (x, y), (w, h) in zip(posiciones, self.tamanos):
+            x1, y1 = int(x), int(y)
+            cv2.rectangle(imagen, (x1, y1), (x1 + int(w), y1 + int(h)), (230, 230, 230), -1)
+            # Una "cara" más oscura en la parte superior, para el modelo de caras simulado
+            cv2.rectangle(imagen, (x1 + int(w) // 4, y1 + 4), (x1 + 3 * int(w) // 4, y1 + int(h) // 6), (150, 150, 150), -1)
+        return imagen
+
+class FuenteInterrumpible:
+    def __init__(self, fps=25.0, ancho=640, alto=360, ruta_video=None, latencia_apertura=0.3,
+                 timeout_lectura=0.0, semilla=0):
+        """
+        Stream de cámara en vivo que se puede cortar a voluntad, para probar la
+        captura sin RTSP. `abrir(url)` tiene la firma de `abrir_ffmpeg` y devuelve
+        un VideoCapture simulado (isOpened, read, grab, release).
+
+        El stream corre en tiempo real a `fps`: los frames emitidos mientras no
+        hay nadie conectado se pierden, como en una cámara. Durante un corte
+        abrir falla y las lecturas en curso fallan después de `timeout_lectura`
+        segundos (0 = la conexión se cae al instante).
+
+        Parámetros:
+            fps (float): Frames por segundo del stream.
+            ancho, alto (int): Resolución de los frames sintéticos.
+            ruta_video (str | None): Video a repetir en lugar de frames sintéticos.
+            latencia_apertura (float): Segundos que tarda cada apertura (negociación y
+                                       análisis inicial del stream).
+            timeout_lectura (float): Segundos que bloquea una lectura al caer el stream.
+        """
+        self.fps = fps
+        self.ruta_video = ruta_video
+        self.latencia_apertura = latencia_apertura
+        self.timeout_lectura = timeout_lectura
+        self.sinteticos = None if ruta_video else FramesSinteticos(ancho, alto, semilla=semilla)
+        self.inicio = time.monotonic()
+        self.aperturas = 0
+        self.cortes = 0
+        self._caida_hasta = 0.0
+        self._generacion = 0  # Cambia en cada corte: invalida las conexiones abiertas
+        self._lock = Lock()
+
+    def cortar(self, segundos):
+        """
+        Corta el stream durante `segundos`: se cierran las conexiones abiertas y
+        las nuevas fallan hasta que termine el corte.
+        """
+        with self._lock:
+            self._caida_hasta = max(self._caida_hasta, time.monotonic() + segundos)
+            self._generacion += 1
+            self.cortes += 1
+
+    def programar(self, cortes):
+        """
+        Programa cortes [(segundos desde ahora, duración), ...] en hilos aparte.
+        """
+        for demora, duracion in cortes:
+            temporizador = Timer(demora, self.cortar, args=(duracion,))
+            temporizador.daemon = True
+            temporizador.start()
+
+    def caida(self):
+        return time.monotonic() < self._caida_hasta
+
+    def abrir(self, url=None):
+        time.sleep(self.latencia_apertura)
+        with self._lock:
+            self.aperturas += 1
+            abierta = not self.caida()
+            return _CapturaSimulada(self, self._generacion if abierta else None)
+
+    def _conexion_viva(self, generacion):
+        return generacion == self._generacion and not self.caida()
+
+class _CapturaSimulada:
+    """VideoCapture de una FuenteInterrumpible."""
+    def __init__(self, fuente, generacion):
+        self.fuente = fuente
+        self.generacion = generacion
+        self.ultimo = None  # Número del último frame entregado
+        self.grabado = None  # Número del último frame de grab(), para retrieve()
+        self.video = None
+        if generacion is not None and fuente.ruta_video:
+            self.video = cv2.VideoCapture(fuente.ruta_video)
+            if not self.video.isOpened():
+                raise FileNotFoundError(f"No se pudo abrir {fuente.ruta_video}")
+
+    def isOpened(self):
+        return self.generacion is not None
+
+    def _siguiente(self):
+        """
+        Espera al próximo frame del stream en vivo y retorna su número, o None si
+        la conexión se cayó.
+        """
+        fuente = self.fuente
+        if not self.isOpened():
+            return None
+        while True:
+            if not fuente._conexion_viva(self.generacion):
+                if fuente.timeout_lectura:
+                    time.sleep(fuente.timeout_lectura)
+                self.generacion = None
+                return None
+            numero = int((time.monotonic() - fuente.inicio) * fuente.fps)
+            if self.ultimo is None or numero > self.ultimo:
+                self.ultimo = numero
+                return numero
+            # Sondeo corto: un corte durante la espera se detecta enseguida
+            time.sleep(max(0.0, min(0.005, (numero + 1) / fuente.fps - (time.monotonic() - fuente.inicio))))
+
+    def _frame(self, numero):
+        if self.video is None:
+            return self.fuente.sinteticos.frame(numero)
+        ret, frame = self.video.read()
+        if not ret:
+            self.video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.video.read()
+        return frame
+
+    def grab(self):
+        self.grabado = self._siguiente()
+        if self.grabado is not None and self.video is not None:
+            self.video.grab()
+        return self.grabado is not None
+
+    def retrieve(self, image=None):
+        if self.grabado is None:
+            return False, None
+        if self.video is None:
+            return True, self.fuente.sinteticos.frame(self.grabado)
+        return self.video.retrieve(image)
+
+    def read(self, image=None):
+        numero = self._siguiente()
+        if numero is None:
+            return False, None
+        frame = self._frame(numero)
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)  # Como cv2: decodifica en el buffer dado si coincide la forma
+            return True, image
+        return True, frame
+
+    def release(self):
+        self.generacion = None
+        if self.video is not None:
+            self.video.release()
+            self.video = None
+
+def _componentes(imagen, umbral, area_min, escala):
+    gris = imagen.max(axis=2) if imagen.ndim == 3 else imagen
+    chico = gris[::escala, ::escala]
+    _, mascara = cv2.threshold(np.ascontiguousarray(chico), umbral, 255, cv2.THRESH_BINARY)
+    cantidad, _, stats, _ = cv2.connectedComponentsWithStats(mascara)
+    cajas = []
+    for x, y, w, h, area in stats[1:cantidad]:
+        if area * escala * escala >= area_min:
+            cajas.append([x * escala, y * escala, (x + w) * escala, (y + h) * escala])
+    return cajas
+
+class ModeloSimulado:
+    def __init__(self, latencia=0.03, latencia_extra_lote=0.3, umbral=200, area_min=400,
+                 nombres=None, clase=0, escala=4):
+        """
+        Sustituto de YOLO con la misma interfaz `predict`. "Detecta" las regiones
+        claras de la imagen (las personas de FramesSinteticos) y tarda `latencia`
+        segundos por llamada, más `latencia_extra_lote` × latencia por cada imagen
+        adicional del lote.
+
+        Devuelve objetos Results de ultralytics, así que el tracker y el resto del
+        pipeline corren sin cambios.
+        """
+        self.latencia = latencia
+        self.latencia_extra_lote = latencia_extra_lote
+        self.umbral = umbral
+        self.area_min = area_min
+        self.names = nombres or {0: "person"}
+        self.clase = clase
+        self.escala = escala
+        self.llamadas = 0
+        self.imagenes = 0
+        self._lock = Lock()
+
+    def _cajas(self, imagen):
+        return [caja + [0.9, self.clase] for caja in _componentes(imagen, self.umbral, self.area_min, self.escala)]
+
+    def predict(self, fuente, conf=0.25, iou=0.7, verbose=False, **kwargs):
+        import torch
+        from ultralytics.engine.results import Results
+
+        inicio = time.perf_counter()
+        imagenes = fuente if isinstance(fuente, (list, tuple)) else [fuente]
+        resultados = []
+        for imagen in imagenes:
+            datos = np.array(self._cajas(imagen), dtype=np.float32).reshape(-1, 6)
+            resultados.append(Results(imagen, path="", names=self.names, boxes=torch.as_tensor(datos)))
+
+        with self._lock:
+            self.llamadas += 1
+            self.imagenes += len(imagenes)
+        _esperar_hasta(inicio, self.latencia * (1 + self.latencia_extra_lote * (len(imagenes) - 1)))
+        return resultados
+
+class ModeloCarasSimulado(ModeloSimulado):
+    def __init__(self, latencia=0.01, **kwargs):
+        """
+        Sustituto del YOLO de caras: toma las regiones grises (la "cara" que dibuja
+        FramesSinteticos) dentro de cada recorte de persona.
+        """
+        super().__init__(latencia=latencia, umbral=120, area_min=64, escala=2, nombres={0: "face"}, **kwargs)
+
+    def _cajas(self, imagen):
+        gris = imagen.max(axis=2) if imagen.ndim == 3 else imagen
+        cara = np.where((gris > 120) & (gris < 200), 255, 0).astype(np.uint8)
+        return [caja + [0.8, 0] for caja in _componentes(cara, 127, self.area_min, self.escala)]
+
+def servidor_rostros(latencia=0.05, puerto=0):
+    """
+    Servidor HTTP local que imita /detectar_rostro: devuelve siempre la cuarta
+    parte superior central del recorte como cara, después de `latencia` segundos.
+
+    Retorna:
+        tuple: (servidor, url)
+    """
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            inicio = time.perf_counter()
+            cuerpo = self.rfile.read(int(self.headers["Content-Length"]))
+            inicio_jpeg = cuerpo.find(b"\xff\xd8")
+            imagen = cv2.imdecode(np.frombuffer(cuerpo[inicio_jpeg:], np.uint8), cv2.IMREAD_COLOR) if inicio_jpeg >= 0 else None
+            alto, ancho = imagen.shape[:2] if imagen is not None else (0, 0)
+            datos = json.dumps({"box": [ancho // 4, 0, 3 * ancho // 4, alto // 4], "orientacion": "frente"}).encode()
+            _esperar_hasta(inicio, latencia)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), Manejador)
+    servidor.daemon_threads = True
+    Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}/detectar_rostro"
+
+class _ConexionLenta:
+    """Envuelve una conexión sqlite3 agregando `latencia` segundos a cada escritura."""
+    def __init__(self, conexion, latencia):
+        self._conexion = conexion
+        self._latencia = latencia
+
+    def cursor(self):
+        return self
+
+    def executemany(self, sql, filas):
+        time.sleep(self._latencia)
+        self._conexion.executemany(sql, filas)
+
+    def commit(self):
+        self._conexion.commit()
+
+    def close(self):
+        pass
+
+class DBSimulada:
+    def __init__(self, estructura, nombre_tabla="registro_personas", latencia=0.005, max_filas=200, intervalo_ms=500,
+                 sesion=1):
+        """
+        Misma interfaz que DBManager, con el mismo EscritorDiferido por delante,
+        pero escribiendo en SQLite en memoria con `latencia` segundos por lote
+        (en lugar de MySQL). La clave es la del esquema migrado: (Camara, Sesion, ID).
+        """
+        self.nombre_tabla = nombre_tabla
+        self.sesion = sesion
+        self._conexion = sqlite3.connect(":memory:", check_same_thread=False)
+        columnas = [c for c in estructura if c != "ID"]
+        definicion = ", ".join(f'"{c}" {"INTEGER" if c in ("ID", "Sesion") else "TEXT"}'
+                               for c in ["Camara", "Sesion", "ID", "Track"] + columnas)
+        self._conexion.execute(f'CREATE TABLE "{nombre_tabla}" ({definicion}, PRIMARY KEY ("Camara", "Sesion", "ID"))')
+        self.escritor = EscritorDiferido(nombre_tabla, lambda: _ConexionLenta(self._conexion, latencia),
+                                         max_filas, intervalo_ms, clave=("Camara", "Sesion", "ID"), dialecto="sqlite")
+
+    def _encolar(self, track_id, id_camara, valores):
+        self.escritor.encolar((str(id_camara) if id_camara is not None else "", self.sesion, track_id), valores)
+
+    def registrar_track(self, track_id, id_camara, track=None, instante=None):
+        self._encolar(track_id, id_camara, {"Track": track if track is not None else track_id,
+                                            "Fecha_registro": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(instante))})
+
+    def guardar_imagen_cuerpo(self, track_id, ruta_cuerpo, id_camara=None):
+        self._encolar(track_id, id_camara, {"Imagen_cuerpo": ruta_cuerpo})
+
+    def guardar_imagen_cara(self, track_id, ruta_cara, id_camara=None):
+        self._encolar(track_id, id_camara, {"Imagen_cara": ruta_cara})
+
+    def guardar_descripcion(self, track_id, nueva_desc, id_camara=None):
+        self._encolar(track_id, id_camara, {"descripcion": nueva_desc.strip()})
+
+    def flush(self, timeout=None):
+        return self.escritor.flush(timeout)
+
+    def close(self):
+        return self.escritor.close()
+
+    def estadisticas(self):
+        return self.escritor.estadisticas()
+
+    def filas(self):
+        return self._conexion.execute(f'SELECT COUNT(*) FROM "{self.nombre_tabla}"').fetchone()[0]
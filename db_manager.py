@@ -1,40 +1,127 @@
-import mysql.connector, dbconfig, time
+import mysql.connector, dbconfig, re, time
+from collections import OrderedDict
+from threading import Lock
+from escritor_db import EscritorDiferido
+from migraciones_db import migrar
+from utils.metricas import metricas
+
+_SQL = metricas.histograma("db_sql_segundos", "Latencia de cada sentencia SQL directa")
+_CONSULTA = metricas.histograma("db_consulta_segundos", "Latencia de las consultas de lectura")
+_CACHE = metricas.contador("db_cache_consultas_total", "Consultas de lectura por resultado de la cache", ["resultado"])
+
+class _CacheConsultas:
+    # LRU chica con vencimiento: las búsquedas repetidas (paginar ida y vuelta,
+    # refrescar un panel) no vuelven a la base durante `ttl` segundos
+    def __init__(self, max_entradas=128, ttl=30.0):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._entradas = OrderedDict()  # clave -> (instante, resultado)
+        self._lock = Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None or time.time() - entrada[0] > self.ttl:
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, resultado):
+        with self._lock:
+            self._entradas[clave] = (time.time(), resultado)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+def terminos_fulltext(texto):
+    """
+    Convierte un texto libre ("campera roja") en una búsqueda FULLTEXT en modo
+    booleano que exige todas las palabras. Las de menos de 3 letras no están en
+    el índice y se descartan.
+    """
+    return " ".join(f"+{palabra}" for palabra in re.findall(r"\w{3,}", texto.lower()))
 
 class DBManager:
-    def __init__(self, nombre_tabla, estructura_tabla):
+    def __init__(self, nombre_tabla, estructura_tabla, escritura_diferida=True, max_filas=200, intervalo_ms=500,
+                 sesion=None, migrar_esquema=True, cache_consultas=128, ttl_cache=30.0):
         """
-        Inicializa la clase y crea la tabla si no existe.
+        Inicializa la clase, crea la tabla si no existe y la migra a la última
+        versión del esquema (ver migraciones_db).
+
+        Cada proceso escribe con su propia `sesion`: la clave de la tabla es
+        (Camara, Sesion, ID), así ni un reinicio (que vuelve a numerar los tracks
+        desde 1) ni otra cámara con el mismo ID de track pisan filas ajenas.
 
         Parámetros:
             nombre_tabla (str): Nombre de la tabla.
             estructura_tabla (dict): Diccionario con formato {columna: tipo_sql}
-                                     El usuario debe incluir 'ID' y 'Fecha_registro'.
+                                     El usuario debe incluir 'ID', 'Descripcion' y 'Fecha_registro'.
+            escritura_diferida (bool): Si es True, los upserts se acumulan y se escriben
+                                       en lote (`executemany`) desde un hilo propio.
+            max_filas (int): IDs acumulados que disparan una escritura en lote.
+            intervalo_ms (int): Espera máxima antes de escribir un lote incompleto.
+            sesion (int | None): Identificador de la sesión (por defecto, el instante de inicio).
+            migrar_esquema (bool): Aplicar las migraciones pendientes al iniciar.
+            cache_consultas (int): Resultados de `buscar` que se guardan en memoria (0 = sin cache).
+            ttl_cache (float): Segundos que vale un resultado guardado.
         """
         self.nombre_tabla = nombre_tabla
         self.estructura_tabla = estructura_tabla
+        self.sesion = sesion if sesion is not None else int(time.time())
+        self.pool = dbconfig.crear_pool()
         self.crear_tabla(nombre_tabla, estructura_tabla)
-    
-    def guardar_imagen_cuerpo(self, track_id, ruta_cuerpo):
+        self.version_esquema = self.migrar() if migrar_esquema else None
+        self._cache = _CacheConsultas(cache_consultas, ttl_cache) if cache_consultas else None
+
+        self.escritor = None
+        if escritura_diferida:
+            self.escritor = EscritorDiferido(nombre_tabla, self.pool.get_connection, max_filas, intervalo_ms,
+                                             clave=("Camara", "Sesion", "ID"))
+
+    def migrar(self, hasta=None):
         """
-        Guarda la ruta de la imagen del cuerpo asociada a un ID.
+        Aplica las migraciones de esquema pendientes.
+
+        Retorna:
+            int | None: Versión del esquema, o None si la migración falló.
+        """
+        conn = None
+        try:
+            conn = self.pool.get_connection()
+            return migrar(conn, self.nombre_tabla, hasta)
+        except mysql.connector.Error as err:
+            print(f"[ERROR BD] Migración de '{self.nombre_tabla}': {err}")
+            return None
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def registrar_track(self, track_id, id_camara, track=None, instante=None):
         """
-        sql = """
-        INSERT INTO registro_personas (ID, Imagen_cuerpo)
-        VALUES (%s, %s)
-        ON DUPLICATE KEY UPDATE Imagen_cuerpo = VALUES(Imagen_cuerpo);
+        Crea la fila de una persona al abrirse su track: cámara, ID del tracker y
+        fecha de la primera aparición (para buscar por cámara y rango horario).
+
+        Parámetros:
+            track_id (int): ID de la persona (el del tracker o el global de re-identificación).
+            id_camara: Cámara donde apareció.
+            track (int | None): ID del tracker, si difiere de `track_id`.
+            instante (float | None): Momento de la primera aparición.
         """
-        self._ejecutar_sql(sql, (track_id, ruta_cuerpo), f"Imagen cuerpo ID {track_id}")
+        fecha = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(instante))
+        valores = {"Track": track if track is not None else track_id, "Fecha_registro": fecha}
+        self._upsert(track_id, id_camara, valores, f"Track ID {track_id}")
 
-    def guardar_imagen_cara(self, track_id, ruta_cara):
+    def guardar_imagen_cuerpo(self, track_id, ruta_cuerpo, id_camara=None):
         """
-        Guarda la ruta de la imagen de la cara asociada a un ID.
+        Guarda la ruta de la imagen del cuerpo asociada a un ID de la cámara `id_camara`.
+        """
+        self._upsert(track_id, id_camara, {"Imagen_cuerpo": ruta_cuerpo}, f"Imagen cuerpo ID {track_id}")
+
+    def guardar_imagen_cara(self, track_id, ruta_cara, id_camara=None):
         """
-        sql = """
-        INSERT INTO registro_personas (ID, Imagen_cara)
-        VALUES (%s, %s)
-        ON DUPLICATE KEY UPDATE Imagen_cara = VALUES(Imagen_cara);
+        Guarda la ruta de la imagen de la cara asociada a un ID de la cámara `id_camara`.
         """
-        self._ejecutar_sql(sql, (track_id, ruta_cara), f"Imagen cara ID {track_id}")
+        self._upsert(track_id, id_camara, {"Imagen_cara": ruta_cara}, f"Imagen cara ID {track_id}")
 
 
     def crear_tabla(self, nombre_tabla, columnas_dict):
@@ -60,30 +147,148 @@ class DBManager:
         # Ejecutar la sentencia SQL
         self._ejecutar_sql(sql, (), f"Creación de tabla '{nombre_tabla}'")
 
-    def guardar_descripcion(self, track_id, nueva_desc):
+    def guardar_descripcion(self, track_id, nueva_desc, id_camara=None):
         """
         Guarda la descripción completa en la columna 'descripcion' de la base de datos.
         Si el registro con el mismo ID ya existe, se actualiza.
-        
-        Requiere que la tabla tenga las columnas: 'ID', 'descripcion', 'Fecha_registro'.
+
+        No toca 'Fecha_registro': es la primera aparición (la escribe
+        `registrar_track`) y `buscar` filtra y pagina por ella.
         
         Parámetros:
             track_id (int): Identificador único de la persona u objeto.
             nueva_desc (str): Texto completo de la descripción.
+            id_camara: Cámara del track (None para la fila sin cámara).
         """
-        fecha = time.strftime('%Y-%m-%d %H:%M:%S')
-        nueva_desc = nueva_desc.strip()
+        self._upsert(track_id, id_camara, {"descripcion": nueva_desc.strip()}, f"Descripción ID {track_id}")
 
-        sql = f"""
-        INSERT INTO {self.nombre_tabla} (ID, descripcion, Fecha_registro)
-        VALUES (%s, %s, %s)
-        ON DUPLICATE KEY UPDATE
-            descripcion = VALUES(descripcion),
-            Fecha_registro = VALUES(Fecha_registro);
+    def buscar(self, desde=None, hasta=None, camara=None, texto=None, limite=50, cursor=None, usar_cache=True):
         """
-        valores = (track_id, nueva_desc, fecha)
+        Personas registradas, de la más reciente a la más vieja, filtradas por
+        rango de Fecha_registro, cámara y texto de la descripción (índice
+        FULLTEXT). Ej.: buscar(ayer_14h, ayer_16h, texto="campera roja").
 
-        self._ejecutar_sql(sql, valores, f"Descripción ID {track_id}")
+        La paginación es por clave, no por OFFSET: `cursor` es el valor que
+        devolvió la página anterior y cada página cuesta lo mismo sin importar
+        cuán lejos esté.
+
+        Parámetros:
+            desde, hasta (datetime | str | None): Rango [desde, hasta) de Fecha_registro.
+            camara (str | None): Solo esta cámara.
+            texto (str | None): Palabras que deben aparecer todas en la descripción.
+            limite (int): Filas por página.
+            cursor (tuple | None): Posición de la página anterior.
+            usar_cache (bool): Reutilizar el resultado si la misma consulta se hizo hace poco.
+
+        Retorna:
+            tuple: (filas, cursor_siguiente). `filas` es una lista de dicts por columna;
+                   `cursor_siguiente` es None en la última página.
+        """
+        clave = (desde, hasta, camara, texto, limite, cursor)
+        if self._cache and usar_cache:
+            resultado = self._cache.obtener(clave)
+            _CACHE.con(resultado="acierto" if resultado is not None else "fallo").incrementar()
+            if resultado is not None:
+                return resultado
+
+        condiciones, params = ["`Fecha_registro` IS NOT NULL"], []
+        if desde is not None:
+            condiciones.append("`Fecha_registro` >= %s")
+            params.append(desde)
+        if hasta is not None:
+            condiciones.append("`Fecha_registro` < %s")
+            params.append(hasta)
+        if camara is not None:
+            condiciones.append("`Camara` = %s")
+            params.append(str(camara))
+        terminos = terminos_fulltext(texto) if texto else ""
+        if terminos:
+            condiciones.append("MATCH(`Descripcion`) AGAINST (%s IN BOOLEAN MODE)")
+            params.append(terminos)
+        if cursor is not None:
+            # Filas estrictamente después de la última de la página anterior, en el mismo orden
+            fecha, id_persona, sesion, id_camara = cursor
+            condiciones.append("(`Fecha_registro` < %s OR (`Fecha_registro` = %s AND "
+                               "(`ID` < %s OR (`ID` = %s AND (`Sesion` < %s OR (`Sesion` = %s AND `Camara` < %s))))))")
+            params.extend([fecha, fecha, id_persona, id_persona, sesion, sesion, id_camara])
+
+        sql = (f"SELECT * FROM `{self.nombre_tabla}` WHERE {' AND '.join(condiciones)} "
+               f"ORDER BY `Fecha_registro` DESC, `ID` DESC, `Sesion` DESC, `Camara` DESC LIMIT %s")
+        filas = self._consultar(sql, (*params, limite + 1), "Búsqueda de personas")
+
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            ultima = filas[-1]
+            siguiente = (ultima["Fecha_registro"], ultima["ID"], ultima["Sesion"], ultima["Camara"])
+        resultado = (filas, siguiente)
+        if self._cache and usar_cache:
+            self._cache.guardar(clave, resultado)
+        return resultado
+
+    def obtener_persona(self, track_id, sesion=None, camara=None):
+        """
+        Filas de una persona: todas sus sesiones y cámaras (de la sesión más nueva
+        a la más vieja) o solo las de la sesión y/o cámara indicadas.
+
+        Retorna:
+            list[dict]
+        """
+        condiciones, params = ["`ID` = %s"], [track_id]
+        if sesion is not None:
+            condiciones.append("`Sesion` = %s")
+            params.append(sesion)
+        if camara is not None:
+            condiciones.append("`Camara` = %s")
+            params.append(str(camara))
+        return self._consultar(f"SELECT * FROM `{self.nombre_tabla}` WHERE {' AND '.join(condiciones)} "
+                               "ORDER BY `Sesion` DESC, `Camara`", tuple(params), f"Lectura ID {track_id}")
+
+    def flush(self, timeout=None):
+        """
+        Espera a que se escriban todos los upserts pendientes.
+        """
+        if self.escritor:
+            return self.escritor.flush(timeout)
+        return True
+
+    def close(self):
+        """
+        Escribe lo pendiente y detiene el hilo escritor. Usar al cerrar la aplicación.
+
+        Retorna:
+            int: Filas que no se llegaron a escribir.
+        """
+        if self.escritor:
+            return self.escritor.close()
+        return 0
+
+    def estadisticas(self):
+        """
+        Retorna:
+            dict: Profundidad de la cola, tamaño de lote y latencia de escritura.
+        """
+        return self.escritor.estadisticas() if self.escritor else {}
+
+    def _upsert(self, track_id, id_camara, valores, log_mensaje):
+        """
+        Inserta o actualiza columnas de la fila (cámara, sesión, `track_id`), en
+        diferido si está habilitado.
+        """
+        camara = str(id_camara) if id_camara is not None else ""
+        if self.escritor:
+            self.escritor.encolar((camara, self.sesion, track_id), valores)
+            return
+
+        columnas = ", ".join(["Camara", "Sesion", "ID"] + list(valores))
+        marcas = ", ".join(["%s"] * (len(valores) + 3))
+        actualizaciones = ", ".join(f"{c} = VALUES({c})" for c in valores)
+        sql = f"""
+        INSERT INTO {self.nombre_tabla} ({columnas})
+        VALUES ({marcas})
+        ON DUPLICATE KEY UPDATE {actualizaciones};
+        """
+        self._ejecutar_sql(sql, (camara, self.sesion, track_id, *valores.values()), log_mensaje)
 
 
     def _ejecutar_sql(self, sql, params, log_mensaje):
@@ -95,16 +300,40 @@ class DBManager:
             params (tuple): Parámetros para la consulta SQL.
             log_mensaje (str): Mensaje descriptivo para registrar en logs o consola.
         """
+        conn = None
+        inicio = time.perf_counter()
         try:
-            conn = dbconfig.conectar()
+            conn = self.pool.get_connection()
             cursor = conn.cursor()
             cursor.execute(sql, params)
             conn.commit()
+            cursor.close()
+            _SQL.observar(time.perf_counter() - inicio)
             #print(f"[BD] Guardado correcto: {log_mensaje}")
         except mysql.connector.Error as err:
             print(f"[ERROR BD] {log_mensaje}: {err}")
         finally:
-            # Cierre seguro de la conexión
-            if conn.is_connected():
-                cursor.close()
+            # Devuelve la conexión al pool
+            if conn is not None:
+                conn.close()
+
+    def _consultar(self, sql, params, log_mensaje):
+        """
+        Ejecuta una consulta de lectura y retorna sus filas como dicts (lista vacía si falla).
+        """
+        conn = None
+        inicio = time.perf_counter()
+        try:
+            conn = self.pool.get_connection()
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(sql, params)
+            filas = cursor.fetchall()
+            cursor.close()
+            _CONSULTA.observar(time.perf_counter() - inicio)
+            return filas
+        except mysql.connector.Error as err:
+            print(f"[ERROR BD] {log_mensaje}: {err}")
+            return []
+        finally:
+            if conn is not None:
                 conn.close()
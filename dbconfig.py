@@ -1,8 +1,9 @@
 import mysql.connector
+from mysql.connector import pooling
 import os
 
-def conectar():
-    return mysql.connector.connect(
+def _parametros():
+    return dict(
         host=os.getenv("DB_HOST", "localhost"),  # Variable de entorno DB_HOST, valor por defecto "localhost"
         port=int(os.getenv("DB_PORT", 3306)),    # Puerto por defecto 3306
         user="root",
@@ -10,6 +11,17 @@ def conectar():
         database=os.getenv("MYSQL_DATABASE", "seguridad")
     )
 
+def conectar():
+    return mysql.connector.connect(**_parametros())
+
+def crear_pool(tam=None, nombre="pool_seguridad"):
+    """
+    Crea un pool de conexiones reutilizables. `conn.close()` sobre una conexión
+    del pool la devuelve al pool en lugar de cerrarla.
+    """
+    tam = tam or int(os.getenv("DB_POOL_SIZE", 4))
+    return pooling.MySQLConnectionPool(pool_name=nombre, pool_size=tam, pool_reset_session=False, **_parametros())
+
 if __name__ == "__main__":
     conn = conectar()
     cursor = conn.cursor()
@@ -0,0 +1,113 @@
+import cv2, time, requests, numpy as np
+from utils import imagenes_utils as iu
+
+class BackendDescripcion:
+    """
+    Interfaz común de los modelos de descripción. `describir` recibe la imagen
+    (ndarray BGR o ruta en disco) y devuelve el texto, o lanza una excepción.
+    """
+    nombre = "base"
+
+    def describir(self, imagen):
+        raise NotImplementedError
+
+def _como_array(imagen):
+    return cv2.imread(imagen) if isinstance(imagen, str) else imagen
+
+def _como_base64(imagen):
+    return iu.encode_image(imagen) if isinstance(imagen, str) else iu.codificar_imagen(imagen)
+
+class BackendGemini(BackendDescripcion):
+    nombre = "gemini"
+
+    def __init__(self, prompt):
+        self.prompt = prompt
+
+    def describir(self, imagen):
+        # Import diferido: configura la API de Gemini solo si se usa este backend
+        from utils import gemini_utils as gu
+        return gu.analizar_img_con_gemini(_como_array(imagen), self.prompt)
+
+class BackendCogVLM(BackendDescripcion):
+    nombre = "cogvlm"
+
+    def __init__(self, prompt, url="https://buck-tough-louse.ngrok-free.app/v1/chat/completions", timeout=200):
+        self.prompt = prompt
+        self.url = url
+        self.timeout = timeout
+        self.sesion = requests.Session()
+
+    def describir(self, imagen):
+        img_url = f"data:image/jpeg;base64,{_como_base64(imagen)}"
+
+        # Armar mensajes para la API de chat
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": self.prompt},
+                    {"type": "image_url", "image_url": {"url": img_url}},
+                ],
+            }
+        ]
+
+        response = self.sesion.post(
+            self.url,
+            json={
+                "model": "cogvlm-chat-17b",
+                "messages": messages,
+                "stream": False,
+                "max_tokens": 1024,
+                "temperature": 0.8,
+                "top_p": 0.8,
+            },
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"respuesta {response.status_code}")
+
+        decoded = response.json()
+        return decoded.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
+
+class BackendVila(BackendDescripcion):
+    nombre = "vila"
+
+    def __init__(self, prompt, url="http://18.228.157.19:7000/describe_image_file/", timeout=60):
+        self.prompt = prompt
+        self.url = url
+        self.timeout = timeout
+        self.sesion = requests.Session()
+
+    def describir(self, imagen, prompt=None):
+        """
+        `prompt`, si se indica, se usa solo en esta llamada en lugar de `self.prompt`.
+        """
+        _, img_encoded = cv2.imencode(".jpg", cv2.cvtColor(_como_array(imagen), cv2.COLOR_BGR2RGB))
+        files = {"file": ("persona.jpg", img_encoded.tobytes(), "image/jpeg")}
+        data = {"prompt": self.prompt if prompt is None else prompt}
+
+        r = self.sesion.post(self.url, files=files, data=data, timeout=self.timeout)
+        if r.status_code != 200:
+            raise RuntimeError(f"respuesta {r.status_code}")
+        return r.text
+
+class BackendFalso(BackendDescripcion):
+    nombre = "falso"
+
+    def __init__(self, latencia=0.5, tasa_error=0.0, semilla=0):
+        """
+        Backend local determinístico para pruebas de carga: espera `latencia`
+        segundos y devuelve una descripción fija (o falla con `tasa_error`).
+        """
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.rng = np.random.default_rng(semilla)
+        self.llamadas = 0
+
+    def describir(self, imagen):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        if self.tasa_error and self.rng.random() < self.tasa_error:
+            raise RuntimeError("error simulado")
+        alto, ancho = _como_array(imagen).shape[:2]
+        return f"**Apariencia General**\n- Persona ({ancho}x{alto} px)"
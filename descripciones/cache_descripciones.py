@@ -0,0 +1,226 @@
+import cv2, json, os, time, numpy as np
+from collections import OrderedDict
+from threading import Lock
+
+def hash_perceptual(imagen):
+    """
+    Calcula un hash perceptual (pHash) de 64 bits: DCT de la imagen reducida a
+    32x32 en grises, comparando las 8x8 frecuencias más bajas contra su mediana.
+    Recortes casi iguales de la misma persona quedan a pocos bits de distancia.
+
+    Retorna:
+        np.uint64: Hash de la imagen.
+    """
+    gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY) if imagen.ndim == 3 else imagen
+    reducida = cv2.resize(gris, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    bajas = cv2.dct(reducida)[:8, :8].flatten()
+    bits = bajas > np.median(bajas[1:])
+    return np.packbits(bits).view(">u8")[0].astype(np.uint64)
+
+def _distancias_hamming(hashes, h):
+    """
+    Distancia de Hamming entre `h` y todos los `hashes` a la vez.
+    """
+    xor = np.bitwise_xor(hashes, h)
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+class CacheDescripciones:
+    def __init__(self, max_entradas=2000, ttl=6 * 3600, distancia_max=8, distancia_embedding=0.25,
+                 ruta_persistencia=None, guardar_cada=50, intervalo_guardado=300.0):
+        """
+        Cache de descripciones direccionada por contenido: si llega un recorte
+        parecido a uno ya descrito (misma persona con otro ID tras una oclusión o
+        una reconexión), se reutiliza la descripción en lugar de llamar al modelo.
+
+        Parámetros:
+            max_entradas (int): Capacidad; al superarla se expulsa la menos usada (LRU).
+            ttl (float): Segundos de vida de una entrada.
+            distancia_max (int): Bits de diferencia de pHash aceptados como coincidencia.
+            distancia_embedding (float): Distancia coseno máxima si se usan embeddings.
+            ruta_persistencia (str | None): Archivo JSON para conservar la cache entre reinicios.
+            guardar_cada (int): Con `ruta_persistencia`, se guarda tras este número de
+                                descripciones nuevas...
+            intervalo_guardado (float): ...o si pasaron estos segundos desde el último
+                                        guardado y hay alguna nueva. Así un corte
+                                        abrupto pierde poco, no todo lo de la sesión.
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.distancia_max = distancia_max
+        self.distancia_embedding = distancia_embedding
+        self.ruta_persistencia = ruta_persistencia
+        self.guardar_cada = guardar_cada
+        self.intervalo_guardado = intervalo_guardado
+        self._sin_guardar = 0
+        self._ultimo_guardado = time.time()
+        self._lock_guardado = Lock()  # Serializa escrituras del archivo
+
+        # Claves en arreglos para comparar contra todas las entradas con una sola operación
+        self._hashes = np.zeros(max_entradas, dtype=np.uint64)
+        self._con_hash = np.zeros(max_entradas, dtype=bool)
+        self._embeddings = None
+        self._con_embedding = np.zeros(max_entradas, dtype=bool)
+        self._creado = np.zeros(max_entradas, dtype=np.float64)
+        self._ocupado = np.zeros(max_entradas, dtype=bool)
+        self._entradas = OrderedDict()  # slot -> descripción, en orden LRU
+        self._libres = list(range(max_entradas - 1, -1, -1))
+        self._lock = Lock()
+
+        self.aciertos = 0
+        self.fallos = 0
+        self.expulsiones = 0
+        self.guardados = 0
+
+        if ruta_persistencia and os.path.exists(ruta_persistencia):
+            self.cargar()
+
+    def buscar(self, imagen=None, embedding=None, ahora=None):
+        """
+        Busca una descripción para un recorte parecido.
+
+        Parámetros:
+            imagen (np.array | None): Recorte BGR (se compara por pHash).
+            embedding (np.array | None): Vector de apariencia (se compara por coseno si se da).
+
+        Retorna:
+            str | None: Descripción almacenada o None si no hay coincidencia.
+        """
+        ahora = ahora or time.time()
+        h = hash_perceptual(imagen) if imagen is not None else None
+        with self._lock:
+            self._expirar(ahora)
+            slot = self._mas_cercano(h, embedding)
+            if slot is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(slot)
+            self.aciertos += 1
+            return self._entradas[slot]
+
+    def agregar(self, descripcion, imagen=None, embedding=None, ahora=None):
+        """
+        Guarda una descripción asociada al contenido del recorte. Cada
+        `guardar_cada` descripciones o `intervalo_guardado` segundos, también
+        la persiste.
+        """
+        ahora = ahora or time.time()
+        h = hash_perceptual(imagen) if imagen is not None else None
+        with self._lock:
+            self._expirar(ahora)
+            self._insertar(descripcion, h, embedding, ahora)
+            self._sin_guardar += 1
+            persistir = self.ruta_persistencia and (self._sin_guardar >= self.guardar_cada
+                                                    or ahora - self._ultimo_guardado >= self.intervalo_guardado)
+        if persistir:
+            self.guardar(ahora)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "expulsiones": self.expulsiones,
+                "guardados": self.guardados,
+                "sin_guardar": self._sin_guardar,
+            }
+
+    def guardar(self, ahora=None):
+        """
+        Persiste la cache en `ruta_persistencia` (escritura atómica).
+        """
+        if not self.ruta_persistencia:
+            return
+        with self._lock_guardado:
+            self._guardar(ahora or time.time())
+
+    def _guardar(self, ahora):
+        with self._lock:
+            self._sin_guardar = 0
+            self._ultimo_guardado = ahora
+            datos = []
+            for slot, descripcion in self._entradas.items():
+                datos.append({
+                    "hash": int(self._hashes[slot]) if self._con_hash[slot] else None,
+                    "embedding": self._embeddings[slot].tolist() if self._con_embedding[slot] else None,
+                    "descripcion": descripcion,
+                    "creado": float(self._creado[slot]),
+                })
+
+        temporal = self.ruta_persistencia + ".tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(datos, f, ensure_ascii=False)
+            os.replace(temporal, self.ruta_persistencia)
+        except OSError as e:
+            print(f"[ERROR] No se pudo guardar la cache de descripciones: {e}")
+            return
+        with self._lock:
+            self.guardados += 1
+
+    def cargar(self):
+        try:
+            with open(self.ruta_persistencia, "r", encoding="utf-8") as f:
+                datos = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] No se pudo cargar la cache de descripciones: {e}")
+            return
+
+        ahora = time.time()
+        with self._lock:
+            for d in datos[-self.max_entradas:]:
+                if ahora - d["creado"] > self.ttl:
+                    continue
+                h = np.uint64(d["hash"]) if d["hash"] is not None else None
+                self._insertar(d["descripcion"], h, d["embedding"], d["creado"])
+
+    def _insertar(self, descripcion, h, embedding, creado):
+        if not self._libres:
+            self._expulsar(next(iter(self._entradas)))
+
+        slot = self._libres.pop()
+        self._ocupado[slot] = True
+        self._creado[slot] = creado
+        self._con_hash[slot] = h is not None
+        self._hashes[slot] = h if h is not None else 0
+        self._con_embedding[slot] = embedding is not None
+        if embedding is not None:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.max_entradas, embedding.size), dtype=np.float32)
+            self._embeddings[slot] = embedding / (np.linalg.norm(embedding) or 1.0)
+        self._entradas[slot] = descripcion
+
+    def _mas_cercano(self, h, embedding):
+        if not self._entradas:
+            return None
+
+        if embedding is not None and self._embeddings is not None and self._con_embedding.any():
+            e = np.asarray(embedding, dtype=np.float32)
+            e = e / (np.linalg.norm(e) or 1.0)
+            distancias = 1.0 - self._embeddings @ e
+            distancias[~self._con_embedding] = np.inf
+            slot = int(np.argmin(distancias))
+            if distancias[slot] <= self.distancia_embedding:
+                return slot
+
+        if h is not None and self._con_hash.any():
+            distancias = np.where(self._con_hash, _distancias_hamming(self._hashes, h), 65)
+            slot = int(np.argmin(distancias))
+            if distancias[slot] <= self.distancia_max:
+                return slot
+        return None
+
+    def _expirar(self, ahora):
+        for slot in np.flatnonzero(self._ocupado & (ahora - self._creado > self.ttl)):
+            self._expulsar(int(slot))
+
+    def _expulsar(self, slot):
+        del self._entradas[slot]
+        self._ocupado[slot] = False
+        self._con_hash[slot] = False
+        self._con_embedding[slot] = False
+        self._libres.append(slot)
+        self.expulsiones += 1
@@ -1,6 +1,5 @@
-import cv2, requests
-from utils import imagenes_utils as iu
-from utils import gemini_utils as gu
+from descripciones.backends import BackendGemini, BackendCogVLM, BackendVila, BackendFalso
+from descripciones.planificador import PlanificadorDescripciones
 
 class GestorDescripciones:
     def __init__(self, prompt, database):
@@ -9,93 +8,55 @@ class GestorDescripciones:
         # Instancia del manejador de base de datos
         self.db = database
 
-    def describir_con_gemini(self, imagen, id_persona):
+        # Backends disponibles, todos con la misma interfaz (BackendDescripcion)
+        self.backends = {
+            "gemini": BackendGemini(prompt),
+            "cogvlm": BackendCogVLM(prompt),
+            "vila": BackendVila(prompt),
+            "falso": BackendFalso(),
+        }
+
+    def crear_planificador(self, nombre_backend, **kwargs):
         """
-        Genera una descripción de una persona usando el modelo Gemini de Google.
+        Crea un planificador que limita y deduplica las llamadas al backend indicado.
+
+        Parámetros:
+            nombre_backend (str): 'gemini', 'cogvlm', 'vila' o 'falso'.
+            **kwargs: Parámetros de PlanificadorDescripciones (max_por_segundo, max_concurrentes, ...).
+
+        Retorna:
+            PlanificadorDescripciones
         """
-        try:
-            # Analizar imagen con Gemini y guardar el resultado
-            descripcion = gu.analizar_img_con_gemini(imagen, self.prompt)
+        return PlanificadorDescripciones(self.backends[nombre_backend], self.db, **kwargs)
 
+    def _describir(self, nombre_backend, imagen, id_persona, **kwargs):
+        try:
+            descripcion = self.backends[nombre_backend].describir(imagen, **kwargs)
             self.db.guardar_descripcion(id_persona, descripcion)
-            
         except Exception as e:
-            print(f"[ERROR] Gemini: ID {id_persona} - {e}")
+            print(f"[ERROR] {nombre_backend}: ID {id_persona} - {e}")
+
+    def describir_con_gemini(self, imagen, id_persona):
+        """
+        Genera una descripción de una persona usando el modelo Gemini de Google.
+        """
+        self._describir("gemini", imagen, id_persona)
 
     def describir_con_coglvm(self, imagen_path, id_persona):
         """
         Genera una descripción de una persona usando el modelo CogVLM a través de una API tipo OpenAI.
-        Recibe la ruta de una imagen y envía una solicitud al servidor local.
+        Recibe la ruta de una imagen (o la imagen en memoria) y envía una solicitud al servidor.
 
         Args:
-            imagen_path (str): Ruta a la imagen en disco.
+            imagen_path (str | np.ndarray): Ruta a la imagen en disco o imagen BGR.
             id_persona (str | int): ID único de la persona para guardar la descripción.
-            prompt (str): Texto de entrada para guiar la descripción.
         """
-        try:
-            # Codificar la imagen en base64 usando imagenes_utils
-            img_base64 = iu.encode_image(imagen_path)
-            img_url = f"data:image/jpeg;base64,{img_base64}"
-
-            # Armar mensajes para la API de chat
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": self.prompt,
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": img_url
-                            },
-                        },
-                    ],
-                }
-            ]
-
-            # Enviar la solicitud al servidor local de CogVLM
-            response = requests.post(
-                "https://buck-tough-louse.ngrok-free.app/v1/chat/completions",
-                json={
-                    "model": "cogvlm-chat-17b",
-                    "messages": messages,
-                    "stream": False,
-                    "max_tokens": 1024,
-                    "temperature": 0.8,
-                    "top_p": 0.8,
-                },
-                timeout=200,
-            )
-
-            # Procesar respuesta
-            if response.status_code == 200:
-                decoded = response.json()
-                descripcion = decoded.get("choices", [{}])[0].get("message", {}).get("content", "").strip()
-                self.db.guardar_descripcion(id_persona, descripcion)
-            else:
-                print(f"[ERROR] CogVLM: respuesta {response.status_code}")
-        except Exception as e:
-            print(f"[ERROR] CogVLM: ID {id_persona} - {e}")
-
-    def describir_con_vila(self, imagen, id_persona, prompt):
-        try:
-            _, img_encoded = cv2.imencode(".jpg", cv2.cvtColor(imagen, cv2.COLOR_BGR2RGB))
-            files = {
-                'file': ('persona.jpg', img_encoded.tobytes(), 'image/jpeg'),
-            }
-            data = {
-                'prompt': prompt
-            }
-
-            r = requests.post("http://18.228.157.19:7000/describe_image_file/", files=files, data=data, timeout=60)
-
-            if r.status_code == 200:
-                self.db.guardar_descripcion(r.text, id_persona)
-            else:
-                print(f"[ERROR] VILA: respuesta {r.status_code}")
-        except Exception as e:
-            print(f"[ERROR] VILA: ID {id_persona} - {e}")
+        self._describir("cogvlm", imagen_path, id_persona)
 
+    def describir_con_vila(self, imagen, id_persona, prompt=None):
+        """
+        Genera una descripción usando el servidor VILA. `prompt`, si se indica,
+        reemplaza al prompt del gestor solo en esta llamada: el backend es
+        compartido con el planificador y otras llamadas concurrentes.
+        """
+        self._describir("vila", imagen, id_persona, prompt=prompt)
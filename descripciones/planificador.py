@@ -0,0 +1,245 @@
+import time, heapq, itertools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Condition
+
+class PlanificadorDescripciones:
+    def __init__(self, backend, database, max_por_segundo=1.0, max_concurrentes=2,
+                 intervalo_track=2.0, max_pendientes=500, cache=None, ejecutor=None):
+        """
+        Decide cuándo pedir la descripción de cada track al backend (Gemini, CogVLM,
+        VILA o uno falso), evitando llamadas repetidas.
+
+        - Cada track tiene como mucho una solicitud pendiente y una en curso; las
+          solicitudes nuevas solo reemplazan el recorte si es de mejor calidad.
+        - Entre dos llamadas para un mismo track pasan al menos `intervalo_track` segundos.
+        - Globalmente se respetan `max_por_segundo` y `max_concurrentes`.
+        - Un track ya descrito no vuelve a pedirse.
+
+        Parámetros:
+            backend (BackendDescripcion): Modelo que genera las descripciones.
+            database (DBManager): Donde se guarda el resultado.
+            max_por_segundo (float): Presupuesto global de llamadas por segundo.
+            max_concurrentes (int): Llamadas en curso simultáneas como máximo.
+            intervalo_track (float): Segundos mínimos entre llamadas de un mismo track.
+            max_pendientes (int): Tracks en espera como máximo; el exceso se descarta.
+            cache (CacheDescripciones | None): Si un recorte se parece a uno ya descrito,
+                                               se reutiliza su descripción sin llamar al backend.
+            ejecutor (EjecutorPorClases | None): Si se pasa, las llamadas corren en su
+                                                 carril 'descripciones' en lugar de un pool propio.
+        """
+        self.backend = backend
+        self.db = database
+        self.max_por_segundo = max_por_segundo
+        self.max_concurrentes = max_concurrentes
+        self.intervalo_track = intervalo_track
+        self.max_pendientes = max_pendientes
+        self.cache = cache
+
+        self._pendientes = {}   # (id_camara, id_persona) -> (puntaje, imagen)
+        self._cola = []         # heap de (listo_desde, secuencia, (id_camara, id_persona))
+        self._secuencia = itertools.count()
+        self._en_curso = set()
+        self._ultimo_envio = {}  # (id_camara, id_persona) -> timestamp de la última llamada
+        self.descritos = set()
+        self._olvidados = set()  # tracks terminados con una llamada en curso
+
+        # Token bucket global
+        self._fichas = 1.0
+        self._ultima_recarga = time.monotonic()
+
+        self._cond = Condition()
+        self._detenido = False
+        self._ejecutor_propio = ejecutor is None
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_concurrentes) if ejecutor is None else ejecutor
+        self._hilo = Thread(target=self._despachar, daemon=True)
+        self._hilo.start()
+
+        self.solicitudes = 0
+        self.descartadas = 0
+        self.enviadas = 0
+        self.desde_cache = 0
+        self.errores = 0
+
+    def solicitar(self, id_persona, imagen, puntaje=0.0, id_camara=None):
+        """
+        Pide una descripción para `id_persona` de `id_camara` (los IDs de track se
+        repiten entre cámaras: cada track se identifica por el par). Si el track
+        ya está descrito se ignora; si ya tiene una solicitud pendiente o en
+        curso, solo se conserva el mejor recorte.
+
+        Retorna:
+            bool: True si la solicitud quedó registrada (nueva o actualizada).
+        """
+        clave = (id_camara, id_persona)
+        with self._cond:
+            self.solicitudes += 1
+            if clave in self.descritos:
+                self.descartadas += 1
+                return False
+
+            actual = self._pendientes.get(clave)
+            if actual is not None:
+                if puntaje > actual[0]:
+                    self._pendientes[clave] = (puntaje, imagen)
+                    return True
+                self.descartadas += 1
+                return False
+
+            if len(self._pendientes) >= self.max_pendientes:
+                self.descartadas += 1
+                return False
+
+            self._pendientes[clave] = (puntaje, imagen)
+            if clave not in self._en_curso:
+                self._encolar(clave)
+            self._cond.notify_all()
+            return True
+
+    def olvidar(self, id_persona, id_camara=None):
+        """
+        Descarta el estado de un track terminado, incluida la marca de descrito:
+        los IDs del tracker no se reutilizan, así que no hace falta recordarlos.
+        Una llamada en curso no se cancela; al terminar, no deja estado.
+        """
+        clave = (id_camara, id_persona)
+        with self._cond:
+            self._pendientes.pop(clave, None)
+            self._ultimo_envio.pop(clave, None)
+            self.descritos.discard(clave)
+            if clave in self._en_curso:
+                self._olvidados.add(clave)
+
+    def descrito(self, id_persona, id_camara=None):
+        return (id_camara, id_persona) in self.descritos
+
+    def detener(self, esperar=True):
+        with self._cond:
+            self._detenido = True
+            self._cond.notify_all()
+        self._hilo.join()
+        if self._ejecutor_propio:
+            self._ejecutor.shutdown(wait=esperar)
+        if self.cache:
+            self.cache.guardar()
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                "pendientes": len(self._pendientes),
+                "en_curso": len(self._en_curso),
+                "descritos": len(self.descritos),
+                "solicitudes": self.solicitudes,
+                "descartadas": self.descartadas,
+                "enviadas": self.enviadas,
+                "desde_cache": self.desde_cache,
+                "errores": self.errores,
+            }
+
+    def _encolar(self, clave):
+        listo = self._ultimo_envio.get(clave, 0.0) + self.intervalo_track
+        heapq.heappush(self._cola, (listo, next(self._secuencia), clave))
+
+    def _recargar_fichas(self, ahora):
+        self._fichas = min(1.0, self._fichas + (ahora - self._ultima_recarga) * self.max_por_segundo)
+        self._ultima_recarga = ahora
+
+    def _despachar(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._detenido:
+                        return
+                    ahora = time.monotonic()
+                    self._recargar_fichas(ahora)
+
+                    espera = None
+                    if not self._cola or len(self._en_curso) >= self.max_concurrentes:
+                        espera = None
+                    elif self._cola[0][0] > time.time():
+                        espera = self._cola[0][0] - time.time()
+                    elif self._fichas < 1.0:
+                        espera = (1.0 - self._fichas) / self.max_por_segundo
+                    else:
+                        break
+                    self._cond.wait(espera)
+
+                _, _, clave = heapq.heappop(self._cola)
+                entrada = self._pendientes.pop(clave, None)
+                if entrada is None or clave in self.descritos:
+                    continue
+                self._en_curso.add(clave)
+
+            # Una coincidencia en la cache no consume presupuesto del backend
+            if self.cache and self._desde_cache(clave, entrada[1]):
+                continue
+
+            with self._cond:
+                self._fichas -= 1.0
+                self._ultimo_envio[clave] = time.time()
+                self.enviadas += 1
+
+            if self._ejecutor_propio:
+                self._ejecutor.submit(self._describir, clave, entrada[1])
+            else:
+                futuro = self._ejecutor.enviar("descripciones", self._describir, clave, entrada[1])
+                futuro.add_done_callback(lambda f, clave=clave: self._si_descartada(f, clave))
+
+    def _guardar(self, clave, descripcion):
+        id_camara, id_persona = clave
+        self.db.guardar_descripcion(id_persona, descripcion, id_camara=id_camara)
+
+    def _desde_cache(self, clave, imagen):
+        descripcion = self.cache.buscar(imagen)
+        if descripcion is None:
+            return False
+
+        self._guardar(clave, descripcion)
+        with self._cond:
+            self.desde_cache += 1
+            self._en_curso.discard(clave)
+            if not self._fue_olvidado(clave):
+                self.descritos.add(clave)
+            self._pendientes.pop(clave, None)
+            self._cond.notify_all()
+        return True
+
+    def _describir(self, clave, imagen):
+        try:
+            descripcion = self.backend.describir(imagen)
+            self._guardar(clave, descripcion)
+            if self.cache:
+                self.cache.agregar(descripcion, imagen)
+            exito = True
+        except Exception as e:
+            print(f"[ERROR] {self.backend.nombre}: cámara {clave[0]} ID {clave[1]} - {e}")
+            exito = False
+
+        with self._cond:
+            self._en_curso.discard(clave)
+            olvidado = self._fue_olvidado(clave)
+            if exito:
+                if not olvidado:
+                    self.descritos.add(clave)
+                self._pendientes.pop(clave, None)
+            else:
+                self.errores += 1
+                if clave in self._pendientes:
+                    self._encolar(clave)
+            self._cond.notify_all()
+
+    def _si_descartada(self, futuro, clave):
+        # El carril descartó la llamada: el track vuelve a poder pedirse
+        if not futuro.cancelled():
+            return
+        with self._cond:
+            self._en_curso.discard(clave)
+            self._fue_olvidado(clave)
+            self.errores += 1
+            self._cond.notify_all()
+
+    def _fue_olvidado(self, clave):
+        # Con el lock tomado: el track terminó mientras su llamada estaba en curso
+        if clave in self._olvidados:
+            self._olvidados.discard(clave)
+            return True
+        return False
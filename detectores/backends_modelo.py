@@ -0,0 +1,160 @@
+import cv2, glob, os, shutil, numpy as np
+from threading import Lock
+from ultralytics import YOLO
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+
+_lock_exportacion = Lock()
+
+def leer_frames_calibracion(fuente, cantidad=64):
+    """
+    Frames de muestra para calibrar la cuantización INT8: de un video (repartidos
+    a lo largo del clip) o de una carpeta de imágenes.
+
+    Retorna:
+        list[np.array]: Frames BGR.
+    """
+    if not fuente:
+        return []
+    if os.path.isdir(fuente):
+        rutas = sorted(glob.glob(os.path.join(fuente, "*.jpg")) + glob.glob(os.path.join(fuente, "*.png")))
+        paso = max(1, len(rutas) // cantidad)
+        return [f for f in (cv2.imread(r) for r in rutas[::paso][:cantidad]) if f is not None]
+
+    video = cv2.VideoCapture(fuente)
+    total = int(video.get(cv2.CAP_PROP_FRAME_COUNT)) or cantidad
+    frames = []
+    for indice in np.linspace(0, max(0, total - 1), min(cantidad, total)).astype(int):
+        video.set(cv2.CAP_PROP_POS_FRAMES, int(indice))
+        ret, frame = video.read()
+        if ret:
+            frames.append(frame)
+    video.release()
+    return frames
+
+def preprocesar(frame, tam=640):
+    """
+    Mismo preprocesamiento que aplica ultralytics antes del modelo: letterbox a
+    `tam`×`tam` con relleno gris, BGR a RGB, CHW y escala 0-1.
+
+    Retorna:
+        np.array: Tensor float32 de forma (1, 3, tam, tam).
+    """
+    alto, ancho = frame.shape[:2]
+    escala = min(tam / alto, tam / ancho)
+    nuevo_ancho, nuevo_alto = int(round(ancho * escala)), int(round(alto * escala))
+    lienzo = np.full((tam, tam, 3), 114, dtype=np.uint8)
+    x, y = (tam - nuevo_ancho) // 2, (tam - nuevo_alto) // 2
+    lienzo[y:y + nuevo_alto, x:x + nuevo_ancho] = cv2.resize(frame, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+    return np.ascontiguousarray(lienzo[:, :, ::-1].transpose(2, 0, 1))[None].astype(np.float32) / 255.0
+
+def _cuantizar_onnx(ruta_onnx, ruta_salida, frames, tam):
+    import onnx
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    nombre_entrada = onnx.load(ruta_onnx, load_external_data=False).graph.input[0].name
+
+    class LectorCalibracion(CalibrationDataReader):
+        def __init__(self):
+            self._tensores = iter(preprocesar(f, tam) for f in frames)
+
+        def get_next(self):
+            tensor = next(self._tensores, None)
+            return None if tensor is None else {nombre_entrada: tensor}
+
+    quantize_static(ruta_onnx, ruta_salida, LectorCalibracion(), quant_format=QuantFormat.QDQ,
+                    per_channel=True, activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+
+    # Ultralytics lee nombres de clases, stride e imgsz de los metadatos del grafo
+    original, cuantizado = onnx.load(ruta_onnx), onnx.load(ruta_salida)
+    del cuantizado.metadata_props[:]
+    cuantizado.metadata_props.extend(original.metadata_props)
+    onnx.save(cuantizado, ruta_salida)
+
+def _cuantizar_openvino(carpeta_ov, carpeta_salida, frames, tam):
+    import nncf, openvino as ov
+
+    xml = glob.glob(os.path.join(carpeta_ov, "*.xml"))[0]
+    modelo = ov.Core().read_model(xml)
+    datos = nncf.Dataset([preprocesar(f, tam) for f in frames])
+    cuantizado = nncf.quantize(modelo, datos, preset=nncf.QuantizationPreset.MIXED, subset_size=len(frames))
+
+    os.makedirs(carpeta_salida, exist_ok=True)
+    ov.save_model(cuantizado, os.path.join(carpeta_salida, os.path.basename(xml)))
+    shutil.copy(os.path.join(carpeta_ov, "metadata.yaml"), carpeta_salida)
+
+def preparar_modelo(ruta_pt, backend="pytorch", int8=False, tam=640, frames_calibracion=None,
+                    carpeta_cache=None):
+    """
+    Retorna la ruta a cargar con YOLO(...) para el backend pedido. La primera vez
+    exporta el .pt a ONNX u OpenVINO (y, con `int8`, lo cuantiza calibrando con
+    `frames_calibracion`) y lo deja en `carpeta_cache`; las siguientes reutiliza
+    lo exportado mientras el .pt no cambie.
+
+    Parámetros:
+        ruta_pt (str): Pesos PyTorch originales.
+        backend (str): 'pytorch', 'onnx' u 'openvino'.
+        int8 (bool): Usar la variante cuantizada a INT8.
+        tam (int): Lado de la entrada del grafo exportado.
+        frames_calibracion (list[np.array] | str | None): Frames de muestra para INT8, o
+                                                          un video/carpeta de donde leerlos
+                                                          (solo si hay que cuantizar).
+        carpeta_cache (str | None): Dónde guardar lo exportado (por defecto models/cache).
+
+    Retorna:
+        str: Ruta del modelo (archivo .pt/.onnx o carpeta de OpenVINO).
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend de modelo desconocido: {backend} (usar {', '.join(BACKENDS)})")
+    if backend == "pytorch":
+        return ruta_pt
+
+    carpeta_cache = carpeta_cache or os.path.join(os.path.dirname(ruta_pt) or ".", "cache")
+    estado = os.stat(ruta_pt)
+    base = f"{os.path.splitext(os.path.basename(ruta_pt))[0]}_{tam}_{estado.st_size}_{int(estado.st_mtime)}"
+    ruta_fp32 = os.path.join(carpeta_cache, base + (".onnx" if backend == "onnx" else "_openvino_model"))
+    ruta_int8 = os.path.join(carpeta_cache, base + ("_int8.onnx" if backend == "onnx" else "_int8_openvino_model"))
+
+    with _lock_exportacion:
+        if not os.path.exists(ruta_fp32):
+            print(f"[INFO] Exportando {ruta_pt} a {backend} (solo la primera vez)...")
+            os.makedirs(carpeta_cache, exist_ok=True)
+            # dynamic: lotes de cualquier tamaño (supervisor, mosaicos, caras)
+            exportado = YOLO(ruta_pt).export(format=backend, imgsz=tam, dynamic=True, half=False, verbose=False)
+            shutil.move(exportado, ruta_fp32)
+        if not int8:
+            return ruta_fp32
+
+        if not os.path.exists(ruta_int8):
+            if isinstance(frames_calibracion, str):
+                frames_calibracion = leer_frames_calibracion(frames_calibracion)
+            if not frames_calibracion:
+                print(f"[ADVERTENCIA] Sin frames de calibración: se usa {backend} FP32")
+                return ruta_fp32
+            print(f"[INFO] Cuantizando {ruta_pt} a INT8 con {len(frames_calibracion)} frames...")
+            if backend == "onnx":
+                _cuantizar_onnx(ruta_fp32, ruta_int8, frames_calibracion, tam)
+            else:
+                _cuantizar_openvino(ruta_fp32, ruta_int8, frames_calibracion, tam)
+        return ruta_int8
+
+def cargar_yolo(ruta_pt, backend="pytorch", **kwargs):
+    """
+    YOLO sobre el backend pedido. La interfaz (`predict`, Results) es la misma
+    para todos, así que el tracker y el resto del pipeline no cambian.
+    """
+    return YOLO(preparar_modelo(ruta_pt, backend, **kwargs), task="detect")
+
+def configurar_desde_entorno():
+    """
+    Lee BACKEND_MODELO (pytorch | onnx | openvino), MODELO_INT8=1, TAM_ENTRADA y
+    FRAMES_CALIBRACION (video o carpeta de imágenes de la escena real).
+
+    Retorna:
+        callable: Función ruta_pt -> YOLO, para pasar como `cargador_modelo`.
+    """
+    backend = os.getenv("BACKEND_MODELO", "pytorch")
+    int8 = os.getenv("MODELO_INT8", "0") == "1"
+    tam = int(os.getenv("TAM_ENTRADA", 640))
+    calibracion = os.getenv("FRAMES_CALIBRACION")
+    return lambda ruta_pt: cargar_yolo(ruta_pt, backend, int8=int8, tam=tam, frames_calibracion=calibracion)
@@ -1,21 +1,56 @@
 import cv2, os, requests, numpy as np
 from ultralytics import YOLO
 from utils import imagenes_utils as iu
+from utils.registro_modelos import registro
+from utils.estado_tracks import RegistroTracks
 
 class DetectorCaras:
-    def __init__(self, carpeta_salida, executor, database, ruta_modelo="models/yolov11m-face.pt"):
+    def __init__(self, carpeta_salida, executor, database, ruta_modelo="models/yolov11m-face.pt",
+                 modo="local", confianza=0.5, tam_minimo=32,
+                 url_rostros="https://buck-tough-louse.ngrok-free.app/detectar_rostro", almacen=None,
+                 cargador_modelo=YOLO, id_camara=None):
         """
         Inicializa el detector de caras con un modelo YOLO específico,
-        una ruta para guardar imágenes, y un ejecutor para tareas en segundo plano.
+        una ruta para guardar imágenes, y un ejecutor para tareas en segundo plano
+        (EjecutorPorClases: las imágenes van al carril 'imagenes' y los registros
+        al carril 'db').
+
+        Parámetros:
+            modo (str): 'local' usa el modelo YOLO de caras sobre todos los recortes de
+                        un frame en un solo lote; 'remoto' usa el servidor /detectar_rostro.
+            confianza (float): Confianza mínima de una cara (modo local).
+            tam_minimo (int): Recortes de persona más chicos (en píxeles) no se analizan.
+            url_rostros (str): Servidor /detectar_rostro del modo remoto.
+            almacen (AlmacenRecortes | None): Si se pasa, las caras se agregan a sus
+                                              segmentos y la base guarda la referencia.
+            cargador_modelo (callable): Recibe la ruta de los pesos y devuelve el modelo
+                                        (YOLO de PyTorch u otro backend, ver backends_modelo).
+            id_camara: Cámara de los recortes. Los IDs de track se repiten entre cámaras:
+                       cada cámara tiene su DetectorCaras (el modelo igual se comparte).
         """
-        self.modelo = YOLO(ruta_modelo)
+        # El modelo se carga en el primer uso: si la detección de caras está
+        # desactivada, nunca ocupa memoria. Se comparte entre cámaras con un lock.
+        self.nombre_modelo = f"yolo_caras:{ruta_modelo}"
+        registro.registrar(self.nombre_modelo, lambda: cargador_modelo(ruta_modelo), thread_safe=False)
         self.carpeta_salida = carpeta_salida
         os.makedirs(self.carpeta_salida, exist_ok=True)
 
         self.db = database
         self.executor = executor
-
-    def detectar_rostro_remoto(self, imagen, id_persona, url_servidor="https://buck-tough-louse.ngrok-free.app/detectar_rostro"):
+        self.modo = modo
+        self.confianza = confianza
+        self.tam_minimo = tam_minimo
+        self.url_rostros = url_rostros
+        self.almacen = almacen
+        self.id_camara = id_camara
+        # Confianza de la mejor cara guardada por track, si quien llama no pasa su registro
+        self.tracks = RegistroTracks()
+
+    @property
+    def modelo(self):
+        return registro.obtener(self.nombre_modelo)
+
+    def detectar_rostro_remoto(self, imagen, id_persona, url_servidor=None):
         """
         Envía una imagen a un servidor remoto para detectar el rostro y orientación.
 
@@ -35,7 +70,7 @@ class DetectorCaras:
         params = {"track_id": id_persona}
 
         try:
-            resp = requests.post(url_servidor, params=params, files=files, timeout=5)
+            resp = requests.post(url_servidor or self.url_rostros, params=params, files=files, timeout=5)
         except requests.RequestException as e:
             print(f"[ERROR] Conexión al servidor: {e}")
             return None, "error"
@@ -71,19 +106,108 @@ class DetectorCaras:
             print(f"[ADVERTENCIA] ID {id_persona}: recorte vacío")
             return None
 
-        # Guardar imagen (cara) en local con executor
-        future_ruta = self.executor.submit(iu.guardar_imagen, recorte, id_persona, self.carpeta_salida, tipo="Cara")
-
-        # Esperar resultado
-        ruta_guardada = future_ruta.result(timeout=10)  # espera máximo 10 seg
+        self.guardar_cara(recorte.copy(), id_persona)
+        return x1, y1, x2, y2
 
+    def guardar_cara(self, recorte, id_persona):
+        """
+        Guarda el recorte de la cara y registra su carpeta en la base de datos,
+        ambos en segundo plano (no bloquea al hilo de detección). Si la cara
+        anterior del mismo track todavía no se escribió, esta la reemplaza.
+        """
+        if self.almacen:
+            future_ruta = self.executor.enviar("imagenes", self.almacen.guardar, recorte, id_persona, "Cara",
+                                               clave=("cara", self.id_camara, id_persona))
+        else:
+            future_ruta = self.executor.enviar("imagenes", iu.guardar_imagen, recorte, id_persona,
+                                               self.carpeta_salida, tipo="Cara",
+                                               clave=("cara", self.id_camara, id_persona))
+        future_ruta.add_done_callback(lambda f: self._registrar_cara(f, id_persona))
+
+    def _registrar_cara(self, future_ruta, id_persona):
+        if future_ruta.cancelled():
+            return
+        ruta_guardada = future_ruta.result() if not future_ruta.exception() else None
         if ruta_guardada:
-            print(f"[INFO] ID {id_persona}: Cara guardada en {ruta_guardada} (orientación: {orientacion})")
-            carpeta_id = os.path.dirname(ruta_guardada)
-            # Guardar en base de datos en segundo plano (no espera)
-            self.executor.submit(self.db.guardar_imagen_cara, id_persona, carpeta_id)
+            # Con almacén se guarda la referencia al recorte; si no, la carpeta
+            registro_cara = ruta_guardada if self.almacen else os.path.dirname(ruta_guardada)
+            self.executor.enviar("db", self.db.guardar_imagen_cara, id_persona, registro_cara,
+                                 id_camara=self.id_camara, clave=("cara", self.id_camara, id_persona))
         else:
             print(f"[ERROR] ID {id_persona}: No se pudo guardar el rostro")
 
-        return x1, y1, x2, y2
+    def detectar_caras_en_lote(self, frame, cajas, ids, tracks=None):
+        """
+        Detecta caras en todos los recortes de persona de un frame a la vez.
+
+        En modo local se pasa el lote completo de recortes por el modelo YOLO de caras
+        en una sola llamada; en modo remoto se consulta el servidor por cada recorte.
+        La cara se guarda (en segundo plano) solo si mejora la mejor guardada del track.
+
+        Parámetros:
+            frame (np.array): Frame completo (no se modifica).
+            cajas (list): Cajas de persona (x1, y1, x2, y2) en coordenadas del frame.
+            ids (list): ID de track de cada caja.
+            tracks (RegistroTracks | None): Estado por track de la cámara (la confianza
+                                            de la mejor cara se guarda en cada registro).
+
+        Retorna:
+            dict: {id_persona: (x1, y1, x2, y2)} con la cara en coordenadas del frame.
+        """
+        if tracks is None:  # Un RegistroTracks vacío es falso (define __len__)
+            tracks = self.tracks
+        alto, ancho = frame.shape[:2]
+        recortes, origenes = [], []
+        for (x1, y1, x2, y2), id_persona in zip(cajas, ids):
+            x1, y1, x2, y2 = max(0, int(x1)), max(0, int(y1)), min(ancho, int(x2)), min(alto, int(y2))
+            if id_persona == -1 or x2 - x1 < self.tam_minimo or y2 - y1 < self.tam_minimo:
+                continue
+            recortes.append(frame[y1:y2, x1:x2])
+            origenes.append((id_persona, x1, y1))
+
+        if not recortes:
+            return {}
+
+        if self.modo == "remoto":
+            detecciones = []
+            for recorte, (id_persona, _, _) in zip(recortes, origenes):
+                caja, _ = self.detectar_rostro_remoto(recorte, id_persona)
+                detecciones.append((caja, 1.0) if caja else None)
+        else:
+            detecciones = self._detectar_local(recortes)
+
+        caras = {}
+        for deteccion, (id_persona, ox, oy) in zip(detecciones, origenes):
+            if deteccion is None:
+                continue
+            (cx1, cy1, cx2, cy2), confianza = deteccion
+            caja_frame = (int(cx1) + ox, int(cy1) + oy, int(cx2) + ox, int(cy2) + oy)
+            caras[id_persona] = caja_frame
+
+            estado = tracks.obtener(id_persona) or tracks.tocar(id_persona)
+            if confianza > estado.confianza_cara:
+                estado.confianza_cara = confianza
+                fx1, fy1, fx2, fy2 = caja_frame
+                recorte_cara = frame[max(fy1, 0):fy2, max(fx1, 0):fx2].copy()
+                if recorte_cara.size:
+                    self.guardar_cara(recorte_cara, id_persona)
+        return caras
+
+    def _detectar_local(self, recortes):
+        """
+        Retorna:
+            list: Por recorte, ((x1, y1, x2, y2), confianza) de la cara más confiable o None.
+        """
+        with registro.usar(self.nombre_modelo) as modelo:
+            resultados = modelo.predict(recortes, conf=self.confianza, verbose=False)
+
+        detecciones = []
+        for resultado in resultados:
+            if resultado.boxes is None or len(resultado.boxes) == 0:
+                detecciones.append(None)
+                continue
+            confs = resultado.boxes.conf.cpu().numpy()
+            mejor = int(confs.argmax())
+            detecciones.append((resultado.boxes.xyxy[mejor].cpu().tolist(), float(confs[mejor])))
+        return detecciones
 
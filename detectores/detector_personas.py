@@ -1,96 +1,313 @@
-import cv2, os, time
-from concurrent.futures import ThreadPoolExecutor
+import os, time, numpy as np
+from threading import Lock
 from ultralytics import YOLO
 from detectores.detector_caras import DetectorCaras
+from detectores.regiones import DetectorRegiones
+from detectores.seguimiento import crear_tracker, actualizar_tracker, ids_vigentes
 from utils import imagenes_utils as iu
+from utils.ejecutor_clases import EjecutorPorClases
+from utils.captura import escalar_cajas
+from utils.estado_tracks import RegistroTracks
+from utils.mejor_toma import SelectorMejorToma, puntuar_cajas
+from utils.metricas import metricas
+from utils.renderizado import DeteccionFrame, deteccion_vacia
+from utils.zonas import MotorZonas, cargar_zonas
+
+CONFIANZA_MIN = 0.7
+IOU_NMS = 0.5
+
+_INFERENCIA = metricas.histograma("inferencia_segundos", "Tiempo de YOLO por llamada", ["camara"])
+_TRACKING = metricas.histograma("tracking_segundos", "Tiempo del tracker por frame", ["camara"])
+_PROCESAMIENTO = metricas.histograma("procesamiento_segundos", "Tiempo de procesar_resultado por frame", ["camara"])
+_PERSONAS = metricas.contador("personas_detectadas_total", "Cajas de persona detectadas", ["camara"])
 
 class DetectorPersonas:
-    def __init__(self, carpeta_salida, funcion_alerta, database, ruta_modelo="models/yolo11-person.pt", executor=None):
+    def __init__(self, carpeta_salida, funcion_alerta, database, ruta_modelo="models/yolo11-person.pt", executor=None,
+                 modelo=None, detector_caras=None, id_camara=0, config_tracker="botsort.yaml",
+                 tomas_por_track=3, intervalo_guardado=60.0, planificador_descripciones=None,
+                 detectar_caras=False, zonas=None, modo_region="completo", almacen=None, cargador_modelo=YOLO,
+                 ttl_track=10.0, max_tracks=5000, reidentificador=None):
         """
         Inicializa el sistema de detección de personas usando YOLO, junto con
         detección de rostros, descripciones automáticas y gestión de base de datos.
+
+        Si se pasa `modelo` (y `detector_caras`), se reutilizan en lugar de cargar
+        nuevos pesos: así varias cámaras comparten los modelos y cada instancia
+        solo mantiene su propio estado de tracking.
+
+        De cada track se guardan solo los `tomas_por_track` mejores recortes, al
+        terminar el track o cada `intervalo_guardado` segundos. Si se pasa un
+        `planificador_descripciones`, cada vez que mejora la mejor toma de un track
+        se le ofrece para describirla (el planificador decide si y cuándo).
+
+        Con `detectar_caras`, los recortes de todas las personas del frame se pasan
+        en un solo lote al detector de caras.
+
+        `zonas` (MotorZonas) define las áreas monitoreadas; por defecto, el área
+        rectangular histórica. `modo_region` ('completo', 'roi' o 'mosaico') define
+        si el modelo ve el frame entero, solo el recorte que envuelve las zonas o
+        ese recorte dividido en mosaicos (ver DetectorRegiones).
+
+        `funcion_alerta(id_camara, ahora, ids, dentro_del_area, eventos_zona)` se
+        llama una sola vez por frame con todos los tracks (p. ej.
+        GestorAlertas.actualizar); debe ser no bloqueante.
+
+        La detección no dibuja: devuelve un DeteccionFrame (cajas, IDs, zonas,
+        caras). Anotar es tarea de utils.renderizado, fuera del hilo de inferencia.
+
+        Con `almacen` (AlmacenRecortes) los recortes se agregan a sus segmentos y
+        la base guarda la referencia a la mejor toma; sin él, se escribe un JPEG
+        por recorte en persona_X/Cuerpo (formato anterior).
+
+        `cargador_modelo` construye el modelo a partir de `ruta_modelo` cuando no
+        se pasa `modelo` (ver detectores.backends_modelo para ONNX/OpenVINO).
+
+        El estado por track vive en un RegistroTracks acotado (`ttl_track`,
+        `max_tracks`). Cuando el tracker da de baja un track (o vence), se guardan
+        sus mejores tomas y se libera su estado en zonas y descripciones.
+
+        Con `reidentificador` (Reidentificador, compartido entre cámaras), cada
+        track nuevo recibe un ID global por apariencia y ese ID es el que usan
+        zonas, alertas, descripciones, recortes y la base; sin él, el ID es el
+        del tracker, que vuelve a empezar con cada proceso.
+
+        Si el stream se corta, el detector (tracker incluido) sigue igual; la
+        captura avisa con `marcar_discontinuidad` y el primer resultado siguiente
+        lleva los segundos perdidos en `DeteccionFrame.discontinuidad`.
         """
-        self.modelo = YOLO(ruta_modelo)
-        
-        self.track_id_tiempo = {}  # Para controlar frecuencia de descripción por ID
-        self.intervalo_descripcion = 2  # segundos
+        self.modelo = modelo or cargador_modelo(ruta_modelo)
+        self.id_camara = id_camara
+        self.tracker = crear_tracker(config_tracker)
+        self.planificador_descripciones = planificador_descripciones
+        self.detectar_caras = detectar_caras
+        self.zonas = zonas or MotorZonas(cargar_zonas(None))
+        self.regiones = DetectorRegiones(modo_region, [z.poligono for z in self.zonas.zonas])
         self.carpeta_salida = carpeta_salida
         os.makedirs(self.carpeta_salida, exist_ok=True)
 
         self.funcion_alerta = funcion_alerta
-        self.executor = executor or ThreadPoolExecutor(max_workers=4)
-        self.detector_caras = DetectorCaras(self.carpeta_salida, self.executor, database)
+        self.executor = executor or EjecutorPorClases()
+        self.detector_caras = detector_caras or DetectorCaras(self.carpeta_salida, self.executor, database,
+                                                              cargador_modelo=cargador_modelo, id_camara=id_camara)
 
         self.db = database
+        self.almacen = almacen
+        self.mejor_toma = SelectorMejorToma(self.guardar_tomas, k=tomas_por_track, intervalo_guardado=intervalo_guardado,
+                                            tiempo_perdido=None)
+        self.tracks = RegistroTracks(ttl_track, max_tracks)
+        self.tracks.al_cerrar(self._track_cerrado)
+        self.tracks.al_abrir(self._track_abierto)
+        self.reidentificador = reidentificador
+        self._ids_globales = {}  # ID del tracker -> ID global, solo de tracks abiertos
+        self._vigentes = set()  # IDs que seguía el tracker tras el frame anterior
+        self._discontinuidad = 0.0  # Segundos sin frames aún no informados en un resultado
+        self._lock_discontinuidad = Lock()
+        self.stream_alta = None
+
+        self._m_inferencia = _INFERENCIA.con(camara=id_camara)
+        self._m_tracking = _TRACKING.con(camara=id_camara)
+        self._m_procesamiento = _PROCESAMIENTO.con(camara=id_camara)
+        self._m_personas = _PERSONAS.con(camara=id_camara)
+
+    def finalizar(self):
+        """
+        Guarda las mejores tomas pendientes de todos los tracks. Usar al cerrar.
+        """
+        self.tracks.vaciar()
+        self.mejor_toma.vaciar()
 
-    def cortar_y_guardar(self, frame, caja, id_persona):
+    def marcar_discontinuidad(self, segundos):
         """
-        Recorta la región de la persona detectada, guarda la imagen y la registra.
+        Registra un corte del stream de `segundos` sin frames. El tracker cuenta
+        frames, no tiempo: para él los frames de antes y después del corte son
+        consecutivos, así que un ID puede pasar a otra persona o cortarse. El
+        próximo DeteccionFrame lo informa en `discontinuidad`.
 
-        Retorna:
-            np.array: Imagen recortada
+        Se llama desde el hilo de captura.
+        """
+        with self._lock_discontinuidad:
+            self._discontinuidad = max(self._discontinuidad, segundos)
+
+    def _tomar_discontinuidad(self):
+        with self._lock_discontinuidad:
+            segundos, self._discontinuidad = self._discontinuidad, 0.0
+        return segundos
+
+    def _track_abierto(self, estado):
+        # Fila de la persona con su cámara y hora de aparición (búsquedas por cámara y horario)
+        self.executor.enviar("db", self.db.registrar_track, estado.id_persona, self.id_camara, estado.id_track,
+                             estado.primer_visto, clave=("track", self.id_camara, estado.id_persona))
+
+    def _track_cerrado(self, estado, motivo):
+        id_persona = estado.id_persona
+        if self.reidentificador:
+            self._ids_globales.pop(estado.id_track, None)
+            # La mejor toma del track queda en el índice para reconocerlo si vuelve
+            mejor = self.mejor_toma.mejor(id_persona)
+            if mejor is not None:
+                self.reidentificador.registrar(id_persona, mejor[1], estado.ultimo_visto)
+        self.mejor_toma.cerrar_track(id_persona)
+        self.zonas.olvidar(id_persona)
+        if self.planificador_descripciones:
+            self.planificador_descripciones.olvidar(id_persona, id_camara=self.id_camara)
+
+    def _identificar(self, frame, cajas, ids_track, ahora):
+        """
+        Traduce los IDs del tracker a IDs globales. Solo los tracks nuevos pasan
+        por el reidentificador (con el recorte de su primera aparición).
         """
-        x1, y1, x2, y2 = map(int, caja)
-        imagen = frame[y1:y2, x1:x2]
+        ids = []
+        for caja, id_track in zip(cajas, ids_track):
+            id_global = self._ids_globales.get(id_track, -1) if id_track != -1 else -1
+            if id_track != -1 and id_global == -1:
+                x1, y1, x2, y2 = caja
+                recorte = frame[max(y1, 0):y2, max(x1, 0):x2]
+                if recorte.size:
+                    id_global = self.reidentificador.identificar(recorte, ahora, excluir=self.tracks)
+                    self._ids_globales[id_track] = id_global
+                    self.tracks.tocar(id_global, ahora, id_track)
+            ids.append(id_global)
+        return ids
+
+    def guardar_tomas(self, id_persona, tomas):
+        """
+        Guarda los mejores recortes de un track y registra su carpeta en la base de datos.
+
+        Parámetros:
+            id_persona (int): ID del track.
+            tomas (list[tuple]): Pares (puntaje, imagen) elegidos por el selector de mejor toma.
+        """
+        if self.almacen:
+            self.executor.enviar("imagenes", self._guardar_en_almacen, id_persona, tomas)
+            return
 
         carpeta_persona = os.path.join(self.carpeta_salida, f"persona_{id_persona}")
-        os.makedirs(carpeta_persona, exist_ok=True)
 
         #Guarda la ruta de la carpeta con las imagenes del cuerpo en la base de datos
         ruta_cuerpo = os.path.join(carpeta_persona, "Cuerpo")
 
-        self.executor.submit(self.db.guardar_imagen_cuerpo, id_persona, ruta_cuerpo)    
+        self.executor.enviar("db", self.db.guardar_imagen_cuerpo, id_persona, ruta_cuerpo,
+                             id_camara=self.id_camara, clave=("cuerpo", self.id_camara, id_persona))
         #Guarda las imagenes del cuerpo en una carpeta local
-        self.executor.submit(iu.guardar_imagen, imagen, id_persona, self.carpeta_salida, "Cuerpo")
+        for _, imagen in tomas:
+            self.executor.enviar("imagenes", iu.guardar_imagen, imagen, id_persona, self.carpeta_salida, "Cuerpo")
 
-        return imagen
+    def _guardar_en_almacen(self, id_persona, tomas):
+        # Las tomas vienen de mejor a peor: la base apunta a la primera
+        referencias = [self.almacen.guardar(imagen, id_persona, "Cuerpo") for _, imagen in tomas]
+        if referencias and referencias[0]:
+            self.executor.enviar("db", self.db.guardar_imagen_cuerpo, id_persona, referencias[0],
+                                 id_camara=self.id_camara, clave=("cuerpo", self.id_camara, id_persona))
 
-    def procesar_frame(self, frame):
+    def procesar_frame(self, frame, modelo=None, instante=None):
         """
         Procesa un frame para detectar personas, cortar sus imágenes, describirlas
-        y detectar sus rostros.
+        y detectar sus rostros. El frame no se modifica.
+
+        Parámetros:
+            frame (np.array): Imagen BGR a procesar.
+            modelo (YOLO | None): Modelo a usar en lugar de `self.modelo`. Lo usa el
+                                  supervisor para repartir la inferencia entre sus hilos.
+            instante (float | None): Hora de captura del frame (alineación con `stream_alta`).
 
         Retorna:
-            np.array: Frame con anotaciones visuales
+            DeteccionFrame: Cajas, IDs, clases, pertenencia a zonas y caras.
+        """
+        modelo = modelo or self.modelo
+        with self._m_inferencia.cronometrar():
+            resultados = modelo.predict(self.regiones.preparar(frame), conf=CONFIANZA_MIN, iou=IOU_NMS, verbose=False)
+        if not resultados:
+            return self.sin_detecciones()
+
+        resultado = self.regiones.combinar(frame, resultados)
+        if resultado.boxes is None:
+            return self.sin_detecciones()
+        return self.procesar_resultado(frame, resultado, instante)
+
+    def sin_detecciones(self):
+        """
+        Resultado de un frame en el que el modelo no devolvió cajas.
         """
-        resultados = self.modelo.track(frame, conf=0.7, iou=0.5, tracker="botsort.yaml", persist=True, verbose=False)
-        if not resultados or resultados[0].boxes is None:
-            return frame
+        ahora = time.time()
+        self.tracks.barrer(ahora)
+        self.mejor_toma.revisar(ahora)
+        return deteccion_vacia(ahora, len(self.zonas.zonas), self._tomar_discontinuidad())
+
+    def procesar_resultado(self, frame, resultado, instante=None):
+        """
+        Aplica el tracker de esta cámara a un resultado de detección y procesa
+        cada persona (recorte, alerta, rostro).
+
+        Retorna:
+            DeteccionFrame
+        """
+        inicio = time.perf_counter()
+        with self._m_tracking.cronometrar():
+            resultado = actualizar_tracker(self.tracker, resultado)
 
         # Extraer datos de detección
-        cajas = resultados[0].boxes.xyxy.int().cpu().tolist()
-        clases = resultados[0].boxes.cls.int().cpu().tolist()
-        ids = resultados[0].boxes.id.int().cpu().tolist() if resultados[0].boxes.id is not None else [-1] * len(cajas)
-
-        for caja, clase, id_persona in zip(cajas, clases, ids):
-            x1, y1, x2, y2 = map(int, caja)
-
-            # Dibujar caja de persona
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-            cv2.putText(frame, f"{self.modelo.names[clase]} ID:{id_persona}", (x1, y1 - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
-
-            # Recortar y guardar imagen
-            imagen = self.cortar_y_guardar(frame, caja, id_persona)
-
-            # Verificar si el centro del bbox está dentro del área definida
-            cx = (x1 + x2) // 2
-            cy = (y1 + y2) // 2
-            dentro_del_area = (860 <= cx <= 1640) and (550 <= cy <= 1000)
-
-            # Llamar a la función de alerta
-            self.executor.submit(self.funcion_alerta,id_persona, imagen, dentro_del_area)
-
-            # Detección de rostro en el recorte
-            #self.executor.submit(self.detector_caras.detectar_caras_en_imagen, imagen, id_persona)
-            #resultado = self.detector_caras.detectar_caras_en_imagen(imagen, id_persona)
-            """
-            if resultado:
-                cx1, cy1, cx2, cy2 = resultado
-                cx1 += caja[0]; cy1 += caja[1]; cx2 += caja[0]; cy2 += caja[1]  # Ajustar a coordenadas globales
-                cv2.rectangle(frame, (cx1, cy1), (cx2, cy2), (0, 255, 0), 2)
-                cv2.putText(frame, f"Cara ID:{id_persona}", (cx1, cy1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-            
-            """
-        return frame
+        cajas = resultado.boxes.xyxy.int().cpu().tolist()
+        clases = resultado.boxes.cls.int().cpu().tolist()
+        ids = resultado.boxes.id.int().cpu().tolist() if resultado.boxes.id is not None else [-1] * len(cajas)
+        ahora = time.time()
+        if self.reidentificador:
+            ids = self._identificar(frame, cajas, ids, ahora)
+
+        # Calidad de cada recorte (nitidez, tamaño, oclusión, bordes) en una sola pasada
+        puntajes = puntuar_cajas(frame, cajas)
+
+        # Pertenencia de todas las cajas a todas las zonas en una sola operación
+        dentro_zonas, eventos_zona = self.zonas.actualizar(ids, cajas, ahora)
+        en_alguna_zona = dentro_zonas.any(axis=1)
+
+        # Una sola actualización de alertas por frame
+        self.funcion_alerta(self.id_camara, ahora, ids, en_alguna_zona.tolist(), eventos_zona)
+
+        # Zonas de cada caja como un entero (bit i = zona i)
+        bits_zonas = np.packbits(dentro_zonas, axis=1, bitorder="little")
+
+        # Recortes del stream principal si está alineado; si no, del mismo frame
+        frame_recortes, cajas_recortes = frame, cajas
+        if self.stream_alta is not None and cajas:
+            self.stream_alta.activar()
+            alta = self.stream_alta.frame_en(instante) if instante is not None else None
+            if alta is not None:
+                frame_recortes, cajas_recortes = alta, escalar_cajas(cajas, frame.shape, alta.shape)
+
+        for caja, caja_recorte, id_persona, puntaje, bits in zip(cajas, cajas_recortes, ids, puntajes, bits_zonas):
+            if id_persona == -1:
+                continue
+            estado = self.tracks.tocar(id_persona, ahora)
+            estado.caja = caja
+            estado.zonas = int.from_bytes(bits.tobytes(), "little")
+
+            # Candidato a mejor toma del track
+            if self.mejor_toma.ofrecer(id_persona, frame_recortes, caja_recorte, puntaje, ahora):
+                estado.mejor_puntaje = max(estado.mejor_puntaje, float(puntaje))
+                if self.planificador_descripciones and not estado.descrito:
+                    estado.descrito = self.planificador_descripciones.descrito(id_persona, id_camara=self.id_camara)
+                    if not estado.descrito:
+                        puntaje_mejor, imagen_mejor = self.mejor_toma.mejor(id_persona)
+                        self.planificador_descripciones.solicitar(id_persona, imagen_mejor, puntaje_mejor,
+                                                                  id_camara=self.id_camara)
+
+        # Detección de rostros: todos los recortes del frame en un solo lote
+        caras = {}
+        if self.detectar_caras:
+            caras = self.detector_caras.detectar_caras_en_lote(frame_recortes, cajas_recortes, ids, self.tracks)
+            if frame_recortes is not frame and caras:
+                # Las caras se informan en coordenadas del frame de detección
+                caras = dict(zip(caras, escalar_cajas(caras.values(), frame_recortes.shape, frame.shape)))
+
+        # Tracks que el tracker dio de baja en este frame o que vencieron: se guardan y se liberan
+        vigentes = ids_vigentes(self.tracker)
+        dados_de_baja = self._vigentes - vigentes
+        self._vigentes = vigentes
+        if self.reidentificador:
+            dados_de_baja = [self._ids_globales[i] for i in dados_de_baja if i in self._ids_globales]
+        self.tracks.barrer(ahora, dados_de_baja)
+        self.mejor_toma.revisar(ahora)
+        self._m_personas.incrementar(len(cajas))
+        self._m_procesamiento.observar(time.perf_counter() - inicio)
+        return DeteccionFrame(ahora, cajas, ids, clases, resultado.names, dentro_zonas, caras,
+                              self._tomar_discontinuidad())
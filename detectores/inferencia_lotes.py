@@ -0,0 +1,115 @@
+import time
+from queue import Empty
+from detectores.detector_personas import CONFIANZA_MIN, IOU_NMS
+from utils.metricas import metricas
+
+_INFERENCIA_LOTE = metricas.histograma("inferencia_lote_segundos", "Tiempo de YOLO por lote")
+_TAM_LOTE = metricas.histograma("tam_lote", "Imágenes por lote", cubetas=(1, 2, 4, 8, 16, 32, 64))
+
+class InferenciaPorLotes:
+    def __init__(self, modelo, tam_lote_max=8, espera_max=0.02):
+        """
+        Agrupa frames de varias cámaras (o varios instantes de una misma cámara)
+        y los pasa por YOLO en una sola llamada.
+
+        Parámetros:
+            modelo (YOLO): Modelo de detección (uno por hilo trabajador).
+            tam_lote_max (int): Máximo de frames por lote.
+            espera_max (float): Segundos máximos a esperar para completar un lote
+                                desde que llega el primer frame.
+        """
+        self.modelo = modelo
+        self.tam_lote_max = tam_lote_max
+        self.espera_max = espera_max
+
+        self.lotes_procesados = 0
+        self.frames_procesados = 0
+        self.tiempo_inferencia = 0.0
+        self.tiempo_espera = 0.0  # Desde el primer frame de cada lote hasta cerrarlo
+
+    def recolectar(self, cola):
+        """
+        Bloquea hasta recibir un elemento y luego sigue tomando elementos de la
+        cola hasta llenar el lote o agotar `espera_max`.
+
+        Retorna:
+            list: Elementos recolectados. Un `None` recibido (señal de cierre) se
+                  devuelve como último elemento de la lista.
+        """
+        primero = cola.get()
+        lote = [primero]
+        if primero is None:
+            return lote
+
+        inicio = time.monotonic()
+        limite = inicio + self.espera_max
+        while len(lote) < self.tam_lote_max:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                item = cola.get(timeout=restante)
+            except Empty:
+                break
+            lote.append(item)
+            if item is None:
+                break
+        self.tiempo_espera += time.monotonic() - inicio
+        return lote
+
+    def inferir(self, frames):
+        """
+        Ejecuta una única pasada del modelo sobre todos los frames.
+
+        Retorna:
+            list[Results]: Un resultado por frame, en el mismo orden.
+        """
+        if not frames:
+            return []
+
+        inicio = time.perf_counter()
+        resultados = self.modelo.predict(list(frames), conf=CONFIANZA_MIN, iou=IOU_NMS, verbose=False)
+        duracion = time.perf_counter() - inicio
+        self.tiempo_inferencia += duracion
+        _INFERENCIA_LOTE.observar(duracion)
+        _TAM_LOTE.observar(len(frames))
+
+        self.lotes_procesados += 1
+        self.frames_procesados += len(frames)
+        return resultados
+
+    def inferir_regiones(self, items):
+        """
+        Como `inferir`, pero cada frame aporta al lote los recortes de su
+        DetectorRegiones (ROI o mosaicos) y los resultados se recombinan por frame.
+
+        Parámetros:
+            items (list[tuple]): Pares (DetectorRegiones, frame).
+
+        Retorna:
+            list[Results]: Un resultado por frame, en coordenadas del frame completo.
+        """
+        recortes = [regiones.preparar(frame) for regiones, frame in items]
+        salidas = self.inferir([r for lista in recortes for r in lista])
+
+        resultados = []
+        desde = 0
+        for (regiones, frame), lista in zip(items, recortes):
+            resultados.append(regiones.combinar(frame, salidas[desde:desde + len(lista)]))
+            desde += len(lista)
+        return resultados
+
+    def estadisticas(self):
+        """
+        Retorna:
+            dict: Lotes y frames procesados, tamaño medio de lote, y milisegundos
+                  medios de inferencia y de espera para completar cada lote.
+        """
+        lotes = self.lotes_procesados or 1
+        return {
+            "lotes": self.lotes_procesados,
+            "frames": self.frames_procesados,
+            "tam_lote_medio": self.frames_procesados / lotes,
+            "ms_por_lote": 1000 * self.tiempo_inferencia / lotes,
+            "ms_espera_lote": 1000 * self.tiempo_espera / lotes,
+        }
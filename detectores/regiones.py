@@ -0,0 +1,175 @@
+import torch, numpy as np
+
+MODOS = ("completo", "roi", "mosaico")
+
+def caja_envolvente(poligonos, forma_frame, margen=64, multiplo=32):
+    """
+    Rectángulo que contiene todos los polígonos, ampliado en `margen` píxeles y
+    alineado a `multiplo` (el paso del modelo) dentro de los límites del frame.
+
+    Retorna:
+        tuple: (x1, y1, x2, y2)
+    """
+    alto, ancho = forma_frame[:2]
+    if not len(poligonos):
+        return 0, 0, ancho, alto
+
+    puntos = np.concatenate([np.asarray(p, dtype=np.float32).reshape(-1, 2) for p in poligonos])
+    x1, y1 = puntos.min(axis=0) - margen
+    x2, y2 = puntos.max(axis=0) + margen
+    x1 = int(max(0, np.floor(x1 / multiplo) * multiplo))
+    y1 = int(max(0, np.floor(y1 / multiplo) * multiplo))
+    x2 = int(min(ancho, np.ceil(x2 / multiplo) * multiplo))
+    y2 = int(min(alto, np.ceil(y2 / multiplo) * multiplo))
+    return x1, y1, x2, y2
+
+def generar_mosaicos(region, tam=640, solape=0.2):
+    """
+    Divide una región en mosaicos cuadrados de `tam` píxeles que se solapan en
+    al menos una fracción `solape`, repartidos de forma pareja dentro de la región.
+
+    Retorna:
+        list[tuple]: Mosaicos (x1, y1, x2, y2).
+    """
+    x1, y1, x2, y2 = region
+    paso = max(1, int(tam * (1 - solape)))
+
+    def inicios(a, b):
+        if b - a <= tam:
+            return [a]
+        # Mosaicos repartidos de forma pareja entre el primero y el último
+        cantidad = int(np.ceil((b - a - tam) / paso)) + 1
+        return [int(round(v)) for v in np.linspace(a, b - tam, cantidad)]
+
+    return [(x, y, min(x + tam, x2), min(y + tam, y2)) for y in inicios(y1, y2) for x in inicios(x1, x2)]
+
+def nms(cajas, puntajes, umbral=0.5, criterio="ios"):
+    """
+    Supresión de no máximos en NumPy.
+
+    Con criterio 'ios' (intersección sobre la caja más chica) se eliminan también
+    las cajas parciales de una persona cortada por el borde de un mosaico, que
+    tienen IoU bajo con la caja completa.
+
+    Retorna:
+        np.array: Índices de las cajas que se conservan.
+    """
+    orden = np.argsort(-puntajes)
+    areas = (cajas[:, 2] - cajas[:, 0]) * (cajas[:, 3] - cajas[:, 1])
+    conservar = []
+    while len(orden):
+        i = orden[0]
+        conservar.append(i)
+        resto = orden[1:]
+        ix1 = np.maximum(cajas[i, 0], cajas[resto, 0])
+        iy1 = np.maximum(cajas[i, 1], cajas[resto, 1])
+        ix2 = np.minimum(cajas[i, 2], cajas[resto, 2])
+        iy2 = np.minimum(cajas[i, 3], cajas[resto, 3])
+        interseccion = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+        if criterio == "ios":
+            base = np.minimum(areas[i], areas[resto])
+        else:
+            base = areas[i] + areas[resto] - interseccion
+        solapamiento = interseccion / np.maximum(base, 1e-6)
+        orden = resto[solapamiento <= umbral]
+    return np.array(conservar, dtype=np.int64)
+
+class DetectorRegiones:
+    def __init__(self, modo="completo", poligonos=(), margen=64, tam_mosaico=640, solape=0.2,
+                 umbral_fusion=0.6, incluir_completo=True):
+        """
+        Decide qué parte del frame se pasa al modelo y devuelve las detecciones en
+        coordenadas del frame completo, listas para el tracker.
+
+        - 'completo': el frame entero (comportamiento histórico).
+        - 'roi': solo el rectángulo que envuelve las zonas monitoreadas más un
+          margen. Menos píxeles por inferencia y, al escalar un recorte más chico
+          al tamaño del modelo, las personas lejanas quedan más grandes.
+        - 'mosaico': la región se divide en mosaicos solapados que se infieren en
+          un solo lote; los resultados se fusionan con NMS. Si `incluir_completo`,
+          se agrega la región entera reducida para no partir a las personas grandes.
+
+        Parámetros:
+            modo (str): 'completo', 'roi' o 'mosaico'.
+            poligonos (list): Polígonos de las zonas (definen la región de interés).
+            margen (int): Píxeles que se agregan alrededor de las zonas.
+            tam_mosaico (int): Lado de cada mosaico, en píxeles del frame.
+            solape (float): Fracción de solapamiento entre mosaicos vecinos.
+            umbral_fusion (float): Umbral de la NMS (intersección sobre la caja menor).
+        """
+        if modo not in MODOS:
+            raise ValueError(f"Modo de detección desconocido: {modo} (usar {', '.join(MODOS)})")
+        self.modo = modo
+        self.poligonos = list(poligonos)
+        self.margen = margen
+        self.tam_mosaico = tam_mosaico
+        self.solape = solape
+        self.umbral_fusion = umbral_fusion
+        self.incluir_completo = incluir_completo
+
+        self._forma = None
+        self._ventanas = None  # recortes (x1, y1, x2, y2) para la forma de frame actual
+        self.pixeles_inferidos = 0
+
+    def ventanas(self, forma_frame):
+        """
+        Recortes a inferir para un frame de esta forma (se calculan una vez por resolución).
+        """
+        if forma_frame[:2] != self._forma:
+            self._forma = forma_frame[:2]
+            alto, ancho = self._forma
+            if self.modo == "completo":
+                self._ventanas = [(0, 0, ancho, alto)]
+            else:
+                region = caja_envolvente(self.poligonos, self._forma, self.margen) if self.poligonos else (0, 0, ancho, alto)
+                if self.modo == "roi":
+                    self._ventanas = [region]
+                else:
+                    mosaicos = generar_mosaicos(region, self.tam_mosaico, self.solape)
+                    if self.incluir_completo and len(mosaicos) > 1:
+                        mosaicos.append(region)
+                    self._ventanas = mosaicos
+        return self._ventanas
+
+    def preparar(self, frame):
+        """
+        Retorna:
+            list[np.array]: Recortes (vistas, sin copia) a pasar al modelo.
+        """
+        ventanas = self.ventanas(frame.shape)
+        self.pixeles_inferidos += sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in ventanas)
+        return [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in ventanas]
+
+    def combinar(self, frame, resultados):
+        """
+        Junta los resultados de los recortes de `preparar` en un único Results en
+        coordenadas del frame completo.
+
+        Parámetros:
+            frame (np.array): Frame original.
+            resultados (list[Results]): Un resultado por recorte, en el mismo orden.
+
+        Retorna:
+            Results
+        """
+        if self.modo == "completo":
+            return resultados[0]
+
+        partes = []
+        for (x1, y1, _, _), resultado in zip(self.ventanas(frame.shape), resultados):
+            if resultado.boxes is None or len(resultado.boxes) == 0:
+                continue
+            datos = resultado.boxes.data.cpu().numpy().copy()
+            datos[:, [0, 2]] += x1
+            datos[:, [1, 3]] += y1
+            partes.append(datos)
+
+        datos = np.concatenate(partes) if partes else np.zeros((0, 6), dtype=np.float32)
+        if len(partes) > 1:
+            datos = datos[nms(datos[:, :4], datos[:, 4], self.umbral_fusion)]
+
+        combinado = resultados[0]
+        combinado.orig_img = frame
+        combinado.orig_shape = frame.shape[:2]
+        combinado.update(boxes=torch.as_tensor(datos))
+        return combinado
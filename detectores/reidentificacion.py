@@ -0,0 +1,182 @@
+import cv2, json, os, time, numpy as np
+from threading import Lock
+from utils.indice_vectores import IndiceBruto, IndiceCuantizado
+from utils.metricas import metricas
+from utils.registro_modelos import registro
+
+EXTRACTORES = ("histograma", "yolo")
+
+_ASIGNACIONES = metricas.contador("reid_asignaciones_total", "IDs globales asignados a tracks nuevos", ["resultado"])
+_BUSQUEDA = metricas.histograma("reid_busqueda_segundos", "Tiempo de extraer el embedding y buscarlo en el índice")
+
+def _cargar_embedder_yolo():
+    from ultralytics import YOLO
+    return YOLO(os.getenv("MODELO_REID", "yolo11n-cls.pt"))
+
+# Clasificador YOLO usado como extractor de apariencia (se carga en su primer uso)
+registro.registrar("reid_yolo", _cargar_embedder_yolo, thread_safe=False)
+
+def embedding_histograma(imagen, franjas=4, bins=(8, 4)):
+    """
+    Embedding de apariencia liviano, sin modelo: histograma de tono y saturación
+    por franjas horizontales del recorte (cabeza, torso, piernas...). Distingue
+    por color de ropa; alcanza para reconectar una misma cámara en pocos minutos.
+
+    Retorna:
+        np.array: Vector float32 de franjas * bins[0] * bins[1] valores, norma 1.
+    """
+    hsv = cv2.cvtColor(cv2.resize(imagen, (32, 64), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2HSV)
+    partes = [cv2.calcHist([franja], [0, 1], None, list(bins), [0, 180, 0, 256]).ravel()
+              for franja in np.array_split(hsv, franjas, axis=0)]
+    # Raíz (Hellinger): que un color dominante no tape al resto
+    vector = np.sqrt(np.concatenate(partes))
+    return (vector / (np.linalg.norm(vector) or 1.0)).astype(np.float32)
+
+def embedding_yolo(imagen):
+    """
+    Embedding de apariencia con el clasificador YOLO de MODELO_REID (penúltima capa).
+    """
+    with registro.usar("reid_yolo") as modelo:
+        vector = modelo.embed(imagen, verbose=False)[0]
+    vector = vector.cpu().numpy().astype(np.float32).ravel()
+    return vector / (np.linalg.norm(vector) or 1.0)
+
+def crear_indice(tipo="bruto", **kwargs):
+    """
+    Parámetros:
+        tipo (str): 'bruto' (exacto, sitios chicos) o 'cuantizado' (IVF, sitios grandes).
+    """
+    if tipo == "bruto":
+        return IndiceBruto(**kwargs)
+    if tipo == "cuantizado":
+        return IndiceCuantizado(**kwargs)
+    raise ValueError(f"Índice de re-identificación desconocido: {tipo}")
+
+class Reidentificador:
+    def __init__(self, extractor="histograma", indice=None, ventana=600.0, similitud_min=0.85,
+                 ruta_estado=None, bloque_ids=1000):
+        """
+        Asigna IDs globales de persona a los tracks, estables entre reconexiones y
+        reinicios: cada track nuevo se compara por apariencia con las identidades
+        vistas en los últimos `ventana` segundos y, si se parece lo suficiente a
+        una que no está activa en la misma cámara, hereda su ID; si no, recibe
+        uno nuevo.
+
+        Los IDs nuevos salen de bloques reservados en `ruta_estado`, así un
+        reinicio nunca repite IDs ya escritos en la base (los IDs del tracker
+        vuelven a empezar en 1 con cada proceso). Compartido entre cámaras y
+        thread-safe.
+
+        Parámetros:
+            extractor (str | callable): 'histograma', 'yolo' o una función imagen -> vector.
+            indice (IndiceBruto | IndiceCuantizado | None): Dónde buscar (por defecto, bruto).
+            ventana (float): Segundos durante los que una identidad se puede reasignar.
+            similitud_min (float): Similitud coseno mínima para reutilizar un ID.
+            ruta_estado (str | None): JSON donde se reservan los bloques de IDs.
+            bloque_ids (int): IDs reservados por cada escritura de `ruta_estado`.
+        """
+        if callable(extractor):
+            self.extraer = extractor
+        elif extractor in EXTRACTORES:
+            self.extraer = embedding_histograma if extractor == "histograma" else embedding_yolo
+        else:
+            raise ValueError(f"Extractor de re-identificación desconocido: {extractor}")
+        self.indice = indice if indice is not None else IndiceBruto()
+        self.ventana = ventana
+        self.similitud_min = similitud_min
+        self.ruta_estado = ruta_estado
+        self.bloque_ids = bloque_ids
+
+        self._lock = Lock()
+        self._siguiente_id = self._leer_estado()
+        self._reservado = self._siguiente_id
+        self._ultima_limpieza = 0.0
+
+        self.nuevos = 0
+        self.reidentificados = 0
+
+    def identificar(self, imagen, ahora=None, excluir=()):
+        """
+        ID global para un track nuevo a partir de un recorte suyo.
+
+        Parámetros:
+            imagen (np.array): Recorte BGR de la persona.
+            ahora (float | None): Instante del frame.
+            excluir (container): IDs globales ya activos en la cámara del track
+                                 (no se pueden reasignar).
+
+        Retorna:
+            int: ID global.
+        """
+        ahora = ahora or time.time()
+        inicio = time.perf_counter()
+        vector = self.extraer(imagen)
+        with self._lock:
+            self._limpiar(ahora)
+            id_global = None
+            for candidato, similitud in self.indice.buscar(vector, k=10, desde=ahora - self.ventana):
+                if similitud < self.similitud_min:
+                    break
+                if candidato not in excluir:
+                    id_global = candidato
+                    break
+
+            if id_global is None:
+                id_global = self._nuevo_id()
+                self.nuevos += 1
+                _ASIGNACIONES.con(resultado="nuevo").incrementar()
+            else:
+                self.reidentificados += 1
+                _ASIGNACIONES.con(resultado="reidentificado").incrementar()
+            self.indice.agregar(id_global, vector, ahora)
+        _BUSQUEDA.observar(time.perf_counter() - inicio)
+        return id_global
+
+    def registrar(self, id_global, imagen, ahora=None):
+        """
+        Agrega al índice la apariencia de un track (p. ej. su mejor toma al
+        cerrarse), para reconocerlo si vuelve a aparecer dentro de la ventana.
+        """
+        vector = self.extraer(imagen)
+        with self._lock:
+            self.indice.agregar(id_global, vector, ahora or time.time())
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                "nuevos": self.nuevos,
+                "reidentificados": self.reidentificados,
+                "siguiente_id": self._siguiente_id,
+                **self.indice.estadisticas(),
+            }
+
+    def _limpiar(self, ahora):
+        if ahora - self._ultima_limpieza >= 60.0:
+            self.indice.olvidar_antes(ahora - self.ventana)
+            self._ultima_limpieza = ahora
+
+    def _nuevo_id(self):
+        if self._siguiente_id >= self._reservado:
+            self._reservado = self._siguiente_id + self.bloque_ids
+            self._guardar_estado()
+        id_global = self._siguiente_id
+        self._siguiente_id += 1
+        return id_global
+
+    def _leer_estado(self):
+        if not self.ruta_estado or not os.path.exists(self.ruta_estado):
+            return 1
+        try:
+            with open(self.ruta_estado, "r", encoding="utf-8") as f:
+                return int(json.load(f)["reservado"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[ERROR] No se pudo leer el estado de re-identificación: {e}")
+            return 1
+
+    def _guardar_estado(self):
+        if not self.ruta_estado:
+            return
+        temporal = self.ruta_estado + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump({"reservado": self._reservado}, f)
+        os.replace(temporal, self.ruta_estado)
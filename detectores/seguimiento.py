@@ -0,0 +1,56 @@
+import torch
+from ultralytics.trackers.bot_sort import BOTSORT
+from ultralytics.utils import IterableSimpleNamespace, yaml_load
+from ultralytics.utils.checks import check_yaml
+
+def crear_tracker(config_tracker="botsort.yaml", frame_rate=30):
+    """
+    Crea una instancia independiente de BoT-SORT.
+
+    Permite que varias cámaras compartan el mismo modelo YOLO manteniendo
+    cada una su propio estado de seguimiento.
+
+    Parámetros:
+        config_tracker (str): Archivo YAML de configuración del tracker.
+        frame_rate (int): FPS de referencia para el buffer de tracks perdidos.
+
+    Retorna:
+        BOTSORT: Tracker listo para recibir detecciones.
+    """
+    cfg = IterableSimpleNamespace(**yaml_load(check_yaml(config_tracker)))
+    return BOTSORT(args=cfg, frame_rate=frame_rate)
+
+def actualizar_tracker(tracker, resultado):
+    """
+    Aplica el tracker a un resultado de `modelo.predict` (equivalente a lo que
+    hace internamente `modelo.track(..., persist=True)`).
+
+    Parámetros:
+        tracker (BOTSORT): Estado de seguimiento de la cámara.
+        resultado (Results): Resultado de YOLO para un único frame.
+
+    Retorna:
+        Results: Resultado con las cajas reemplazadas por los tracks (con ID).
+    """
+    det = resultado.boxes.cpu().numpy()
+    if len(det) == 0:
+        return resultado
+
+    tracks = tracker.update(det, resultado.orig_img)
+    if len(tracks) == 0:
+        return resultado
+
+    idx = tracks[:, -1].astype(int)
+    resultado = resultado[idx]
+    resultado.update(boxes=torch.as_tensor(tracks[:, :-1]))
+    return resultado
+
+def ids_vigentes(tracker):
+    """
+    IDs que el tracker todavía sigue: activos y perdidos que aún puede recuperar.
+    Un ID que ya no está acá fue dado de baja y no vuelve a aparecer.
+
+    Retorna:
+        set[int]
+    """
+    return {t.track_id for t in tracker.tracked_stracks} | {t.track_id for t in tracker.lost_stracks}
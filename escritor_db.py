@@ -0,0 +1,278 @@
+import time
+from threading import Thread, Condition
+from utils.metricas import metricas
+
+_ESCRITURA = metricas.histograma("db_escritura_segundos", "Latencia de cada escritura en lote", ["tabla"])
+_FILAS = metricas.contador("db_filas_escritas_total", "Filas escritas por el escritor diferido", ["tabla"])
+_ERRORES = metricas.contador("db_errores_total", "Escrituras en lote fallidas", ["tabla"])
+_DESCARTADAS = metricas.contador("db_filas_descartadas_total", "Filas descartadas tras agotar los reintentos", ["tabla"])
+
+class EscritorDiferido:
+    def __init__(self, nombre_tabla, obtener_conexion, max_filas=200, intervalo_ms=500,
+                 max_pendientes=10000, clave="ID", dialecto="mysql", max_reintentos=5,
+                 espera_reintento=0.5, espera_reintento_max=10.0):
+        """
+        Acumula upserts en memoria y los escribe en lotes desde un hilo propio.
+
+        Las actualizaciones sobre un mismo ID se fusionan antes de escribir, así
+        que varias rutas/descripciones de una persona terminan en una sola fila.
+        El lote se escribe al juntar `max_filas` IDs o cada `intervalo_ms`.
+
+        Si un lote falla (error de MySQL, pool de conexiones agotado), sus filas
+        vuelven a la cola fusionadas con lo que haya llegado mientras tanto y se
+        reintentan con espera exponencial. Una fila que falla `max_reintentos`
+        veces se descarta y se cuenta en `filas_descartadas`.
+
+        Parámetros:
+            nombre_tabla (str): Tabla destino.
+            obtener_conexion (callable): Devuelve una conexión DB-API (del pool).
+            max_filas (int): IDs pendientes que disparan una escritura inmediata.
+            intervalo_ms (int): Tiempo máximo que una fila espera antes de escribirse.
+            max_pendientes (int): Límite de IDs en memoria. Al alcanzarlo `encolar` bloquea.
+            clave (str | tuple): Columna(s) de la clave primaria. Con varias, `id_fila`
+                                 es una tupla con sus valores en el mismo orden.
+            dialecto (str): 'mysql' o 'sqlite' (para pruebas locales).
+            max_reintentos (int): Reintentos de una fila antes de descartarla.
+            espera_reintento (float): Espera tras el primer lote fallido, en segundos;
+                                      se duplica con cada fallo seguido.
+            espera_reintento_max (float): Tope de esa espera.
+        """
+        self.nombre_tabla = nombre_tabla
+        self.obtener_conexion = obtener_conexion
+        self.max_filas = max_filas
+        self.intervalo = intervalo_ms / 1000.0
+        self.max_pendientes = max_pendientes
+        self.clave = (clave,) if isinstance(clave, str) else tuple(clave)
+        self.dialecto = dialecto
+        self.max_reintentos = max_reintentos
+        self.espera_reintento = espera_reintento
+        self.espera_reintento_max = espera_reintento_max
+
+        self._pendientes = {}  # id -> {columna: valor}
+        self._intentos = {}    # id -> escrituras fallidas de esa fila
+        self._fallos_seguidos = 0
+        self._reintentar_desde = 0.0  # No se escribe antes de este instante (monotonic)
+        self._cond = Condition()
+        self._escribiendo = False
+        self._forzar = False
+        self._cerrado = False
+
+        self.filas_escritas = 0
+        self.actualizaciones_fusionadas = 0
+        self.lotes = 0
+        self.errores = 0
+        self.reintentos = 0
+        self.filas_descartadas = 0
+        self.ultimo_lote = 0
+        self.latencia_ultima = 0.0
+        self.latencia_max = 0.0
+        self.latencia_total = 0.0
+
+        self._hilo = Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def encolar(self, id_fila, valores, timeout=None):
+        """
+        Agrega (o fusiona) un upsert para `id_fila`.
+
+        Parámetros:
+            id_fila: Valor de la clave primaria.
+            valores (dict): {columna: valor} a actualizar.
+            timeout (float | None): Espera máxima si la cola está llena.
+
+        Retorna:
+            bool: False si la cola siguió llena tras `timeout` o el escritor está cerrado.
+        """
+        if not valores:
+            return True
+
+        with self._cond:
+            if self._cerrado:
+                return False
+            if id_fila not in self._pendientes and len(self._pendientes) >= self.max_pendientes:
+                self._cond.notify_all()
+                if not self._cond.wait_for(lambda: len(self._pendientes) < self.max_pendientes or self._cerrado, timeout):
+                    print(f"[ERROR BD] Cola de escritura llena, se descarta ID {id_fila}")
+                    return False
+
+            fila = self._pendientes.get(id_fila)
+            if fila is None:
+                self._pendientes[id_fila] = dict(valores)
+            else:
+                fila.update(valores)
+                self.actualizaciones_fusionadas += 1
+
+            if len(self._pendientes) >= self.max_filas:
+                self._cond.notify_all()
+            return True
+
+    def flush(self, timeout=None):
+        """
+        Fuerza la escritura de todo lo pendiente y espera a que termine (con
+        los reintentos que hagan falta).
+
+        Retorna:
+            bool: True si todo se escribió; False si venció `timeout` o si se
+                  descartaron filas mientras se esperaba.
+        """
+        with self._cond:
+            descartadas = self.filas_descartadas
+            self._forzar = True
+            self._cond.notify_all()
+            vacio = self._cond.wait_for(lambda: not self._pendientes and not self._escribiendo, timeout)
+            return vacio and self.filas_descartadas == descartadas
+
+    def close(self, timeout=10):
+        """
+        Escribe lo pendiente y detiene el hilo escritor.
+
+        Retorna:
+            int: Filas que no se escribieron: las descartadas tras agotar los
+                 reintentos más las que seguían pendientes al cerrar.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._cerrado = True
+            self._cond.notify_all()
+        self._hilo.join(timeout)
+        with self._cond:
+            no_escritas = self.filas_descartadas + len(self._pendientes)
+        if no_escritas:
+            print(f"[ERROR BD] {no_escritas} filas de '{self.nombre_tabla}' no se escribieron")
+        return no_escritas
+
+    def estadisticas(self):
+        with self._cond:
+            lotes = self.lotes or 1
+            return {
+                "pendientes": len(self._pendientes),
+                "filas_escritas": self.filas_escritas,
+                "actualizaciones_fusionadas": self.actualizaciones_fusionadas,
+                "lotes": self.lotes,
+                "errores": self.errores,
+                "reintentos": self.reintentos,
+                "filas_descartadas": self.filas_descartadas,
+                "ultimo_lote": self.ultimo_lote,
+                "filas_por_lote": self.filas_escritas / lotes,
+                "latencia_ms_ultima": 1000 * self.latencia_ultima,
+                "latencia_ms_media": 1000 * self.latencia_total / lotes,
+                "latencia_ms_max": 1000 * self.latencia_max,
+            }
+
+    def _bucle(self):
+        while True:
+            with self._cond:
+                limite = time.monotonic() + self.intervalo
+                while True:
+                    ahora = time.monotonic()
+                    if ahora < self._reintentar_desde:
+                        # Espera tras un lote fallido, también con flush o cierre pendientes
+                        self._cond.wait(self._reintentar_desde - ahora)
+                        continue
+                    if (self._cerrado or self._forzar or len(self._pendientes) >= self.max_filas or ahora >= limite
+                            or (self._fallos_seguidos and self._pendientes)):
+                        break
+                    self._cond.wait(limite - ahora)
+
+                if self._cerrado and not self._pendientes:
+                    return
+
+                lote, self._pendientes = self._pendientes, {}
+                self._forzar = False
+                self._escribiendo = bool(lote)
+                self._cond.notify_all()  # Libera productores bloqueados por cola llena
+
+            if lote:
+                escrito = self._escribir(lote)
+                with self._cond:
+                    if escrito:
+                        self._fallos_seguidos = 0
+                        for id_fila in lote:
+                            self._intentos.pop(id_fila, None)
+                    else:
+                        self._reencolar(lote)
+                    self._escribiendo = False
+                    self._cond.notify_all()
+
+    def _reencolar(self, lote):
+        # Con el lock tomado. Lo que llegó durante la escritura fallida es más
+        # nuevo: se aplica encima de lo que no se pudo escribir.
+        self._fallos_seguidos += 1
+        espera = min(self.espera_reintento_max, self.espera_reintento * 2 ** (self._fallos_seguidos - 1))
+        self._reintentar_desde = time.monotonic() + espera
+        descartadas = 0
+        for id_fila, valores in lote.items():
+            intentos = self._intentos.get(id_fila, 0) + 1
+            if intentos > self.max_reintentos:
+                self._intentos.pop(id_fila, None)
+                descartadas += 1
+                continue
+            self._intentos[id_fila] = intentos
+            fila = dict(valores)
+            fila.update(self._pendientes.get(id_fila, {}))
+            self._pendientes[id_fila] = fila
+            self.reintentos += 1
+
+        if descartadas:
+            self.filas_descartadas += descartadas
+            _DESCARTADAS.con(tabla=self.nombre_tabla).incrementar(descartadas)
+            print(f"[ERROR BD] Se descartan {descartadas} filas tras {self.max_reintentos} reintentos")
+
+    def _escribir(self, lote):
+        # executemany necesita la misma sentencia: se agrupan filas por conjunto de columnas
+        grupos = {}
+        for id_fila, valores in lote.items():
+            columnas = tuple(sorted(valores))
+            clave = id_fila if len(self.clave) > 1 else (id_fila,)
+            grupos.setdefault(columnas, []).append(tuple(clave) + tuple(valores[c] for c in columnas))
+
+        inicio = time.perf_counter()
+        conn = None
+        try:
+            conn = self.obtener_conexion()
+            cursor = conn.cursor()
+            for columnas, filas in grupos.items():
+                cursor.executemany(self._sql_upsert(columnas), filas)
+            conn.commit()
+            cursor.close()
+            escritas = len(lote)
+        except Exception as err:
+            # Incluye PoolError: con el pool agotado mysql.connector falla en lugar de esperar
+            print(f"[ERROR BD] Escritura en lote de {len(lote)} filas (se reintentará): {err}")
+            self.errores += 1
+            escritas = 0
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+        latencia = time.perf_counter() - inicio
+        _ESCRITURA.con(tabla=self.nombre_tabla).observar(latencia)
+        _FILAS.con(tabla=self.nombre_tabla).incrementar(escritas)
+        if not escritas:
+            _ERRORES.con(tabla=self.nombre_tabla).incrementar()
+        with self._cond:
+            self.lotes += 1
+            self.filas_escritas += escritas
+            self.ultimo_lote = len(lote)
+            self.latencia_ultima = latencia
+            self.latencia_total += latencia
+            self.latencia_max = max(self.latencia_max, latencia)
+        return escritas > 0
+
+    def _sql_upsert(self, columnas):
+        todas = self.clave + columnas
+        nombres = ", ".join(f"`{c}`" if self.dialecto == "mysql" else f'"{c}"' for c in todas)
+        if self.dialecto == "sqlite":
+            marcas = ", ".join("?" for _ in todas)
+            claves = ", ".join(f'"{c}"' for c in self.clave)
+            asignaciones = ", ".join(f'"{c}" = excluded."{c}"' for c in columnas)
+            return (f'INSERT INTO "{self.nombre_tabla}" ({nombres}) VALUES ({marcas}) '
+                    f'ON CONFLICT({claves}) DO UPDATE SET {asignaciones}')
+
+        marcas = ", ".join("%s" for _ in todas)
+        asignaciones = ", ".join(f"`{c}` = VALUES(`{c}`)" for c in columnas)
+        return (f"INSERT INTO `{self.nombre_tabla}` ({nombres}) VALUES ({marcas}) "
+                f"ON DUPLICATE KEY UPDATE {asignaciones}")
@@ -1,15 +1,27 @@
-import cv2, os, time
-from queue import Queue
-from threading import Thread
-from concurrent.futures import ThreadPoolExecutor
+import cv2, os, json, signal
 
 from db_manager import DBManager
 from utils.gestor_alertas import GestorAlertas
 from detectores.detector_personas import DetectorPersonas
+from detectores.detector_caras import DetectorCaras
+from detectores.backends_modelo import configurar_desde_entorno
+from detectores.reidentificacion import Reidentificador, crear_indice
+from supervisor_camaras import SupervisorCamaras
+from utils.captura import url_substream
+from utils.registro_modelos import registro
+from utils.ejecutor_clases import EjecutorPorClases
+from utils.almacen_recortes import abrir_almacen, cerrar_almacenes, iniciar_mantenimiento
+from utils.metricas import metricas
+from utils.zonas import MotorZonas, cargar_zonas
+from utils.renderizado import Renderizador, componer_camara
 from descripciones.gestor_descripciones import GestorDescripciones
+from descripciones.cache_descripciones import CacheDescripciones
+from notificaciones.canales import CanalWhatsApp, CanalWebhook, CanalLog
+from notificaciones.despachador import DespachadorNotificaciones
 
-# Forzar transporte TCP en FFMPEG (muy útil para RTSP)
-os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+# Forzar transporte TCP en FFMPEG (muy útil para RTSP). El análisis inicial del
+# stream se acota a 1 s / 1 MB: se repite en cada reconexión
+os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp|analyzeduration;1000000|probesize;1000000"
 
 account_sid = os.getenv("TWILIO_ACCOUNT_SID")
 auth_token = os.getenv("TWILIO_AUTH_TOKEN")
@@ -37,72 +49,245 @@ def principal():
         "Fecha_registro": "DATETIME"
     }
 
-    ejecutor = ThreadPoolExecutor(max_workers=4)
+    # Calentar en segundo plano los modelos que se cargan bajo demanda (insightface, pose, caras)
+    if os.getenv("PRECARGAR_MODELOS", "0") == "1":
+        registro.precargar()
+
+    # Tareas en segundo plano en carriles acotados por clase (alertas, db, imagenes,
+    # descripciones); CARRILES_CONFIG ajusta hilos, capacidad y política de cada uno
+    ejecutor = EjecutorPorClases(cargar_json(os.getenv("CARRILES_CONFIG")))
     db = DBManager("registro_personas", estructura)
     gestor_descripciones = GestorDescripciones(prompt, db)
-    gestor_alertas = GestorAlertas(
+
+    # Descripciones automáticas: BACKEND_DESCRIPCION = gemini | cogvlm | vila | falso (vacío = desactivadas)
+    backend_descripcion = os.getenv("BACKEND_DESCRIPCION", "")
+    planificador_descripciones = None
+    if backend_descripcion:
+        planificador_descripciones = gestor_descripciones.crear_planificador(
+            backend_descripcion,
+            max_por_segundo=float(os.getenv("DESCRIPCIONES_POR_SEGUNDO", 0.5)),
+            max_concurrentes=int(os.getenv("DESCRIPCIONES_CONCURRENTES", 2)),
+            cache=CacheDescripciones(ruta_persistencia=os.getenv("CACHE_DESCRIPCIONES", "cache_descripciones.json"),
+                                     guardar_cada=int(os.getenv("CACHE_GUARDAR_CADA", 50)),
+                                     intervalo_guardado=float(os.getenv("CACHE_INTERVALO_GUARDADO", 300))),
+            ejecutor=ejecutor
+        )
+
+    camaras = cargar_camaras(ruta_video)
+
+    # BACKEND_MODELO = pytorch | onnx | openvino (exportado y cacheado en models/cache);
+    # MODELO_INT8=1 cuantiza calibrando con FRAMES_CALIBRACION
+    cargador_modelo = configurar_desde_entorno()
+
+    # FORMATO_RECORTES = segmentos (almacén con índice, por defecto) | archivos (un JPEG por recorte).
+    # RETENCION_DIAS y RETENCION_GB (por almacén) se aplican cada hora junto con la compactación.
+    usar_almacen = os.getenv("FORMATO_RECORTES", "segmentos") == "segmentos"
+    mantenimiento = None
+    if usar_almacen:
+        dias = os.getenv("RETENCION_DIAS")
+        gigas = os.getenv("RETENCION_GB")
+        mantenimiento = iniciar_mantenimiento(
+            max_edad=float(dias) * 86400 if dias else None,
+            max_bytes=int(float(gigas) * 2**30) if gigas else None
+        )
+
+    # Re-identificación: REID = histograma | yolo (vacío = IDs del tracker). Los IDs
+    # globales se mantienen entre reconexiones y reinicios (bloques reservados en REID_ESTADO);
+    # REID_INDICE = bruto (sitios chicos) | cuantizado (cientos de miles de embeddings)
+    reidentificador = None
+    if os.getenv("REID"):
+        reidentificador = Reidentificador(
+            os.getenv("REID"),
+            indice=crear_indice(os.getenv("REID_INDICE", "bruto")),
+            ventana=float(os.getenv("REID_VENTANA", 600)),
+            similitud_min=float(os.getenv("REID_SIMILITUD", 0.85)),
+            ruta_estado=os.getenv("REID_ESTADO", "reid_estado.json")
+        )
+
+    # Un solo gestor de alertas para todas las cámaras (estado por cámara y track)
+    despachador = crear_despachador()
+    gestor_alertas = GestorAlertas(despachador=despachador, ejecutor=ejecutor)
+
+    def crear_detector(id_camara, modelo):
+        # Los modelos (YOLO de personas y de caras) se comparten entre cámaras;
+        # cada detector aporta su tracker y su carpeta de salida, también para las
+        # caras: los IDs de track se repiten entre cámaras.
+        carpeta_camara = os.path.join(carpeta_salida, f"camara_{id_camara}") if len(camaras) > 1 else carpeta_salida
+        detector_caras = DetectorCaras(carpeta_camara, ejecutor, db, modo=os.getenv("MODO_CARAS", "local"),
+                                       almacen=abrir_almacen(carpeta_camara) if usar_almacen else None,
+                                       cargador_modelo=cargador_modelo, id_camara=id_camara)
+        return DetectorPersonas(
+            carpeta_camara,
+            gestor_alertas.actualizar,
+            db,
+            executor=ejecutor,
+            modelo=modelo,
+            detector_caras=detector_caras,
+            id_camara=id_camara,
+            planificador_descripciones=planificador_descripciones,
+            detectar_caras=os.getenv("DETECTAR_CARAS", "0") == "1",
+            zonas=MotorZonas(cargar_zonas(os.getenv("ZONAS_CONFIG"), id_camara)),
+            modo_region=os.getenv("MODO_DETECCION", "completo"),
+            almacen=abrir_almacen(carpeta_camara) if usar_almacen else None,
+            reidentificador=reidentificador
+        )
+
+    supervisor = SupervisorCamaras(
+        camaras, crear_detector,
+        fps_min=float(os.getenv("FPS_MIN", 0.5)),
+        fps_max=float(os.getenv("FPS_MAX", 10)),
+        tam_lote=int(os.getenv("TAM_LOTE", 1)),
+        cargador_modelo=cargador_modelo,
+        espera_reconexion=float(os.getenv("RECONEXION_MIN", 0.05)),
+        espera_reconexion_max=float(os.getenv("RECONEXION_MAX", 10))
     )
+    supervisor.iniciar()
+
+    # Métricas Prometheus en PUERTO_METRICAS/metrics (solo local salvo HOST_METRICAS);
+    # perfilador por muestreo con PERFILAR=1 o en caliente con /perfil/iniciar
+    puerto_metricas = os.getenv("PUERTO_METRICAS")
+    if puerto_metricas:
+        metricas.registrar_estadisticas("db", db.estadisticas)
+        metricas.registrar_estadisticas("alertas", gestor_alertas.estadisticas)
+        metricas.registrar_estadisticas("modelos", registro.estadisticas)
+        if planificador_descripciones:
+            metricas.registrar_estadisticas("descripciones", planificador_descripciones.estadisticas)
+        if despachador:
+            metricas.registrar_estadisticas("notificaciones", despachador.estadisticas)
+        if reidentificador:
+            metricas.registrar_estadisticas("reid", reidentificador.estadisticas)
+        metricas.servir(int(puerto_metricas), os.getenv("HOST_METRICAS", "127.0.0.1"))
+        if os.getenv("PERFILAR", "0") == "1":
+            metricas.perfilador.iniciar()
+
+    # Sin pantalla (servidores): la detección no dibuja nada; la salida visual es
+    # opcional, por MJPEG (PUERTO_MJPEG, solo local salvo HOST_MJPEG) y/o grabación
+    # rotativa (CARPETA_GRABACION).
+    headless = os.getenv("HEADLESS", "0") == "1"
+    renderizador = None
+    puerto_mjpeg = os.getenv("PUERTO_MJPEG")
+    carpeta_grabacion = os.getenv("CARPETA_GRABACION")
+    if puerto_mjpeg or carpeta_grabacion:
+        renderizador = Renderizador(
+            supervisor.camaras,
+            fps=float(os.getenv("FPS_RENDER", 5)),
+            puerto_mjpeg=int(puerto_mjpeg) if puerto_mjpeg else None,
+            host_mjpeg=os.getenv("HOST_MJPEG", "127.0.0.1"),
+            carpeta_grabacion=carpeta_grabacion
+        )
+        renderizador.iniciar()
 
-    detector = DetectorPersonas(
-        carpeta_salida,
-        gestor_alertas.actualizar,
-        db,
-        executor=ejecutor
+    instalar_senales(supervisor)
+    try:
+        if headless:
+            # Con timeout: la espera vuelve al intérprete y la señal se atiende enseguida
+            while not supervisor.detenido.wait(1.0):
+                pass
+        else:
+            mostrar_en_pantalla(supervisor)
+    except KeyboardInterrupt:
+        pass
+
+    print("Cerrando...")
+    supervisor.detener()
+    if renderizador:
+        renderizador.detener()
+    gestor_alertas.detener()
+    ejecutor.detener()
+    if mantenimiento:
+        mantenimiento.set()
+    cerrar_almacenes()
+    if planificador_descripciones:
+        planificador_descripciones.detener()
+    if despachador:
+        despachador.detener()
+    db.close()
+
+def instalar_senales(supervisor):
+    """
+    SIGTERM (docker stop, systemd) y SIGINT (Ctrl+C) marcan el supervisor como
+    detenido, así el cierre ordenado corre igual que al presionar 'q': vacía el
+    escritor de la BD, guarda los mejores recortes y la cache de descripciones y
+    cierra los almacenes. Una segunda señal corta el proceso sin esperar.
+    """
+    def al_recibir(numero, _frame):
+        if supervisor.detenido.is_set():
+            raise SystemExit(1)
+        print(f"[INFO] Señal {signal.Signals(numero).name} recibida, cerrando...")
+        supervisor.detenido.set()
+
+    for numero in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(numero, al_recibir)
+
+def mostrar_en_pantalla(supervisor, fps=15):
+    """
+    Muestra cada cámara en una ventana hasta que se presiona 'q' o se detiene
+    el supervisor. Corre en el hilo principal, a su propio ritmo, sin frenar
+    la detección.
+    """
+    while not supervisor.detenido.is_set():
+        for camara in supervisor.camaras.values():
+            mostrar = componer_camara(camara)
+            if mostrar is not None:
+                cv2.imshow(f"Video en Vivo - {camara.id}", mostrar)
+
+        if cv2.waitKey(int(1000 / fps)) & 0xFF == ord('q'):
+            break
+    cv2.destroyAllWindows()
+
+def crear_despachador():
+    """
+    Arma el despachador de notificaciones con los canales de NOTIFICACIONES
+    (lista separada por comas: whatsapp, webhook, log). Vacío = sin notificaciones.
+    """
+    canales = []
+    for nombre in filter(None, (c.strip() for c in os.getenv("NOTIFICACIONES", "").split(","))):
+        if nombre == "whatsapp":
+            canales.append(CanalWhatsApp(account_sid, auth_token, from_wpp, to_wpp))
+        elif nombre == "webhook":
+            canales.append(CanalWebhook(os.getenv("WEBHOOK_ALERTAS")))
+        elif nombre == "log":
+            canales.append(CanalLog(os.getenv("LOG_ALERTAS")))
+        else:
+            print(f"[ADVERTENCIA] Canal de notificación desconocido: {nombre}")
+    if not canales:
+        return None
+
+    return DespachadorNotificaciones(
+        canales,
+        ventana=float(os.getenv("VENTANA_NOTIFICACIONES", 5.0)),
+        max_por_minuto=float(os.getenv("NOTIFICACIONES_POR_MINUTO", 12)),
+        ruta_fallidos=os.getenv("NOTIFICACIONES_FALLIDAS", "notificaciones_fallidas.jsonl")
     )
 
-    cola_frames = Queue(maxsize=5)
-    cola_resultados = Queue(maxsize=5)
-
-    def trabajador():
-        while True:
-            item = cola_frames.get()
-            if item is None:
-                break
-            indice, frame = item
-            procesado = detector.procesar_frame(frame.copy())
-            cola_resultados.put((indice, procesado))
-            cola_frames.task_done()
-
-    Thread(target=trabajador, daemon=True).start()
-
-    while True:
-        print("Intentando conectar al stream...")
-        video = cv2.VideoCapture(ruta_video, cv2.CAP_FFMPEG)
-        if not video.isOpened():
-            print("Error al abrir el stream. Reintentando en 5 segundos...")
-            time.sleep(5)
-            continue
-
-        contador_frames = 0
-        ultimo_frame_procesado = None
-
-        while video.isOpened():
-            ret, frame = video.read()
-            if not ret:
-                print("Error al leer frame, reiniciando stream...")
-                video.release()
-                time.sleep(5)
-                break                
-            
-            # Dibujar area
-            cv2.rectangle(frame, (860, 550), (1640, 1000), (0, 255, 0), 2)
-
-            if contador_frames % 5 == 0 and not cola_frames.full():
-                cola_frames.put((contador_frames, frame.copy()))
-
-            while not cola_resultados.empty():
-                _, ultimo_frame_procesado = cola_resultados.get()
-
-            mostrar = ultimo_frame_procesado if ultimo_frame_procesado is not None else frame
-            cv2.imshow("Video en Vivo", mostrar)
-
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                print("Cerrando...")
-                video.release()
-                cv2.destroyAllWindows()
-                return
-
-            contador_frames += 1
+def cargar_camaras(ruta_video):
+    """
+    Lee la lista de cámaras desde el JSON indicado en CAMARAS_CONFIG
+    (formato: [{"id": "surtidor_1", "url": "rtsp://..."}, ...]).
+    Si no está definido, se usa una sola cámara con RUTA_VIDEO.
+
+    Con DOBLE_STREAM=1, la detección corre sobre el substream y el stream
+    principal ("url_alta") solo se abre para los recortes. A las cámaras sin
+    "url_alta" se les toma "url" como principal y se deriva el substream
+    (subtype=1, convención Dahua).
+    """
+    camaras = cargar_json(os.getenv("CAMARAS_CONFIG")) or [{"id": 0, "url": ruta_video}]
+    if os.getenv("DOBLE_STREAM", "0") == "1":
+        for camara in camaras:
+            if "url_alta" not in camara:
+                camara["url_alta"] = camara["url"]
+                camara["url"] = url_substream(camara["url"])
+    return camaras
+
+def cargar_json(ruta_config):
+    """
+    Lee un archivo de configuración JSON. Sin ruta, retorna None.
+    """
+    if not ruta_config:
+        return None
+
+    with open(ruta_config, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 if __name__ == "__main__":
     principal()
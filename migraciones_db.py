@@ -0,0 +1,84 @@
+import mysql.connector
+
+TABLA_VERSIONES = "_version_esquema"
+
+# Errores de MySQL que indican que el cambio ya estaba hecho (migración que se
+# cortó a mitad y se vuelve a correr): se ignoran
+_YA_APLICADO = {
+    1060,  # Columna duplicada
+    1061,  # Índice duplicado
+    1091,  # No existe lo que se quiere borrar
+}
+
+def _v2_claves_e_indices(tabla):
+    # Cada cambio en su propia sentencia: si la migración se corta, al
+    # reintentarla los cambios ya hechos fallan con un error de _YA_APLICADO
+    return [
+        f"ALTER TABLE `{tabla}` ADD COLUMN `Camara` VARCHAR(64) NOT NULL DEFAULT ''",
+        f"ALTER TABLE `{tabla}` ADD COLUMN `Sesion` BIGINT NOT NULL DEFAULT 0",
+        f"ALTER TABLE `{tabla}` ADD COLUMN `Track` INT NULL",
+        # Los IDs del tracker vuelven a empezar con cada proceso y se repiten entre
+        # cámaras: cámara y sesión son parte de la clave
+        f"ALTER TABLE `{tabla}` DROP PRIMARY KEY, ADD PRIMARY KEY (`Camara`, `Sesion`, `ID`)",
+        f"ALTER TABLE `{tabla}` ADD INDEX `idx_camara_sesion_track` (`Camara`, `Sesion`, `Track`)",
+        f"ALTER TABLE `{tabla}` ADD INDEX `idx_fecha` (`Fecha_registro`)",
+        f"ALTER TABLE `{tabla}` ADD INDEX `idx_camara_fecha` (`Camara`, `Fecha_registro`)",
+        f"ALTER TABLE `{tabla}` ADD FULLTEXT INDEX `ft_descripcion` (`Descripcion`)",
+    ]
+
+# (versión, descripción, función tabla -> sentencias), en orden. La versión 1 es
+# la tabla tal como la crea DBManager.crear_tabla a partir de la estructura.
+MIGRACIONES = [
+    (2, "Clave primaria (cámara, sesión, ID), índices por fecha y FULLTEXT de descripciones", _v2_claves_e_indices),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+def version_esquema(cursor, tabla):
+    cursor.execute(f"SELECT `Version` FROM `{TABLA_VERSIONES}` WHERE `Tabla` = %s", (tabla,))
+    fila = cursor.fetchone()
+    return fila[0] if fila else 1
+
+def migrar(conexion, tabla, hasta=None):
+    """
+    Lleva la tabla a la última versión del esquema (o a `hasta`), aplicando en
+    orden las migraciones pendientes. La versión de cada tabla se guarda en
+    `_version_esquema`. Un lock con nombre evita que dos procesos migren la
+    misma tabla a la vez.
+
+    Parámetros:
+        conexion: Conexión MySQL (del pool).
+        tabla (str): Tabla a migrar.
+        hasta (int | None): Versión objetivo (por defecto, la última).
+
+    Retorna:
+        int: Versión del esquema después de migrar.
+    """
+    hasta = hasta or VERSION_ACTUAL
+    cursor = conexion.cursor()
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS `{TABLA_VERSIONES}` ("
+                   "`Tabla` VARCHAR(64) PRIMARY KEY, `Version` INT NOT NULL, `Aplicada` DATETIME)")
+    cursor.execute("SELECT GET_LOCK(%s, 600)", (f"migracion_{tabla}",))
+    cursor.fetchone()
+    try:
+        version = version_esquema(cursor, tabla)
+        for numero, descripcion, sentencias in MIGRACIONES:
+            if numero <= version or numero > hasta:
+                continue
+            print(f"[INFO] Migrando '{tabla}' a la versión {numero}: {descripcion}")
+            for sql in sentencias(tabla):
+                try:
+                    cursor.execute(sql)
+                except mysql.connector.Error as err:
+                    if err.errno not in _YA_APLICADO:
+                        raise
+            cursor.execute(f"INSERT INTO `{TABLA_VERSIONES}` (`Tabla`, `Version`, `Aplicada`) VALUES (%s, %s, NOW()) "
+                           "ON DUPLICATE KEY UPDATE `Version` = VALUES(`Version`), `Aplicada` = VALUES(`Aplicada`)",
+                           (tabla, numero))
+            conexion.commit()
+            version = numero
+        return version
+    finally:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (f"migracion_{tabla}",))
+        cursor.fetchone()
+        cursor.close()
@@ -0,0 +1,89 @@
+import json, time, requests
+from threading import Lock
+
+class ErrorNotificacion(Exception):
+    """
+    Falla al enviar una notificación. Si `reintentable` es False (p. ej. un 4xx
+    por credenciales o destino inválido) el despachador no reintenta.
+    """
+    def __init__(self, mensaje, reintentable=True):
+        super().__init__(mensaje)
+        self.reintentable = reintentable
+
+def _verificar_respuesta(respuesta):
+    if respuesta.status_code < 300:
+        return
+    # 429 y 5xx son transitorios; el resto de los 4xx no se arregla reintentando
+    reintentable = respuesta.status_code == 429 or respuesta.status_code >= 500
+    raise ErrorNotificacion(f"respuesta {respuesta.status_code}: {respuesta.text[:200]}", reintentable)
+
+class CanalNotificacion:
+    """
+    Interfaz común de los canales de salida. `destino` identifica al receptor
+    (el despachador limita la tasa por destino); `enviar` entrega el texto o
+    lanza una excepción.
+    """
+    nombre = "base"
+    destino = ""
+
+    def enviar(self, mensaje):
+        raise NotImplementedError
+
+class CanalWhatsApp(CanalNotificacion):
+    nombre = "whatsapp"
+
+    def __init__(self, account_sid, auth_token, from_wpp, to_wpp, timeout=10,
+                 url_base="https://api.twilio.com/2010-04-01"):
+        """
+        Envía por WhatsApp con la API REST de Twilio, reutilizando una sesión HTTP
+        (conexiones keep-alive) en lugar del cliente de Twilio.
+        """
+        self.url = f"{url_base}/Accounts/{account_sid}/Messages.json"
+        self.from_whatsapp = from_wpp
+        self.to_whatsapp = to_wpp
+        self.destino = to_wpp
+        self.timeout = timeout
+        self.sesion = requests.Session()
+        self.sesion.auth = (account_sid, auth_token)
+
+    def enviar(self, mensaje):
+        respuesta = self.sesion.post(
+            self.url,
+            data={"From": self.from_whatsapp, "To": self.to_whatsapp, "Body": mensaje},
+            timeout=self.timeout,
+        )
+        _verificar_respuesta(respuesta)
+
+class CanalWebhook(CanalNotificacion):
+    nombre = "webhook"
+
+    def __init__(self, url, timeout=5, encabezados=None):
+        self.url = url
+        self.destino = url
+        self.timeout = timeout
+        self.sesion = requests.Session()
+        if encabezados:
+            self.sesion.headers.update(encabezados)
+
+    def enviar(self, mensaje):
+        respuesta = self.sesion.post(self.url, json={"mensaje": mensaje, "timestamp": time.time()},
+                                     timeout=self.timeout)
+        _verificar_respuesta(respuesta)
+
+class CanalLog(CanalNotificacion):
+    nombre = "log"
+
+    def __init__(self, ruta=None):
+        """
+        Escribe las notificaciones en consola y, si se indica `ruta`, las agrega
+        a un archivo (una línea JSON por mensaje).
+        """
+        self.ruta = ruta
+        self.destino = ruta or "consola"
+        self._lock = Lock()
+
+    def enviar(self, mensaje):
+        print(f"[ALERTA] {mensaje}")
+        if self.ruta:
+            with self._lock, open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"timestamp": time.time(), "mensaje": mensaje}, ensure_ascii=False) + "\n")
@@ -0,0 +1,258 @@
+import json, time, random, heapq, itertools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Condition, Lock
+
+class _Destino:
+    def __init__(self, canal, max_por_minuto):
+        self.canal = canal
+        self.max_por_minuto = max_por_minuto
+        self.fichas = 1.0
+        self.ultima_recarga = time.monotonic()
+        self.ultimo_envio = float("-inf")
+        self.acumulados = []     # mensajes esperando al próximo envío
+        self.omitidos = 0        # descartados por cola llena desde el último envío
+        self.reintento = None    # (mensaje, intento) pendiente de reenviar
+        self.en_curso = False
+        self.proximo = None      # instante del próximo despacho programado
+
+    def recargar(self, ahora):
+        capacidad = max(1.0, self.max_por_minuto / 6.0)  # ráfaga de hasta 10 s de presupuesto
+        self.fichas = min(capacidad, self.fichas + (ahora - self.ultima_recarga) * self.max_por_minuto / 60.0)
+        self.ultima_recarga = ahora
+
+class DespachadorNotificaciones:
+    def __init__(self, canales, max_cola=200, ventana=5.0, max_por_minuto=12, reintentos=5,
+                 espera_base=1.0, espera_max=60.0, ruta_fallidos="notificaciones_fallidas.jsonl",
+                 max_concurrentes=None):
+        """
+        Envía notificaciones por uno o más canales (WhatsApp, webhook, log) sin
+        bloquear a quien las genera.
+
+        - `notificar` solo encola; un hilo despachador decide cuándo enviar y un
+          pool de hilos hace las llamadas HTTP.
+        - Agrupado: el primer mensaje tras un período tranquilo sale enseguida; los
+          que llegan dentro de los `ventana` segundos siguientes se envían juntos
+          en un único resumen.
+        - Cada destino tiene su propio límite (`max_por_minuto`), su cola acotada
+          (`max_cola`, se descartan los más viejos) y un solo envío en curso.
+        - Las fallas transitorias se reintentan con espera exponencial con jitter;
+          las definitivas y las que agotan `reintentos` se escriben en `ruta_fallidos`.
+
+        Parámetros:
+            canales (list[CanalNotificacion]): Canales de salida.
+            max_cola (int): Mensajes pendientes por destino como máximo.
+            ventana (float): Segundos mínimos entre dos envíos a un mismo destino.
+            max_por_minuto (float): Envíos por minuto por destino.
+            reintentos (int): Reintentos antes de dar el mensaje por perdido.
+            espera_base (float): Espera del primer reintento, en segundos.
+            espera_max (float): Tope de la espera entre reintentos.
+            ruta_fallidos (str | None): Archivo JSONL para los mensajes no entregados.
+            max_concurrentes (int | None): Hilos de envío (por defecto, uno por canal).
+        """
+        self.max_cola = max_cola
+        self.ventana = ventana
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_max = espera_max
+        self.ruta_fallidos = ruta_fallidos
+
+        self._destinos = [_Destino(canal, max_por_minuto) for canal in canales]
+        self._cola = []  # heap de (instante, secuencia, indice_destino)
+        self._secuencia = itertools.count()
+        self._cond = Condition()
+        self._lock_fallidos = Lock()
+        self._cerrando = False
+        self._detenido = False
+
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_concurrentes or max(1, len(self._destinos)))
+        self._hilo = Thread(target=self._despachar, daemon=True, name="despachador-notificaciones")
+        self._hilo.start()
+
+        self.encolados = 0
+        self.descartados = 0
+        self.enviados = 0
+        self.resumenes = 0
+        self.reintentados = 0
+        self.fallidos = 0
+
+    def notificar(self, mensaje):
+        """
+        Encola `mensaje` para todos los canales. No bloquea.
+        """
+        with self._cond:
+            if self._detenido:
+                return
+            self.encolados += 1
+            ahora = time.monotonic()
+            for indice, destino in enumerate(self._destinos):
+                destino.acumulados.append(mensaje)
+                if len(destino.acumulados) > self.max_cola:
+                    destino.acumulados.pop(0)
+                    destino.omitidos += 1
+                    self.descartados += 1
+                if not destino.en_curso and destino.reintento is None:
+                    self._programar(indice, max(ahora, destino.ultimo_envio + self.ventana))
+            self._cond.notify_all()
+
+    def detener(self, timeout=10.0):
+        """
+        Envía lo acumulado sin esperar la ventana de agrupado y espera hasta
+        `timeout` segundos. Lo que quede sin entregar va a `ruta_fallidos`.
+        """
+        limite = time.monotonic() + timeout
+        with self._cond:
+            self._cerrando = True
+            ahora = time.monotonic()
+            for indice, destino in enumerate(self._destinos):
+                if (destino.acumulados or destino.reintento) and not destino.en_curso:
+                    self._programar(indice, ahora)
+            self._cond.notify_all()
+
+            while any(d.acumulados or d.en_curso or d.reintento for d in self._destinos):
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                self._cond.wait(restante)
+
+            self._detenido = True
+            pendientes = []
+            for destino in self._destinos:
+                if destino.reintento:
+                    pendientes.append((destino, destino.reintento[0], destino.reintento[1], "cierre"))
+                if destino.acumulados:
+                    pendientes.append((destino, self._componer(destino), 0, "cierre"))
+                    destino.acumulados = []
+            self._cond.notify_all()
+
+        self._hilo.join()
+        self._ejecutor.shutdown(wait=True)
+        for destino, mensaje, intentos, error in pendientes:
+            self._registrar_fallido(destino, mensaje, intentos, error)
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                "encolados": self.encolados,
+                "descartados": self.descartados,
+                "enviados": self.enviados,
+                "resumenes": self.resumenes,
+                "reintentados": self.reintentados,
+                "fallidos": self.fallidos,
+                "pendientes": {f"{d.canal.nombre}:{d.canal.destino}": len(d.acumulados) for d in self._destinos},
+            }
+
+    def _programar(self, indice, instante):
+        destino = self._destinos[indice]
+        if destino.proximo is None or instante < destino.proximo:
+            destino.proximo = instante
+            heapq.heappush(self._cola, (instante, next(self._secuencia), indice))
+
+    def _despachar(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._detenido:
+                        return
+                    if not self._cola:
+                        self._cond.wait()
+                        continue
+                    espera = self._cola[0][0] - time.monotonic()
+                    if espera <= 0:
+                        break
+                    self._cond.wait(espera)
+
+                instante, _, indice = heapq.heappop(self._cola)
+                destino = self._destinos[indice]
+                if destino.proximo != instante:
+                    continue  # Entrada obsoleta, reemplazada por una más temprana
+                destino.proximo = None
+                if destino.en_curso:
+                    continue  # Al terminar el envío en curso se vuelve a programar
+
+                if destino.reintento is not None:
+                    mensaje, intento = destino.reintento
+                elif destino.acumulados:
+                    mensaje, intento = None, 0
+                else:
+                    continue
+
+                ahora = time.monotonic()
+                destino.recargar(ahora)
+                if destino.fichas < 1.0:
+                    self._programar(indice, ahora + (1.0 - destino.fichas) * 60.0 / destino.max_por_minuto)
+                    continue
+
+                if mensaje is None:
+                    mensaje = self._componer(destino)
+                    destino.acumulados = []
+                destino.fichas -= 1.0
+                destino.ultimo_envio = ahora
+                destino.en_curso = True
+
+            self._ejecutor.submit(self._enviar, indice, mensaje, intento)
+
+    def _componer(self, destino):
+        """
+        Un solo mensaje se envía tal cual; varios se agrupan en un resumen.
+        """
+        mensajes = destino.acumulados
+        if len(mensajes) == 1 and not destino.omitidos:
+            return mensajes[0]
+
+        self.resumenes += 1
+        lineas = [f"🔔 {len(mensajes) + destino.omitidos} alertas:"]
+        lineas += [f"- {m}" for m in mensajes]
+        if destino.omitidos:
+            lineas.append(f"(+{destino.omitidos} omitidas)")
+        destino.omitidos = 0
+        return "\n".join(lineas)
+
+    def _enviar(self, indice, mensaje, intento):
+        destino = self._destinos[indice]
+        error = None
+        try:
+            destino.canal.enviar(mensaje)
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            destino.en_curso = False
+            destino.reintento = None
+            ahora = time.monotonic()
+
+            if error is None:
+                self.enviados += 1
+            elif getattr(error, "reintentable", True) and intento < self.reintentos and not self._cerrando:
+                self.reintentados += 1
+                espera = min(self.espera_max, self.espera_base * 2 ** intento) * random.uniform(0.5, 1.0)
+                destino.reintento = (mensaje, intento + 1)
+                self._programar(indice, ahora + espera)
+                print(f"[ADVERTENCIA] Notificación {destino.canal.nombre}: {error} (reintento en {espera:.1f} s)")
+            else:
+                self.fallidos += 1
+
+            if destino.reintento is None and destino.acumulados:
+                siguiente = ahora if self._cerrando else destino.ultimo_envio + self.ventana
+                self._programar(indice, max(ahora, siguiente))
+            self._cond.notify_all()
+
+        if error is not None and destino.reintento is None:
+            print(f"[ERROR] Notificación {destino.canal.nombre}: {error}")
+            self._registrar_fallido(destino, mensaje, intento + 1, str(error))
+
+    def _registrar_fallido(self, destino, mensaje, intentos, error):
+        if not self.ruta_fallidos:
+            return
+        registro = {
+            "timestamp": time.time(),
+            "canal": destino.canal.nombre,
+            "destino": destino.canal.destino,
+            "mensaje": mensaje,
+            "intentos": intentos,
+            "error": error,
+        }
+        try:
+            with self._lock_fallidos, open(self.ruta_fallidos, "a", encoding="utf-8") as f:
+                f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"[ERROR] No se pudo escribir en {self.ruta_fallidos}: {e}")
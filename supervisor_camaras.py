@@ -0,0 +1,266 @@
+import os, time, numpy as np
+from queue import Queue
+from threading import Thread, Lock, Event
+from ultralytics import YOLO
+from detectores.inferencia_lotes import InferenciaPorLotes
+from utils.buffer_frames import PoolFrames, UltimoResultado
+from utils.captura import CapturaStream, StreamAlta, abrir_ffmpeg
+from utils.tasa_adaptativa import ControladorTasa
+from utils.metricas import metricas
+
+class Camara:
+    def __init__(self, id_camara, ruta_video, detector, num_slots=5, tasa=None, ruta_alta=None):
+        """
+        Estado de una cámara dentro del supervisor: su stream, su detector
+        (con su propio tracker), su pool de frames, su último resultado
+        ((indice_frame, DeteccionFrame)), el controlador que decide qué frames
+        se detectan y su captura (CapturaStream, creada al iniciar).
+
+        Con `ruta_alta` la cámara trabaja en modo doble stream: `ruta_video` es el
+        substream (detección y tracking) y `ruta_alta` el stream principal, que se
+        abre solo para los recortes (ver StreamAlta).
+        """
+        self.id = id_camara
+        self.ruta_video = ruta_video
+        self.ruta_alta = ruta_alta
+        self.detector = detector
+
+        self.lock = Lock()  # Un solo hilo a la vez sobre el tracker de la cámara
+        self.num_slots = num_slots
+        self.pool = None  # Se crea con la resolución del primer frame
+        self.resultado = UltimoResultado()
+        self.tasa = tasa or ControladorTasa()
+        self.contador_frames = 0
+        self.en_espera = False  # Ya está anunciada en la cola de cámaras listas
+        self.captura = None
+        self.alta = None
+
+    def estadisticas(self):
+        estadisticas = {"pool": self.pool.estadisticas() if self.pool else {}, "tasa": self.tasa.estadisticas(),
+                        "tracks": self.detector.tracks.estadisticas(),
+                        "captura": self.captura.estadisticas() if self.captura else {}}
+        if self.alta:
+            estadisticas["alta"] = self.alta.estadisticas()
+        return estadisticas
+
+    def leer(self, video):
+        """
+        Decodifica el siguiente frame directamente en un slot libre del pool.
+
+        Retorna:
+            tuple: (ok, slot). `slot` es None si no había slots libres y el frame
+                   se descartó.
+        """
+        if self.pool is None:
+            ret, frame = video.read()
+            if not ret:
+                return False, None
+            self.pool = PoolFrames(frame.shape, self.num_slots, frame.dtype)
+            slot, buffer = self.pool.reservar()
+            np.copyto(buffer, frame)
+            return True, slot
+
+        reserva = self.pool.reservar()
+        if reserva is None:
+            return video.grab(), None
+
+        slot, buffer = reserva
+        ret, frame = video.read(buffer)
+        if not ret:
+            self.pool.cancelar(slot)
+            return False, None
+        if frame is not buffer and not np.shares_memory(frame, buffer):
+            # Cambió la resolución del stream: se reconstruye el pool
+            self.pool.cancelar(slot)
+            self.pool = PoolFrames(frame.shape, self.num_slots, frame.dtype)
+            slot, buffer = self.pool.reservar()
+            np.copyto(buffer, frame)
+        return True, slot
+
+class SupervisorCamaras:
+    def __init__(self, camaras, crear_detector, ruta_modelo="models/yolo11-person.pt",
+                 num_trabajadores=None, fps_min=0.5, fps_max=10.0, tam_lote=1, espera_lote=0.02,
+                 cargador_modelo=YOLO, abrir_stream=abrir_ffmpeg, espera_reconexion=0.05,
+                 espera_reconexion_max=10.0):
+        """
+        Ejecuta varias cámaras en un solo proceso compartiendo los modelos.
+
+        Cada cámara tiene un hilo de captura y su propio DetectorPersonas (estado de
+        tracking). La inferencia se reparte en un pool de trabajadores dimensionado
+        según los núcleos disponibles; cada trabajador tiene un único modelo YOLO,
+        por lo que agregar cámaras no agrega copias de los modelos.
+
+        Los frames pasan de la captura a la detección por un PoolFrames por cámara:
+        se decodifican en buffers reutilizables, los trabajadores reciben vistas de
+        solo lectura y un frame que no se alcanzó a procesar se descarta en lugar
+        de encolarse.
+
+        Ante un corte del stream solo se reabre la captura (ver CapturaStream):
+        modelos, pool y tracker siguen cargados, y el detector recibe los segundos
+        sin frames para marcar la discontinuidad del tracking.
+
+        Parámetros:
+            camaras (list[dict]): Lista de {"id": ..., "url": ...}. Con "url_alta", "url" es el
+                                  substream y "url_alta" el stream principal (modo doble stream).
+            crear_detector (callable): Recibe (id_camara, modelo) y devuelve un DetectorPersonas.
+            ruta_modelo (str): Pesos YOLO de personas.
+            num_trabajadores (int | None): Hilos de inferencia. Por defecto la mitad de los núcleos.
+            fps_min (float): Detecciones por segundo por cámara con la escena quieta (0 = solo con movimiento).
+            fps_max (float): Detecciones por segundo por cámara con movimiento o tracks activos.
+                             La tasa real baja si la inferencia no da abasto (ver ControladorTasa).
+            tam_lote (int): Si es mayor que 1, cada trabajador agrupa hasta este número de
+                            frames (de cualquier cámara) en una sola pasada del modelo.
+            espera_lote (float): Segundos máximos a esperar para completar un lote.
+            cargador_modelo (callable): Recibe `ruta_modelo` y devuelve el modelo (p. ej.
+                                        exportado a ONNX/OpenVINO, ver backends_modelo).
+            abrir_stream (callable): url -> VideoCapture. Por defecto FFmpeg con timeouts.
+            espera_reconexion (float): Primera espera entre reintentos de conexión, en segundos.
+            espera_reconexion_max (float): Tope de la espera exponencial entre reintentos.
+        """
+        self.num_trabajadores = num_trabajadores or max(1, (os.cpu_count() or 2) // 2)
+        self.abrir_stream = abrir_stream
+        self.espera_reconexion = espera_reconexion
+        self.espera_reconexion_max = espera_reconexion_max
+
+        # Ultralytics no es thread-safe sobre un mismo predictor: un modelo por trabajador
+        self.modelos = [cargador_modelo(ruta_modelo) for _ in range(self.num_trabajadores)]
+        self.lotes = [InferenciaPorLotes(modelo, tam_lote, espera_lote) for modelo in self.modelos] if tam_lote > 1 else []
+
+        # Cada cámara puede usar su parte de la capacidad de inferencia (por lote, si hay lotes)
+        capacidad = self.num_trabajadores * max(1, tam_lote) / max(1, len(camaras))
+
+        self.camaras = {}
+        for config in camaras:
+            id_camara = config["id"]
+            detector = crear_detector(id_camara, self.modelos[0])
+            tasa = ControladorTasa(config.get("fps_min", fps_min), config.get("fps_max", fps_max), capacidad)
+            self.camaras[id_camara] = Camara(id_camara, config["url"], detector, tasa=tasa,
+                                             ruta_alta=config.get("url_alta"))
+
+        # Solo IDs de cámaras con un frame pendiente (como mucho una entrada por cámara)
+        self.cola_listas = Queue()
+        self.lock_listas = Lock()
+        self.detenido = Event()
+        self.hilos = []
+
+        metricas.registrar_colector(lambda: [("cola_camaras_listas", self.cola_listas.qsize(), {})])
+        for id_camara, camara in self.camaras.items():
+            metricas.registrar_estadisticas("camara", camara.estadisticas, {"camara": id_camara})
+        for trabajador, lotes in enumerate(self.lotes):
+            metricas.registrar_estadisticas("lotes", lotes.estadisticas, {"trabajador": str(trabajador)})
+
+    def iniciar(self):
+        """
+        Lanza los hilos de captura (uno por cámara) y el pool de inferencia.
+        """
+        if self.lotes:
+            trabajadores = [(self._trabajador_lotes, lotes) for lotes in self.lotes]
+        else:
+            trabajadores = [(self._trabajador, modelo) for modelo in self.modelos]
+
+        for destino, arg in trabajadores:
+            hilo = Thread(target=destino, args=(arg,), daemon=True)
+            hilo.start()
+            self.hilos.append(hilo)
+
+        for camara in self.camaras.values():
+            camara.captura = CapturaStream(
+                camara.id, camara.ruta_video, camara.leer, lambda slot, camara=camara: self._entregar(camara, slot),
+                abrir=self.abrir_stream, al_reconectar=camara.detector.marcar_discontinuidad,
+                espera_inicial=self.espera_reconexion, espera_max=self.espera_reconexion_max)
+            camara.captura.iniciar()
+
+            if camara.ruta_alta:
+                camara.alta = StreamAlta(camara.id, camara.ruta_alta, abrir=self.abrir_stream,
+                                         espera_inicial=self.espera_reconexion,
+                                         espera_max=self.espera_reconexion_max)
+                camara.detector.stream_alta = camara.alta
+                camara.alta.iniciar()
+
+    def detener(self):
+        self.detenido.set()
+        for camara in self.camaras.values():
+            if camara.captura:
+                camara.captura.detener()
+            if camara.alta:
+                camara.alta.detener()
+        for _ in self.modelos:
+            self.cola_listas.put(None)
+        for camara in self.camaras.values():
+            with camara.lock:
+                camara.detector.finalizar()
+
+    def estadisticas(self):
+        """
+        Retorna:
+            dict: Por cámara, contadores del pool de frames (descartados, reutilizaciones),
+                  de la tasa de detección (tasa efectiva, proporción de frames salteados),
+                  del registro de tracks (abiertos, cerrados por motivo) y de la captura
+                  (reconexiones, segundos sin frames).
+        """
+        return {id_camara: camara.estadisticas() for id_camara, camara in self.camaras.items()}
+
+    def _tomar(self, id_camara):
+        camara = self.camaras[id_camara]
+        with self.lock_listas:
+            camara.en_espera = False
+        return camara, camara.pool.tomar(timeout=0)
+
+    def _trabajador(self, modelo):
+        while not self.detenido.is_set():
+            id_camara = self.cola_listas.get()
+            if id_camara is None:
+                break
+            camara, frame = self._tomar(id_camara)
+            if frame is None:
+                continue
+
+            inicio = time.perf_counter()
+            with frame, camara.lock:
+                deteccion = camara.detector.procesar_frame(frame.imagen, modelo=modelo, instante=frame.instante)
+            camara.tasa.registrar(len(deteccion.ids), time.perf_counter() - inicio)
+            camara.resultado.publicar((frame.indice, deteccion))
+
+    def _trabajador_lotes(self, lotes):
+        while not self.detenido.is_set():
+            ids = lotes.recolectar(self.cola_listas)
+            fin = ids[-1] is None
+
+            items = [self._tomar(id_camara) for id_camara in ids if id_camara is not None]
+            items = [(camara, frame) for camara, frame in items if frame is not None]
+            if items:
+                inicio = time.perf_counter()
+                # Cada frame aporta uno o más recortes (ROI o mosaicos) al mismo lote
+                resultados = lotes.inferir_regiones([(camara.detector.regiones, frame.imagen) for camara, frame in items])
+
+                for (camara, frame), resultado in zip(items, resultados):
+                    with frame, camara.lock:
+                        if resultado.boxes is None:
+                            deteccion = camara.detector.sin_detecciones()
+                        else:
+                            deteccion = camara.detector.procesar_resultado(frame.imagen, resultado,
+                                                                           instante=frame.instante)
+                    # Latencia vista por la cámara: el lote completo hasta su resultado
+                    camara.tasa.registrar(len(deteccion.ids), time.perf_counter() - inicio)
+                    camara.resultado.publicar((frame.indice, deteccion))
+
+            if fin:
+                break
+
+    def _entregar(self, camara, slot):
+        if slot is not None:
+            instante = time.time()
+            detectar = camara.tasa.decidir(camara.pool.buffer(slot))
+            camara.pool.publicar(slot, camara.contador_frames, detectar=detectar, instante=instante)
+            if detectar:
+                if camara.alta:
+                    camara.alta.solicitar(instante)
+                self._anunciar(camara)
+        camara.contador_frames += 1
+
+    def _anunciar(self, camara):
+        with self.lock_listas:
+            if camara.en_espera:
+                return
+            camara.en_espera = True
+        self.cola_listas.put(camara.id)
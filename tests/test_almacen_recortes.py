@@ -0,0 +1,102 @@
+import os, subprocess, sys, time
+import numpy as np
+import pytest
+from utils.almacen_recortes import AlmacenRecortes, parsear_referencia, abrir_almacen, almacen_de, cerrar_almacenes
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def imagen(valor):
+    return np.random.default_rng(valor).integers(0, 255, (48, 32, 3), dtype=np.uint8)
+
+@pytest.fixture
+def almacen(tmp_path):
+    almacen = AlmacenRecortes(str(tmp_path / "almacen"), tam_segmento=20000)
+    yield almacen
+    almacen.cerrar()
+
+def test_la_referencia_identifica_al_almacen(almacen, tmp_path):
+    ref = almacen.guardar(imagen(1), 7)
+    id_almacen, segmento, offset, largo = parsear_referencia(ref)
+    assert id_almacen == almacen.id
+    assert almacen.leer(ref).shape == (48, 32, 3)
+    # La referencia sin identificador (formato anterior) se sigue leyendo
+    assert almacen.leer_bytes(f"{segmento:06d}:{offset}:{largo}") == almacen.leer_bytes(ref)
+
+    otro = AlmacenRecortes(str(tmp_path / "otro"))
+    assert otro.id != almacen.id
+    assert otro.leer(ref) is None
+    otro.cerrar()
+
+    # El identificador se conserva al reabrir
+    carpeta, id_almacen = almacen.carpeta, almacen.id
+    almacen.cerrar()
+    reabierto = AlmacenRecortes(carpeta)
+    assert reabierto.id == id_almacen
+    assert reabierto.leer(ref) is not None
+    reabierto.cerrar()
+
+def test_referencia_sin_identificador_con_varios_almacenes(tmp_path):
+    primero = abrir_almacen(str(tmp_path / "a"))
+    try:
+        ref = primero.guardar(imagen(1), 1)
+        _, segmento, offset, largo = parsear_referencia(ref)
+        sin_id = f"{segmento:06d}:{offset}:{largo}"
+        assert almacen_de(sin_id) is primero  # Un único almacén: no hay ambigüedad
+
+        segundo = abrir_almacen(str(tmp_path / "b"))
+        assert almacen_de(ref) is primero
+        assert almacen_de(sin_id) is None  # Ambigua: podría ser de cualquiera
+        assert almacen_de(sin_id, carpeta=str(tmp_path / "a")) is primero
+        assert almacen_de(sin_id, carpeta=str(tmp_path / "b")) is segundo
+        assert almacen_de(sin_id, carpeta=str(tmp_path / "c")) is None
+    finally:
+        cerrar_almacenes()
+
+def test_la_retencion_vence_recortes_y_compactar_recupera(almacen):
+    ahora = time.time()
+    # Un recorte nuevo de cada tres: ningún segmento queda entero vencido
+    refs = {i: almacen.guardar(imagen(i), i, instante=ahora if i % 3 == 0 else ahora - 3600) for i in range(30)}
+    segmentos = almacen.estadisticas()["segmentos"]
+    assert segmentos > 2
+    assert almacen.compactar(min_vivos=0.5) == 0  # Sin retención, todo está vivo
+
+    almacen.aplicar_retencion(max_edad=600, ahora=ahora)
+    assert {r.id_persona for r in almacen.recortes()} == set(range(0, 30, 3))
+    assert almacen.estadisticas()["proporcion_viva"] < 0.5
+
+    assert almacen.compactar(min_vivos=0.5) > 0
+    assert almacen.estadisticas()["proporcion_viva"] > 0.5
+    assert all(almacen.leer(ref) is not None for i, ref in refs.items() if i % 3 == 0)
+    assert all(almacen.leer(ref) is None for i, ref in refs.items() if i % 3 and i < 24)
+
+    # Los vencidos no reviven al recargar desde los índices
+    carpeta = almacen.carpeta
+    almacen.cerrar()
+    reabierto = AlmacenRecortes(carpeta)
+    assert {r.id_persona for r in reabierto.recortes()} == set(range(0, 30, 3))
+    reabierto.cerrar()
+
+def test_eliminar_hasta_un_instante(almacen):
+    almacen.guardar(imagen(1), 5, instante=100.0)
+    almacen.guardar(imagen(2), 5, instante=200.0)
+    assert almacen.eliminar(5, hasta=150.0) == 1
+    assert [r.instante for r in almacen.recortes(5)] == [200.0]
+    assert almacen.eliminar(5) == 1
+    assert almacen.recortes(5) == []
+
+def test_un_solo_proceso_por_almacen(almacen):
+    codigo = ("from utils.almacen_recortes import AlmacenRecortes\n"
+              f"AlmacenRecortes({almacen.carpeta!r})\n")
+    resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=RAIZ)
+    assert resultado.returncode != 0
+    assert "abierto por otro proceso" in resultado.stderr
+
+    herramienta = subprocess.run([sys.executable, "-m", "utils.almacen_recortes", "compactar", almacen.carpeta],
+                                 capture_output=True, text=True, cwd=RAIZ)
+    assert herramienta.returncode == 1
+    assert "abierto por otro proceso" in herramienta.stderr
+
+    almacen.cerrar()
+    herramienta = subprocess.run([sys.executable, "-m", "utils.almacen_recortes", "estadisticas", almacen.carpeta],
+                                 capture_output=True, text=True, cwd=RAIZ)
+    assert herramienta.returncode == 0
@@ -0,0 +1,42 @@
+import json
+import numpy as np
+from descripciones.cache_descripciones import CacheDescripciones
+
+def recorte(valor):
+    return np.random.default_rng(valor).integers(0, 255, (64, 32, 3), dtype=np.uint8)
+
+def entradas(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        return [d["descripcion"] for d in json.load(f)]
+
+def test_guarda_cada_n_descripciones(tmp_path):
+    ruta = str(tmp_path / "cache.json")
+    cache = CacheDescripciones(ruta_persistencia=ruta, guardar_cada=3, intervalo_guardado=3600)
+    cache.agregar("persona 0", recorte(0))
+    cache.agregar("persona 1", recorte(1))
+    assert not (tmp_path / "cache.json").exists()
+
+    cache.agregar("persona 2", recorte(2))
+    assert entradas(ruta) == ["persona 0", "persona 1", "persona 2"]
+    assert cache.estadisticas()["sin_guardar"] == 0
+
+    # Sin llamar a guardar(): un reinicio abrupto conserva lo persistido
+    recargada = CacheDescripciones(ruta_persistencia=ruta)
+    assert recargada.buscar(recorte(1)) == "persona 1"
+
+def test_guarda_por_intervalo(tmp_path):
+    ruta = str(tmp_path / "cache.json")
+    cache = CacheDescripciones(ruta_persistencia=ruta, guardar_cada=1000, intervalo_guardado=60)
+    inicio = cache._ultimo_guardado
+    cache.agregar("persona 0", recorte(0), ahora=inicio + 10)
+    assert not (tmp_path / "cache.json").exists()
+
+    cache.agregar("persona 1", recorte(1), ahora=inicio + 61)
+    assert entradas(ruta) == ["persona 0", "persona 1"]
+    assert cache.estadisticas()["guardados"] == 1
+
+def test_sin_ruta_no_persiste(tmp_path):
+    cache = CacheDescripciones(guardar_cada=1)
+    cache.agregar("persona 0", recorte(0))
+    assert cache.estadisticas()["guardados"] == 0
+    assert list(tmp_path.iterdir()) == []
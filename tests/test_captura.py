@@ -0,0 +1,117 @@
+import time
+import pytest
+from benchmarks.simulados import FuenteInterrumpible
+from utils.captura import CapturaStream
+
+def esperar(condicion, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.005)
+    return True
+
+class Prueba:
+    """
+    CapturaStream sobre una FuenteInterrumpible (frames sintéticos chicos, a
+    100 fps), registrando cada apertura y cada llamada a `al_reconectar`.
+    """
+    def __init__(self, **kw):
+        self.fuente = FuenteInterrumpible(fps=100, ancho=64, alto=36, latencia_apertura=0.0)
+        self.aperturas = []  # (instante, abierta)
+        self.reconectadas = []
+        self.frames = []
+        kw.setdefault("espera_inicial", 0.01)
+        kw.setdefault("espera_max", 0.1)
+        self.captura = CapturaStream("prueba", "simulado", lambda video: video.read(), self.frames.append,
+                                     abrir=self._abrir, al_reconectar=self.reconectadas.append, **kw)
+
+    def _abrir(self, url):
+        video = self.fuente.abrir(url)
+        self.aperturas.append((time.monotonic(), video.isOpened()))
+        return video
+
+    def cortar(self, segundos):
+        reconexiones = self.captura.reconexiones
+        self.fuente.cortar(segundos)
+        assert esperar(lambda: self.captura.reconexiones == reconexiones + 1, segundos + 5)
+
+@pytest.fixture
+def prueba():
+    prueba = Prueba()
+    prueba.captura.iniciar()
+    assert esperar(lambda: prueba.captura.conectada)
+    yield prueba
+    prueba.captura.detener(timeout=2)
+
+def test_reconecta_y_mide_la_caida(prueba):
+    assert prueba.captura.estadisticas()["reconexiones"] == 0
+    prueba.cortar(0.2)
+    frames = len(prueba.frames)
+    assert esperar(lambda: len(prueba.frames) > frames + 5)
+
+    estadisticas = prueba.captura.estadisticas()
+    assert estadisticas["conectada"]
+    assert estadisticas["conexiones"] >= 2
+    assert estadisticas["reconexiones"] == 1
+    assert 0.18 <= estadisticas["caida_s_ultima"] < 1.0
+    assert estadisticas["caida_s_total"] == estadisticas["caida_s_max"] == estadisticas["caida_s_ultima"]
+    assert estadisticas["caida_s_actual"] == 0.0
+
+    prueba.cortar(0.3)
+    estadisticas = prueba.captura.estadisticas()
+    assert estadisticas["reconexiones"] == 2
+    assert 0.28 <= estadisticas["caida_s_ultima"] < 1.1
+    assert estadisticas["caida_s_max"] == estadisticas["caida_s_ultima"]
+    assert estadisticas["caida_s_total"] == pytest.approx(sum(prueba.reconectadas))
+
+def test_caida_en_curso(prueba):
+    prueba.fuente.cortar(0.5)
+    assert esperar(lambda: not prueba.captura.conectada)
+    time.sleep(0.2)
+    estadisticas = prueba.captura.estadisticas()
+    assert estadisticas["caida_s_actual"] >= 0.15
+    assert estadisticas["caida_s_total"] == estadisticas["caida_s_actual"]
+    assert estadisticas["reconexiones"] == 0
+
+def test_al_reconectar_una_vez_por_corte(prueba):
+    for duracion in (0.1, 0.4, 0.2):
+        prueba.cortar(duracion)
+        time.sleep(0.1)
+    fallidas = sum(1 for _, abierta in prueba.aperturas if not abierta)
+
+    assert fallidas > 3  # Varios reintentos por corte, una sola notificación
+    assert len(prueba.reconectadas) == 3
+    assert prueba.reconectadas == pytest.approx([0.1, 0.4, 0.2], abs=0.15)
+    # La caída se mide desde que la captura nota el corte (a lo sumo un frame después)
+    assert all(caida >= duracion - 0.02 for caida, duracion in zip(prueba.reconectadas, (0.1, 0.4, 0.2)))
+
+def test_espera_exponencial_acotada():
+    captura = CapturaStream("prueba", "simulado", None, None, espera_inicial=0.05, espera_max=2.0, jitter=0.5)
+    for intentos in range(40):
+        nominal = min(2.0, 0.05 * 2 ** intentos)
+        for _ in range(50):
+            assert nominal * 0.5 <= captura.espera(intentos) <= 2.0
+
+    sin_jitter = CapturaStream("prueba", "simulado", None, None, espera_inicial=0.05, espera_max=2.0, jitter=0.0)
+    assert [sin_jitter.espera(i) for i in range(7)] == [0.05, 0.1, 0.2, 0.4, 0.8, 1.6, 2.0]
+
+def test_reintentos_dentro_de_espera_max(prueba):
+    prueba.aperturas.clear()
+    prueba.cortar(1.2)
+
+    instantes = [instante for instante, _ in prueba.aperturas]
+    esperas = [b - a for a, b in zip(instantes, instantes[1:])]
+    assert len(esperas) >= 5
+    assert max(esperas) <= 0.1 + 0.05
+    assert esperas[-1] > esperas[0]  # Creció desde espera_inicial hasta el tope
+
+def test_detener_durante_la_espera():
+    prueba = Prueba(espera_inicial=5.0, espera_max=5.0)
+    prueba.fuente.cortar(60)
+    prueba.captura.iniciar()
+    assert esperar(lambda: prueba.aperturas)
+    inicio = time.monotonic()
+    prueba.captura.detener(timeout=2)
+    assert time.monotonic() - inicio < 0.5
+    assert not prueba.captura._hilo.is_alive()
@@ -0,0 +1,121 @@
+import json, os, time
+import pytest
+from benchmarks.benchmark_notificaciones import servidor_prueba
+from notificaciones.canales import CanalWebhook
+from notificaciones.despachador import DespachadorNotificaciones
+
+def url(servidor, ruta="/alertas"):
+    return f"http://127.0.0.1:{servidor.server_address[1]}{ruta}"
+
+def esperar(condicion, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+def solicitudes_a(servidor, ruta):
+    return [s for s in list(servidor.solicitudes) if s[1] == ruta]
+
+@pytest.fixture
+def servidor():
+    servidor, _ = servidor_prueba(latencia=0.0, tasa_error=0.0)
+    yield servidor
+    servidor.shutdown()
+
+def test_agrupa_los_mensajes_de_la_ventana(servidor, tmp_path):
+    despachador = DespachadorNotificaciones([CanalWebhook(url(servidor))], ventana=0.5, max_por_minuto=600,
+                                            ruta_fallidos=str(tmp_path / "fallidos.jsonl"))
+    despachador.notificar("Persona 0 entró al área.")
+    assert esperar(lambda: len(servidor.solicitudes) == 1)
+    for i in range(1, 6):
+        despachador.notificar(f"Persona {i} entró al área.")
+
+    time.sleep(0.2)
+    assert len(servidor.solicitudes) == 1  # Dentro de la ventana no sale nada más
+    assert esperar(lambda: len(servidor.solicitudes) == 2)
+    time.sleep(0.6)
+    despachador.detener()
+
+    mensajes = [s[2] for s in servidor.solicitudes]
+    assert mensajes[0] == "Persona 0 entró al área."
+    resumen = mensajes[1].split("\n")
+    assert resumen[0] == "🔔 5 alertas:"
+    assert resumen[1:] == [f"- Persona {i} entró al área." for i in range(1, 6)]
+    assert len(mensajes) == 2
+    estadisticas = despachador.estadisticas()
+    assert estadisticas["enviados"] == 2 and estadisticas["resumenes"] == 1
+    assert not os.path.exists(tmp_path / "fallidos.jsonl")
+
+def test_limita_la_tasa_por_destino(servidor, tmp_path):
+    # 60 por minuto: una ficha por segundo en cada destino, sin ventana de agrupado
+    canales = [CanalWebhook(url(servidor, "/a")), CanalWebhook(url(servidor, "/b"))]
+    despachador = DespachadorNotificaciones(canales, ventana=0.0, max_por_minuto=60,
+                                            ruta_fallidos=str(tmp_path / "fallidos.jsonl"))
+    inicio = time.monotonic()
+    despachador.notificar("m0")
+    assert esperar(lambda: len(servidor.solicitudes) == 2)
+    for i in range(1, 5):
+        despachador.notificar(f"m{i}")
+        time.sleep(0.05)
+
+    # Cada destino gastó su ficha en m0: el resto espera a la recarga
+    time.sleep(0.4)
+    assert len(solicitudes_a(servidor, "/a")) == 1 and len(solicitudes_a(servidor, "/b")) == 1
+    assert esperar(lambda: len(solicitudes_a(servidor, "/a")) == 2 and len(solicitudes_a(servidor, "/b")) == 2)
+    despachador.detener()
+
+    for ruta in ("/a", "/b"):
+        (t0, _, primero, _), (t1, _, segundo, _) = solicitudes_a(servidor, ruta)
+        assert primero == "m0"
+        assert segundo.startswith("🔔 4 alertas:")
+        assert t1 - inicio >= 0.9
+        assert t1 - t0 >= 0.9
+
+def test_reintenta_con_espera_exponencial(tmp_path):
+    servidor, recibidos = servidor_prueba(latencia=0.0, tasa_error=0.0, fallas_iniciales=3)
+    despachador = DespachadorNotificaciones([CanalWebhook(url(servidor))], ventana=0.0, max_por_minuto=600,
+                                            reintentos=5, espera_base=0.1, espera_max=0.15,
+                                            ruta_fallidos=str(tmp_path / "fallidos.jsonl"))
+    despachador.notificar("Persona 1 entró al área.")
+    assert esperar(lambda: recibidos)
+    despachador.detener()
+    servidor.shutdown()
+
+    assert recibidos == ["Persona 1 entró al área."]
+    intentos = servidor.solicitudes
+    assert [s[3] for s in intentos] == [503, 503, 503, 200]
+    esperas = [b[0] - a[0] for a, b in zip(intentos, intentos[1:])]
+    # Jitter entre 50 y 100 % de min(espera_max, espera_base * 2^intento)
+    for espera, nominal in zip(esperas, [0.1, 0.15, 0.15]):
+        assert nominal * 0.5 - 0.01 <= espera <= nominal + 0.1
+    estadisticas = despachador.estadisticas()
+    assert estadisticas["reintentados"] == 3 and estadisticas["enviados"] == 1 and estadisticas["fallidos"] == 0
+    assert not os.path.exists(tmp_path / "fallidos.jsonl")
+
+def test_escribe_los_fallidos_en_jsonl(tmp_path):
+    servidor, recibidos = servidor_prueba(latencia=0.0, tasa_error=1.0)
+    ruta_fallidos = tmp_path / "fallidos.jsonl"
+    destino = url(servidor)
+    despachador = DespachadorNotificaciones([CanalWebhook(destino)], ventana=0.0, max_por_minuto=600,
+                                            reintentos=2, espera_base=0.01, espera_max=0.02,
+                                            ruta_fallidos=str(ruta_fallidos))
+    antes = time.time()
+    despachador.notificar("Persona 7 entró al área.")
+    assert esperar(lambda: despachador.estadisticas()["fallidos"] == 1)
+    despachador.detener()
+    servidor.shutdown()
+
+    assert recibidos == []
+    assert len(servidor.solicitudes) == 3
+    with open(ruta_fallidos, encoding="utf-8") as f:
+        registros = [json.loads(linea) for linea in f]
+    assert len(registros) == 1
+    registro = registros[0]
+    assert registro["canal"] == "webhook"
+    assert registro["destino"] == destino
+    assert registro["mensaje"] == "Persona 7 entró al área."
+    assert registro["intentos"] == 3
+    assert "503" in registro["error"]
+    assert antes <= registro["timestamp"] <= time.time()
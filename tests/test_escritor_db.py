@@ -0,0 +1,140 @@
+import sqlite3, threading, time
+import pytest
+from escritor_db import EscritorDiferido
+
+class ConexionPrueba:
+    """
+    Conexión SQLite en memoria con la interfaz que usa el escritor (cursor,
+    commit, close). `fallar` cuenta cuántas escrituras fallan a continuación.
+    """
+    def __init__(self):
+        self.conexion = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conexion.execute('CREATE TABLE "personas" ("ID" INTEGER PRIMARY KEY, "Ruta" TEXT, "descripcion" TEXT)')
+        self.lock = threading.Lock()
+        self.fallar = 0
+        self.escrituras = 0
+
+    def obtener(self):
+        with self.lock:
+            if self.fallar:
+                self.fallar -= 1
+                raise RuntimeError("pool agotado")
+            self.escrituras += 1
+        return self
+
+    def cursor(self):
+        return self.conexion.cursor()
+
+    def commit(self):
+        self.conexion.commit()
+
+    def close(self):
+        pass
+
+    def filas(self):
+        with self.lock:
+            return {fila[0]: fila[1:] for fila in self.conexion.execute('SELECT "ID", "Ruta", "descripcion" FROM "personas"')}
+
+@pytest.fixture
+def conexion():
+    return ConexionPrueba()
+
+def crear(conexion, **kw):
+    kw.setdefault("max_filas", 1000)
+    kw.setdefault("intervalo_ms", 60000)
+    kw.setdefault("espera_reintento", 0.01)
+    kw.setdefault("espera_reintento_max", 0.05)
+    return EscritorDiferido("personas", conexion.obtener, dialecto="sqlite", **kw)
+
+def esperar(condicion, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not condicion():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.005)
+    return True
+
+def test_fusiona_actualizaciones_de_un_mismo_id(conexion):
+    escritor = crear(conexion)
+    escritor.encolar(1, {"Ruta": "a.jpg"})
+    escritor.encolar(1, {"descripcion": "persona"})
+    escritor.encolar(1, {"Ruta": "b.jpg"})
+    escritor.encolar(2, {"Ruta": "c.jpg"})
+
+    assert escritor.flush(timeout=2)
+    assert conexion.filas() == {1: ("b.jpg", "persona"), 2: ("c.jpg", None)}
+    assert conexion.escrituras == 1
+    assert escritor.actualizaciones_fusionadas == 2
+    assert escritor.close() == 0
+
+def test_escribe_al_juntar_max_filas(conexion):
+    escritor = crear(conexion, max_filas=3)
+    escritor.encolar(1, {"Ruta": "a.jpg"})
+    escritor.encolar(2, {"Ruta": "b.jpg"})
+    time.sleep(0.1)
+    assert conexion.filas() == {}
+
+    escritor.encolar(3, {"Ruta": "c.jpg"})
+    assert esperar(lambda: len(conexion.filas()) == 3)
+    assert escritor.estadisticas()["ultimo_lote"] == 3
+    escritor.close()
+
+def test_escribe_cada_intervalo(conexion):
+    escritor = crear(conexion, intervalo_ms=100)
+    escritor.encolar(1, {"Ruta": "a.jpg"})
+    assert esperar(lambda: conexion.filas() == {1: ("a.jpg", None)})
+    assert escritor.lotes == 1
+    escritor.close()
+
+def test_close_escribe_lo_pendiente(conexion):
+    escritor = crear(conexion)
+    for i in range(10):
+        escritor.encolar(i, {"Ruta": f"{i}.jpg"})
+
+    assert escritor.close() == 0
+    assert len(conexion.filas()) == 10
+    assert not escritor.encolar(11, {"Ruta": "tarde.jpg"})
+
+def test_reintenta_un_lote_fallido(conexion):
+    conexion.fallar = 2
+    escritor = crear(conexion)
+    escritor.encolar(1, {"Ruta": "a.jpg"})
+
+    assert escritor.flush(timeout=2)
+    assert conexion.filas() == {1: ("a.jpg", None)}
+    estadisticas = escritor.estadisticas()
+    assert estadisticas["errores"] == 2
+    assert estadisticas["reintentos"] == 2
+    assert estadisticas["filas_descartadas"] == 0
+    assert escritor.close() == 0
+
+def test_reintento_conserva_lo_encolado_durante_el_fallo(conexion):
+    conexion.fallar = 1
+    escritor = crear(conexion, espera_reintento=0.2, espera_reintento_max=0.2)
+    escritor.encolar(1, {"Ruta": "vieja.jpg", "descripcion": "persona"})
+    escritor.flush(timeout=0.05)  # Dispara la escritura que falla
+    assert esperar(lambda: escritor.errores == 1)
+
+    escritor.encolar(1, {"Ruta": "nueva.jpg"})
+    assert escritor.flush(timeout=2)
+    assert conexion.filas() == {1: ("nueva.jpg", "persona")}
+    escritor.close()
+
+def test_informa_filas_descartadas(conexion):
+    conexion.fallar = 1000
+    escritor = crear(conexion, max_reintentos=2)
+    escritor.encolar(1, {"Ruta": "a.jpg"})
+    escritor.encolar(2, {"Ruta": "b.jpg"})
+
+    assert not escritor.flush(timeout=2)
+    assert escritor.estadisticas()["filas_descartadas"] == 2
+    assert escritor.errores == 3
+    assert escritor.close() == 2
+    assert conexion.filas() == {}
+
+def test_close_informa_lo_que_sigue_pendiente(conexion):
+    conexion.fallar = 1000
+    escritor = crear(conexion, espera_reintento=5, espera_reintento_max=5)
+    escritor.encolar(1, {"Ruta": "a.jpg"})
+
+    assert escritor.close(timeout=0.2) == 1
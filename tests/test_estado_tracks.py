@@ -0,0 +1,29 @@
+from utils.estado_tracks import RegistroTracks, PERDIDO, VENCIDO
+
+def registro(**kw):
+    tracks = RegistroTracks(**kw)
+    cerrados = []
+    tracks.al_cerrar(lambda estado, motivo: cerrados.append((estado.id_persona, motivo)))
+    return tracks, cerrados
+
+def test_barrer_cierra_solo_los_dados_de_baja():
+    tracks, cerrados = registro(ttl=10.0)
+    for i in range(5):
+        tracks.tocar(i, 100.0)
+
+    tracks.barrer(101.0)
+    assert cerrados == [] and len(tracks) == 5
+
+    tracks.barrer(101.0, [1, 3, 99])  # Un ID desconocido no hace nada
+    assert cerrados == [(1, PERDIDO), (3, PERDIDO)]
+    assert 1 not in tracks and 0 in tracks and len(tracks) == 3
+
+def test_barrer_cierra_los_vencidos_desde_el_mas_viejo():
+    tracks, cerrados = registro(ttl=10.0)
+    tracks.tocar(1, 100.0)
+    tracks.tocar(2, 105.0)
+    tracks.tocar(1, 108.0)
+
+    tracks.barrer(116.0)
+    assert cerrados == [(2, VENCIDO)]
+    assert tracks.estadisticas()["cerrados"] == {VENCIDO: 1}
@@ -0,0 +1,41 @@
+import time
+from utils.gestor_alertas import GestorAlertas, ENTRADA, ENTRADA_ZONA, TIPOS_NOTIFICACION
+
+class DespachadorPrueba:
+    def __init__(self):
+        self.mensajes = []
+
+    def notificar(self, mensaje):
+        self.mensajes.append(mensaje)
+
+def test_una_notificacion_por_entrada_y_salida():
+    despachador = DespachadorPrueba()
+    gestor = GestorAlertas(despachador=despachador, timeout=60)
+    eventos = []
+    gestor.suscribir(lambda evento: eventos.append(evento.tipo))
+
+    # Con la zona por defecto, entrar al área es también entrar a la zona
+    ahora = time.time()  # Los vencimientos por desaparición se miden contra el reloj
+    gestor.actualizar("cam1", ahora, [7], [True], [{"tipo": "entrada", "id": 7, "zona": "area", "segundos": 0.0}])
+    gestor.actualizar("cam1", ahora + 1, [7], [True])
+    gestor.actualizar("cam1", ahora + 2, [7], [False], [{"tipo": "salida", "id": 7, "zona": "area", "segundos": 2.0}])
+    gestor.detener()
+
+    assert ENTRADA in eventos and ENTRADA_ZONA in eventos  # Los suscriptores reciben todo
+    assert despachador.mensajes == ["🚶 Persona 7 entró al área.", "👋 Persona 7 salió del área."]
+
+def test_permanencia_se_notifica():
+    despachador = DespachadorPrueba()
+    gestor = GestorAlertas(despachador=despachador, timeout=60)
+    gestor.actualizar("cam1", 100.0, [], [], [{"tipo": "permanencia", "id": 3, "zona": "caja", "segundos": 30.0}])
+    gestor.detener()
+    assert despachador.mensajes == ["⏱️ Persona 3 lleva 30 s en caja."]
+    assert "permanencia" in TIPOS_NOTIFICACION
+
+def test_cola_llena_cuenta_descartes():
+    gestor = GestorAlertas(max_cola=1)
+    gestor._cola.put(("cam1", 0.0, [], [], []))  # El consumidor puede no haberla tomado todavía
+    for i in range(50):
+        gestor.actualizar("cam1", float(i), [], [])
+    gestor.detener()
+    assert gestor.descartadas > 0
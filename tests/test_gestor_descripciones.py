@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("PIL")  # descripciones.backends -> utils.imagenes_utils
+from descripciones.gestor_descripciones import GestorDescripciones
+
+class Respuesta:
+    status_code = 200
+    text = "descripción"
+
+class SesionPrueba:
+    def __init__(self):
+        self.prompts = []
+
+    def post(self, url, files=None, data=None, timeout=None):
+        self.prompts.append(data["prompt"])
+        return Respuesta()
+
+class DBPrueba:
+    def __init__(self):
+        self.descripciones = []
+
+    def guardar_descripcion(self, track_id, descripcion, id_camara=None):
+        self.descripciones.append((track_id, descripcion))
+
+def test_prompt_de_vila_por_llamada():
+    db = DBPrueba()
+    gestor = GestorDescripciones("prompt del gestor", db)
+    sesion = gestor.backends["vila"].sesion = SesionPrueba()
+    imagen = np.zeros((64, 32, 3), np.uint8)
+
+    gestor.describir_con_vila(imagen, 1, prompt="solo la ropa")
+    gestor.describir_con_vila(imagen, 2)
+
+    assert sesion.prompts == ["solo la ropa", "prompt del gestor"]
+    assert gestor.backends["vila"].prompt == "prompt del gestor"
+    assert db.descripciones == [(1, "descripción"), (2, "descripción")]
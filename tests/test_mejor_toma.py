@@ -0,0 +1,23 @@
+import numpy as np
+from utils.mejor_toma import puntuar_cajas
+
+def frame_prueba():
+    return np.random.default_rng(0).integers(0, 255, (360, 640, 3), dtype=np.uint8)
+
+def test_caja_sobre_el_borde_puntua_cero():
+    frame = frame_prueba()
+    cajas = [
+        (100, 100, 200, 300),   # Normal
+        (640, 50, 700, 200),    # x1 == ancho: recorte vacío tras recortar al frame
+        (50, 360, 150, 420),    # y1 == alto
+        (300, 100, 300, 200),   # Ancho cero
+    ]
+    puntajes = puntuar_cajas(frame, cajas)
+    assert puntajes.shape == (4,)
+    assert puntajes[0] > 0
+    assert list(puntajes[1:]) == [0.0, 0.0, 0.0]
+
+def test_frame_en_grises():
+    frame = frame_prueba()[:, :, 0]
+    puntajes = puntuar_cajas(frame, [(10, 10, 80, 200), (639, 0, 640, 360)])
+    assert puntajes[0] > 0 and puntajes[1] >= 0
@@ -0,0 +1,36 @@
+import urllib.error, urllib.request
+import pytest
+from utils.metricas import RegistroMetricas
+
+@pytest.fixture
+def servidor():
+    registro = RegistroMetricas()
+    servidor = registro.servir(0)
+    assert servidor.server_address[0] == "127.0.0.1"
+    yield registro, f"http://127.0.0.1:{servidor.server_address[1]}"
+    registro.perfilador.detener()
+    servidor.shutdown()
+    servidor.server_close()
+
+def codigo(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as respuesta:
+            return respuesta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+def test_metrics_responde(servidor):
+    registro, base = servidor
+    assert codigo(base + "/metrics") == 200
+
+@pytest.mark.parametrize("intervalo", ["abc", "0", "-1", "nan", "inf"])
+def test_intervalo_invalido_responde_400(servidor, intervalo):
+    registro, base = servidor
+    assert codigo(f"{base}/perfil/iniciar?intervalo={intervalo}") == 400
+    assert not registro.perfilador.activo
+
+def test_intervalo_acotado(servidor):
+    registro, base = servidor
+    assert codigo(base + "/perfil/iniciar?intervalo=0.00001") == 200
+    assert registro.perfilador.intervalo == 0.001
+    assert codigo(base + "/perfil/detener") == 200
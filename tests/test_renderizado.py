@@ -0,0 +1,15 @@
+import socket
+from utils.renderizado import Renderizador
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def test_mjpeg_escucha_solo_local_por_defecto(capsys):
+    renderizador = Renderizador({}, puerto_mjpeg=puerto_libre())
+    assert renderizador._servidor.server_address[0] == "127.0.0.1"
+    renderizador.iniciar()
+    renderizador.detener()
+    renderizador._servidor.server_close()
+    assert "http://127.0.0.1:" in capsys.readouterr().out
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from threading import Thread
+from utils.tasa_adaptativa import ControladorTasa
+
+class SinMovimiento:
+    def hay_movimiento(self, frame):
+        return False
+
+FRAME = np.zeros((36, 64, 3), np.uint8)
+
+def enviados(controlador, segundos, fps=25.0, desde=1000.0):
+    return sum(controlador.decidir(FRAME, desde + i / fps) for i in range(int(segundos * fps)))
+
+def test_latido_a_fps_min():
+    controlador = ControladorTasa(fps_min=0.5, fps_max=10.0, detector_movimiento=SinMovimiento())
+    assert enviados(controlador, 10) == 5
+
+def test_fps_min_cero_no_late():
+    controlador = ControladorTasa(fps_min=0, fps_max=10.0, detector_movimiento=SinMovimiento())
+    assert enviados(controlador, 10) == 0
+    assert controlador.saltados_quietud > 0
+
+    # Con tracks activos se detecta igual, a fps_max
+    controlador.registrar(1, 0.01, ahora=1010.0)
+    assert enviados(controlador, 1, desde=1010.0) >= 8
+
+@pytest.mark.parametrize("fps_min, fps_max", [(-1, 10), (1, 0), (5, 2)])
+def test_tasas_invalidas(fps_min, fps_max):
+    with pytest.raises(ValueError):
+        ControladorTasa(fps_min=fps_min, fps_max=fps_max)
+
+def test_estadisticas_concurrentes():
+    # decidir() corre en el hilo de captura; estadisticas() en el de métricas
+    controlador = ControladorTasa(fps_min=1000.0, fps_max=1000.0, ventana_metricas=0.001,
+                                  detector_movimiento=SinMovimiento())
+    errores = []
+
+    def leer():
+        try:
+            for i in range(20000):
+                controlador.estadisticas(ahora=1000.0 + i * 1e-4)
+        except Exception as e:
+            errores.append(e)
+
+    hilo = Thread(target=leer)
+    hilo.start()
+    for i in range(20000):
+        controlador.decidir(FRAME, 1000.0 + i * 2e-3)
+    hilo.join()
+    assert errores == []
+    assert controlador.enviados == 20000
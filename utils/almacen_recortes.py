@@ -0,0 +1,580 @@
+"""
+Almacén de recortes en segmentos de solo-agregado.
+
+En lugar de un JPEG por recorte (millones de archivos chicos: listados, backups
+y borrados de horas, inodos agotados), los recortes codificados se agregan al
+final de archivos de segmento (`segmento_000001.dat`) de hasta `tam_segmento`
+bytes. Cada segmento tiene al lado su índice (`segmento_000001.idx`) con un
+registro de tamaño fijo por recorte: track, tipo, instante, offset y largo.
+
+La base guarda una referencia `almacen:segmento:offset:largo` (ver `guardar`)
+en lugar de la carpeta; la lectura va directo al offset por mmap. `almacen` es
+el identificador del almacén (archivo `almacen.id`, creado al abrirlo por
+primera vez): con un almacén por cámara, la referencia dice en cuál buscar.
+
+La retención vence los recortes de a uno (lápidas en el índice) y borra los
+segmentos que quedan sin nada vivo; compactar reescribe los que quedan con poco.
+
+Un solo proceso puede tener abierto el almacén (lock exclusivo sobre
+`almacen.lock`): la herramienta se niega a correr mientras la aplicación lo usa.
+
+Uso como herramienta:
+    python -m utils.almacen_recortes estadisticas Personas_Detectadas
+    python -m utils.almacen_recortes exportar Personas_Detectadas carpeta_destino
+    python -m utils.almacen_recortes retencion Personas_Detectadas --dias 30 --max-gb 50
+    python -m utils.almacen_recortes compactar Personas_Detectadas
+"""
+import argparse, cv2, datetime, glob, mmap, os, struct, time, uuid, numpy as np
+from collections import namedtuple, defaultdict
+from threading import Lock, Thread, Event
+from utils.metricas import metricas
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin lock entre procesos
+    fcntl = None
+
+TIPOS = ("Cuerpo", "Cara")
+
+# track (int64), tipo (uint8), instante (double), offset (uint64), largo (uint32)
+_REGISTRO = struct.Struct("<qBdQI")
+# Un largo 0 es una lápida: los recortes del track anteriores a `instante` se borraron
+_LAPIDA = 0
+# segmento y offset viejos -> segmento y offset nuevos (después de compactar)
+_REUBICACION = struct.Struct("<IQIQ")
+
+Recorte = namedtuple("Recorte", "id_persona tipo instante segmento offset largo")
+
+_GUARDADOS = metricas.contador("recortes_guardados_total", "Recortes agregados al almacén", ["tipo"])
+_BYTES = metricas.contador("recortes_bytes_total", "Bytes agregados al almacén")
+
+def referencia(id_almacen, recorte):
+    return f"{id_almacen}:{recorte.segmento:06d}:{recorte.offset}:{recorte.largo}"
+
+def parsear_referencia(ref):
+    """
+    Retorna:
+        tuple | None: (almacen, segmento, offset, largo), o None si `ref` no es una
+                      referencia del almacén (p. ej. una carpeta del formato anterior).
+                      `almacen` es None en las referencias sin identificador
+                      (`segmento:offset:largo`, anteriores a él).
+    """
+    partes = str(ref).split(":")
+    if len(partes) == 4 and partes[0].isalnum():
+        almacen, partes = partes[0], partes[1:]
+    elif len(partes) == 3:
+        almacen = None
+    else:
+        return None
+    if not all(p.isdigit() for p in partes):
+        return None
+    return (almacen,) + tuple(int(p) for p in partes)
+
+def _bloquear(carpeta):
+    """
+    Toma el lock exclusivo del almacén de `carpeta`.
+
+    Retorna:
+        file | None: Archivo del lock (se libera al cerrarlo).
+    """
+    if fcntl is None:
+        return None
+    archivo = open(os.path.join(carpeta, "almacen.lock"), "a+")
+    try:
+        fcntl.flock(archivo.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        archivo.seek(0)
+        pid = archivo.read().strip() or "?"
+        archivo.close()
+        raise RuntimeError(f"El almacén {carpeta} está abierto por otro proceso (pid {pid})")
+    archivo.truncate(0)
+    archivo.write(str(os.getpid()))
+    archivo.flush()
+    return archivo
+
+def _leer_id(carpeta):
+    ruta = os.path.join(carpeta, "almacen.id")
+    if os.path.exists(ruta):
+        with open(ruta, encoding="utf-8") as f:
+            return f.read().strip()
+    id_almacen = uuid.uuid4().hex[:12]
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(id_almacen)
+    return id_almacen
+
+class AlmacenRecortes:
+    def __init__(self, carpeta, tam_segmento=256 * 2**20, calidad_jpeg=90):
+        """
+        Abre (o crea) el almacén de `carpeta`, reconstruyendo el índice en memoria
+        desde los archivos .idx. Un registro de índice que apunta más allá del fin
+        de su segmento (corte de luz entre los dos writes) se ignora.
+
+        Lanza RuntimeError si otro proceso tiene abierto el almacén.
+
+        Parámetros:
+            carpeta (str): Carpeta del almacén.
+            tam_segmento (int): Bytes a partir de los cuales se empieza un segmento nuevo.
+            calidad_jpeg (int): Calidad de codificación de los recortes.
+        """
+        self.carpeta = carpeta
+        self.tam_segmento = tam_segmento
+        self.calidad_jpeg = calidad_jpeg
+        os.makedirs(carpeta, exist_ok=True)
+        self._archivo_lock = _bloquear(carpeta)
+        self.id = _leer_id(carpeta)
+
+        self._lock = Lock()
+        self._por_track = defaultdict(list)  # id_persona -> [Recorte]
+        self._lapidas = {}                   # id_persona -> (instante del último borrado, segmento)
+        self._segmentos = {}                 # numero -> {"bytes", "vivos", "ultimo"}
+        self._reubicados = {}                # (segmento, offset) -> (segmento, offset)
+        self._mapas = {}                     # numero -> (mmap, archivo)
+        self._activo = None
+        self._datos = None
+        self._indice = None
+
+        self._cargar()
+
+    # --- Escritura ---
+
+    def guardar(self, imagen, id_persona, tipo="Cuerpo", instante=None):
+        """
+        Codifica `imagen` como JPEG y la agrega al segmento activo.
+
+        Retorna:
+            str | None: Referencia `almacen:segmento:offset:largo`, o None si la imagen
+                        es vacía o no se pudo codificar.
+        """
+        if imagen is None or imagen.size == 0:
+            print(f"[ADVERTENCIA] Imagen vacía para ID {id_persona}")
+            return None
+        ok, buffer = cv2.imencode(".jpg", imagen, [cv2.IMWRITE_JPEG_QUALITY, self.calidad_jpeg])
+        if not ok:
+            print(f"[ERROR] No se pudo codificar la imagen para ID {id_persona}")
+            return None
+        recorte = self._agregar(buffer.tobytes(), id_persona, tipo, instante or time.time())
+        _GUARDADOS.con(tipo=tipo).incrementar()
+        _BYTES.incrementar(recorte.largo)
+        return referencia(self.id, recorte)
+
+    def eliminar(self, id_persona, hasta=None):
+        """
+        Borra (lógicamente) los recortes de un track tomados hasta `hasta` (por
+        defecto, todos). El espacio se recupera al compactar.
+
+        Retorna:
+            int: Recortes borrados.
+        """
+        with self._lock:
+            return self._eliminar(id_persona, time.time() if hasta is None else hasta)
+
+    def _eliminar(self, id_persona, hasta):
+        # Con el lock tomado
+        recortes = self._por_track.get(id_persona, [])
+        vencidos = [r for r in recortes if r.instante <= hasta]
+        if not vencidos:
+            return 0
+        self._escribir_lapida(id_persona, hasta)
+        for recorte in vencidos:
+            self._segmentos[recorte.segmento]["vivos"] -= recorte.largo
+        vivos = [r for r in recortes if r.instante > hasta]
+        if vivos:
+            self._por_track[id_persona] = vivos
+        else:
+            del self._por_track[id_persona]
+        return len(vencidos)
+
+    def _agregar(self, datos, id_persona, tipo, instante):
+        with self._lock:
+            if self._datos is None or self._segmentos[self._activo]["bytes"] + len(datos) > self.tam_segmento:
+                self._rotar()
+            offset = self._segmentos[self._activo]["bytes"]
+            self._datos.write(datos)
+            self._datos.flush()
+            # El índice se escribe después de los datos: nunca apunta a bytes que no existen
+            self._escribir_indice(id_persona, TIPOS.index(tipo), instante, offset, len(datos))
+            recorte = Recorte(id_persona, tipo, instante, self._activo, offset, len(datos))
+            self._registrar(recorte)
+            return recorte
+
+    def _escribir_lapida(self, id_persona, instante):
+        self._escribir_indice(id_persona, 0, instante, 0, _LAPIDA)
+        if instante >= self._lapidas.get(id_persona, (-1.0, 0))[0]:
+            self._lapidas[id_persona] = (instante, self._activo)
+        segmento = self._segmentos[self._activo]
+        segmento["ultimo"] = max(segmento["ultimo"], instante)
+
+    def _escribir_indice(self, id_persona, tipo, instante, offset, largo):
+        if self._indice is None:
+            self._rotar()
+        self._indice.write(_REGISTRO.pack(int(id_persona), tipo, instante, offset, largo))
+        self._indice.flush()
+
+    def _registrar(self, recorte):
+        self._por_track[recorte.id_persona].append(recorte)
+        segmento = self._segmentos[recorte.segmento]
+        segmento["bytes"] = max(segmento["bytes"], recorte.offset + recorte.largo)
+        segmento["vivos"] += recorte.largo
+        segmento["ultimo"] = max(segmento["ultimo"], recorte.instante)
+
+    def _rotar(self):
+        self._cerrar_activo()
+        self._activo = max(self._segmentos, default=0) + 1
+        self._segmentos[self._activo] = {"bytes": 0, "vivos": 0, "ultimo": 0.0}
+        self._datos = open(self._ruta(self._activo, "dat"), "ab")
+        self._indice = open(self._ruta(self._activo, "idx"), "ab")
+
+    def _cerrar_activo(self):
+        for archivo in (self._datos, self._indice):
+            if archivo:
+                archivo.close()
+        self._datos = self._indice = None
+
+    # --- Lectura ---
+
+    def leer(self, ref):
+        """
+        Lee un recorte por su referencia (mmap del segmento, sin copiar el archivo).
+
+        Retorna:
+            np.array | None: Imagen BGR, o None si la referencia no existe (p. ej. el
+                             segmento se borró por retención) o es de otro almacén.
+        """
+        datos = self.leer_bytes(ref)
+        if datos is None:
+            return None
+        return cv2.imdecode(np.frombuffer(datos, np.uint8), cv2.IMREAD_COLOR)
+
+    def leer_bytes(self, ref):
+        """
+        Retorna:
+            bytes | None: JPEG tal cual está en el segmento.
+        """
+        if isinstance(ref, str):
+            partes = parsear_referencia(ref)
+            if partes is None or partes[0] not in (None, self.id):
+                return None
+            partes = partes[1:]
+        else:
+            partes = ref
+        segmento, offset, largo = partes
+        with self._lock:
+            # Un recorte movido al compactar se sigue encontrando por su referencia vieja
+            while (segmento, offset) in self._reubicados:
+                segmento, offset = self._reubicados[(segmento, offset)]
+            mapa = self._mapa(segmento, offset + largo)
+            if mapa is None:
+                return None
+            return mapa[offset:offset + largo]
+
+    def _mapa(self, segmento, hasta):
+        # Se llama con el lock tomado. El segmento activo crece: se vuelve a mapear.
+        actual = self._mapas.get(segmento)
+        if actual is not None and len(actual[0]) >= hasta:
+            return actual[0]
+        if actual is not None:
+            actual[0].close()
+            actual[1].close()
+            del self._mapas[segmento]
+
+        ruta = self._ruta(segmento, "dat")
+        if not os.path.exists(ruta) or os.path.getsize(ruta) < hasta:
+            return None
+        archivo = open(ruta, "rb")
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapas[segmento] = (mapa, archivo)
+        return mapa
+
+    def recortes(self, id_persona=None, tipo=None):
+        """
+        Retorna:
+            list[Recorte]: Recortes vivos (de un track o de todos), del más viejo al más nuevo.
+        """
+        with self._lock:
+            if id_persona is not None:
+                lista = list(self._por_track.get(id_persona, []))
+            else:
+                lista = [r for recortes in self._por_track.values() for r in recortes]
+        lista = [r for r in lista if tipo is None or r.tipo == tipo]
+        return sorted(lista, key=lambda r: r.instante)
+
+    # --- Retención y compactación ---
+
+    def aplicar_retencion(self, max_edad=None, max_bytes=None, ahora=None):
+        """
+        Vence los recortes de más de `max_edad` segundos (lápidas: su espacio se
+        recupera al compactar) y borra segmentos completos (nunca el activo): los
+        que quedan sin recortes vivos y, si el total sigue por encima de
+        `max_bytes`, los más viejos hasta entrar en el límite.
+
+        Retorna:
+            int: Segmentos borrados.
+        """
+        ahora = ahora or time.time()
+        borrados = vencidos = 0
+        with self._lock:
+            if max_edad is not None:
+                limite = ahora - max_edad
+                for id_persona in list(self._por_track):
+                    vencidos += self._eliminar(id_persona, limite)
+            cerrados = sorted(n for n in self._segmentos if n != self._activo)
+            total = sum(s["bytes"] for s in self._segmentos.values())
+            for numero in cerrados:
+                segmento = self._segmentos[numero]
+                viejo = max_edad is not None and (ahora - segmento["ultimo"] > max_edad or not segmento["vivos"])
+                excedido = max_bytes is not None and total > max_bytes
+                if not viejo and not excedido:
+                    continue
+                total -= segmento["bytes"]
+                self._borrar_segmento(numero)
+                borrados += 1
+        if borrados or vencidos:
+            print(f"[INFO] Almacén de recortes: {vencidos} recortes vencidos, {borrados} segmentos borrados por retención")
+        return borrados
+
+    def compactar(self, min_vivos=0.5):
+        """
+        Reescribe en el segmento activo los recortes vivos de los segmentos cerrados
+        con menos de `min_vivos` (fracción de bytes) de datos vivos, y los borra.
+        Las referencias viejas siguen funcionando (tabla de reubicaciones).
+
+        Retorna:
+            int: Bytes recuperados.
+        """
+        with self._lock:
+            candidatos = [n for n, s in self._segmentos.items()
+                          if n != self._activo and s["bytes"] and s["vivos"] / s["bytes"] < min_vivos]
+        recuperados = 0
+        for numero in sorted(candidatos):
+            with self._lock:
+                vivos = [r for recortes in self._por_track.values() for r in recortes if r.segmento == numero]
+                datos = [(r, bytes(self._mapa(numero, r.offset + r.largo)[r.offset:r.offset + r.largo])) for r in vivos]
+            for viejo, contenido in datos:
+                nuevo = self._agregar(contenido, viejo.id_persona, viejo.tipo, viejo.instante)
+                with self._lock:
+                    self._por_track[viejo.id_persona].remove(viejo)
+                    self._segmentos[numero]["vivos"] -= viejo.largo
+                    self._reubicar(viejo, nuevo)
+            with self._lock:
+                recuperados += self._segmentos[numero]["bytes"] - sum(len(c) for _, c in datos)
+                self._borrar_segmento(numero)
+        return recuperados
+
+    def _reubicar(self, viejo, nuevo):
+        with open(os.path.join(self.carpeta, "reubicados.idx"), "ab") as f:
+            f.write(_REUBICACION.pack(viejo.segmento, viejo.offset, nuevo.segmento, nuevo.offset))
+        self._reubicados[(viejo.segmento, viejo.offset)] = (nuevo.segmento, nuevo.offset)
+
+    def _borrar_segmento(self, numero):
+        mapa = self._mapas.pop(numero, None)
+        if mapa:
+            mapa[0].close()
+            mapa[1].close()
+        for extension in ("dat", "idx"):
+            ruta = self._ruta(numero, extension)
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        del self._segmentos[numero]
+        # Las lápidas del segmento se vuelven a escribir mientras queden segmentos
+        # anteriores con recortes que podrían "revivir" al recargar
+        anteriores = any(n < numero for n in self._segmentos)
+        for id_persona, (instante, segmento) in list(self._lapidas.items()):
+            if segmento == numero:
+                if anteriores:
+                    self._escribir_lapida(id_persona, instante)
+                else:
+                    del self._lapidas[id_persona]
+        for id_persona in list(self._por_track):
+            self._por_track[id_persona] = [r for r in self._por_track[id_persona] if r.segmento != numero]
+            if not self._por_track[id_persona]:
+                del self._por_track[id_persona]
+
+    # --- Exportación ---
+
+    def exportar(self, carpeta_destino, desde=None):
+        """
+        Escribe los recortes con el formato anterior:
+        persona_X/<tipo>/<tipo>_X_<fecha>.jpg (los bytes JPEG se copian sin recodificar).
+
+        Retorna:
+            int: Archivos escritos.
+        """
+        escritos = 0
+        for recorte in self.recortes():
+            if desde is not None and recorte.instante < desde:
+                continue
+            carpeta = os.path.join(carpeta_destino, f"persona_{recorte.id_persona}", recorte.tipo)
+            os.makedirs(carpeta, exist_ok=True)
+            fecha = datetime.datetime.fromtimestamp(recorte.instante).strftime("%Y-%m-%d_%H-%M-%S-%f")
+            with open(os.path.join(carpeta, f"{recorte.tipo}_{recorte.id_persona}_{fecha}.jpg"), "wb") as f:
+                f.write(self.leer_bytes((recorte.segmento, recorte.offset, recorte.largo)))
+            escritos += 1
+        return escritos
+
+    # --- Carga ---
+
+    def _ruta(self, numero, extension):
+        return os.path.join(self.carpeta, f"segmento_{numero:06d}.{extension}")
+
+    def _cargar(self):
+        registros = []
+        for ruta in sorted(glob.glob(os.path.join(self.carpeta, "segmento_*.idx"))):
+            numero = int(os.path.basename(ruta)[9:15])
+            ruta_datos = self._ruta(numero, "dat")
+            tam_datos = os.path.getsize(ruta_datos) if os.path.exists(ruta_datos) else 0
+            self._segmentos[numero] = {"bytes": tam_datos, "vivos": 0, "ultimo": 0.0}
+            with open(ruta, "rb") as f:
+                contenido = f.read()
+            # Un registro a medio escribir al final se descarta
+            contenido = contenido[:len(contenido) - len(contenido) % _REGISTRO.size]
+            for id_persona, tipo, instante, offset, largo in _REGISTRO.iter_unpack(contenido):
+                if largo == _LAPIDA:
+                    if instante >= self._lapidas.get(id_persona, (-1.0, 0))[0]:
+                        self._lapidas[id_persona] = (instante, numero)
+                    self._segmentos[numero]["ultimo"] = max(self._segmentos[numero]["ultimo"], instante)
+                elif offset + largo <= tam_datos:
+                    registros.append(Recorte(id_persona, TIPOS[tipo], instante, numero, offset, largo))
+
+        for recorte in registros:
+            if recorte.instante > self._lapidas.get(recorte.id_persona, (-1.0, 0))[0]:
+                self._registrar(recorte)
+
+        ruta_reubicados = os.path.join(self.carpeta, "reubicados.idx")
+        if os.path.exists(ruta_reubicados):
+            with open(ruta_reubicados, "rb") as f:
+                contenido = f.read()
+            contenido = contenido[:len(contenido) - len(contenido) % _REUBICACION.size]
+            for seg_viejo, off_viejo, seg_nuevo, off_nuevo in _REUBICACION.iter_unpack(contenido):
+                self._reubicados[(seg_viejo, off_viejo)] = (seg_nuevo, off_nuevo)
+
+        # Se sigue agregando al último segmento si todavía tiene lugar
+        if self._segmentos:
+            ultimo = max(self._segmentos)
+            if self._segmentos[ultimo]["bytes"] < self.tam_segmento:
+                self._activo = ultimo
+                self._datos = open(self._ruta(ultimo, "dat"), "ab")
+                self._indice = open(self._ruta(ultimo, "idx"), "ab")
+
+    def cerrar(self):
+        with self._lock:
+            self._cerrar_activo()
+            for mapa, archivo in self._mapas.values():
+                mapa.close()
+                archivo.close()
+            self._mapas.clear()
+            if self._archivo_lock:
+                self._archivo_lock.close()
+                self._archivo_lock = None
+
+    def estadisticas(self):
+        with self._lock:
+            total = sum(s["bytes"] for s in self._segmentos.values())
+            vivos = sum(s["vivos"] for s in self._segmentos.values())
+            return {
+                "segmentos": len(self._segmentos),
+                "tracks": len(self._por_track),
+                "recortes": sum(len(r) for r in self._por_track.values()),
+                "mb": total / 2**20,
+                "proporcion_viva": vivos / total if total else 1.0,
+                "reubicados": len(self._reubicados),
+            }
+
+# Un almacén abierto por carpeta: dos instancias sobre los mismos segmentos se pisarían
+_almacenes = {}
+_lock_almacenes = Lock()
+
+def abrir_almacen(carpeta, **kwargs):
+    """
+    Retorna:
+        AlmacenRecortes: El almacén de `carpeta`, compartido por todo el proceso.
+    """
+    clave = os.path.abspath(carpeta)
+    with _lock_almacenes:
+        if clave not in _almacenes:
+            _almacenes[clave] = AlmacenRecortes(carpeta, **kwargs)
+        return _almacenes[clave]
+
+def almacen_de(ref, carpeta=None):
+    """
+    Una referencia sin identificador (formato anterior) no dice de qué almacén
+    es: se resuelve contra el de `carpeta` (la de la fila que la guarda) o, sin
+    carpeta, solo si hay un único almacén abierto.
+
+    Parámetros:
+        ref (str): Referencia de un recorte.
+        carpeta (str): Carpeta del almacén de la fila, para referencias sin identificador.
+
+    Retorna:
+        AlmacenRecortes | None: El almacén abierto al que pertenece la referencia `ref`.
+    """
+    partes = parsear_referencia(ref)
+    if partes is None:
+        return None
+    with _lock_almacenes:
+        if partes[0] is not None:
+            return next((a for a in _almacenes.values() if a.id == partes[0]), None)
+        if carpeta is not None:
+            return _almacenes.get(os.path.abspath(carpeta))
+        if len(_almacenes) == 1:
+            return next(iter(_almacenes.values()))
+    return None
+
+def cerrar_almacenes():
+    with _lock_almacenes:
+        for almacen in _almacenes.values():
+            almacen.cerrar()
+        _almacenes.clear()
+
+def iniciar_mantenimiento(max_edad=None, max_bytes=None, min_vivos=0.5, intervalo=3600.0):
+    """
+    Aplica retención y compactación a todos los almacenes abiertos cada
+    `intervalo` segundos, en un hilo propio.
+
+    Retorna:
+        Event: Al activarlo, el hilo termina.
+    """
+    detener = Event()
+
+    def mantener():
+        while not detener.wait(intervalo):
+            with _lock_almacenes:
+                almacenes = list(_almacenes.values())
+            for almacen in almacenes:
+                try:
+                    almacen.aplicar_retencion(max_edad, max_bytes)
+                    almacen.compactar(min_vivos)
+                except Exception as e:
+                    print(f"[ERROR] Mantenimiento del almacén {almacen.carpeta}: {e}")
+
+    Thread(target=mantener, daemon=True, name="mantenimiento-recortes").start()
+    return detener
+
+def principal():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("accion", choices=["estadisticas", "exportar", "retencion", "compactar"])
+    parser.add_argument("carpeta", help="Carpeta del almacén")
+    parser.add_argument("destino", nargs="?", help="Carpeta de destino (exportar)")
+    parser.add_argument("--dias", type=float, help="Retención: edad máxima en días")
+    parser.add_argument("--max-gb", type=float, help="Retención: tamaño máximo en GB")
+    parser.add_argument("--min-vivos", type=float, default=0.5, help="Compactar: fracción viva mínima")
+    args = parser.parse_args()
+
+    try:
+        almacen = AlmacenRecortes(args.carpeta)
+    except RuntimeError as e:
+        parser.exit(1, f"[ERROR] {e}. Detener la aplicación (o usar su mantenimiento: "
+                       f"RETENCION_DIAS, RETENCION_GB) antes de correr la herramienta.\n")
+    if args.accion == "exportar":
+        if not args.destino:
+            parser.error("exportar necesita una carpeta de destino")
+        print(f"{almacen.exportar(args.destino)} archivos exportados a {args.destino}")
+    elif args.accion == "retencion":
+        almacen.aplicar_retencion(args.dias * 86400 if args.dias else None,
+                                  int(args.max_gb * 2**30) if args.max_gb else None)
+    elif args.accion == "compactar":
+        print(f"{almacen.compactar(args.min_vivos) / 2**20:.1f} MB recuperados")
+    print(almacen.estadisticas())
+    almacen.cerrar()
+
+if __name__ == "__main__":
+    principal()
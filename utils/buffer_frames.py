@@ -0,0 +1,199 @@
+import numpy as np
+from collections import deque
+from threading import Condition, Lock
+
+class FrameCompartido:
+    def __init__(self, pool, slot, indice, imagen, instante=None):
+        """
+        Vista de solo lectura sobre un slot del pool. Debe liberarse al terminar
+        de usarla (o usarse como context manager) para que el slot se reutilice.
+        `instante` es la hora de captura del frame (time.time()), si se publicó con ella.
+        """
+        self.pool = pool
+        self.slot = slot
+        self.indice = indice
+        self.imagen = imagen
+        self.instante = instante
+        self._liberado = False
+
+    def liberar(self):
+        if not self._liberado:
+            self._liberado = True
+            self.pool._liberar(self.slot)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.liberar()
+
+class PoolFrames:
+    def __init__(self, forma, num_slots=5, dtype=np.uint8):
+        """
+        Pool de buffers preasignados para pasar frames de la captura a la detección
+        sin copias ni colas. Semántica "gana el último": si llega un frame nuevo
+        antes de que el anterior se consuma, el anterior se descarta.
+
+        Parámetros:
+            forma (tuple): Forma de los frames (alto, ancho, canales).
+            num_slots (int): Cantidad de buffers. Con 4 o más siempre hay un slot
+                             libre para escribir aunque haya uno en detección, uno
+                             pendiente y uno mostrándose.
+        """
+        self.forma = tuple(forma)
+        self._buffers = [np.empty(self.forma, dtype=dtype) for _ in range(num_slots)]
+        self._refs = [0] * num_slots
+        self._instantes = [None] * num_slots
+        self._libres = deque(range(num_slots))
+        self._escritos = set()
+        self._pendiente = None  # (slot, indice) esperando detección
+        self._ultimo = None     # (slot, indice) último frame publicado (para mostrar)
+        self._cond = Condition()
+
+        self.publicados = 0
+        self.descartados = 0
+        self.reutilizaciones = 0
+
+    def reservar(self):
+        """
+        Obtiene un slot libre para escribir (por ejemplo con `video.read(buffer)`).
+
+        Retorna:
+            tuple | None: (slot, buffer escribible) o None si no hay slots libres.
+        """
+        with self._cond:
+            if self._libres:
+                slot = self._libres.popleft()
+            elif self._pendiente is not None and self._pendiente != self._ultimo and self._refs[self._pendiente[0]] == 0:
+                # Se roba el frame pendiente más viejo: nadie lo tomó a tiempo
+                slot = self._pendiente[0]
+                self._pendiente = None
+                self.descartados += 1
+            else:
+                self.descartados += 1
+                return None
+
+            if slot in self._escritos:
+                self.reutilizaciones += 1
+            self._escritos.add(slot)
+            return slot, self._buffers[slot]
+
+    def buffer(self, slot):
+        """
+        Buffer de un slot reservado, para que la captura lo inspeccione antes de publicarlo.
+        """
+        return self._buffers[slot]
+
+    def cancelar(self, slot):
+        """
+        Devuelve al pool un slot reservado que no se llegó a publicar.
+        """
+        with self._cond:
+            self._libres.append(slot)
+
+    def publicar(self, slot, indice, detectar=True, instante=None):
+        """
+        Publica un slot ya escrito como el frame más reciente.
+
+        Parámetros:
+            slot (int): Slot obtenido con `reservar`.
+            indice (int): Número de frame.
+            detectar (bool): Si el frame queda disponible para `tomar`. Si ya había
+                             otro pendiente sin consumir, ese se descarta.
+            instante (float | None): Hora de captura, para alinear con otro stream.
+        """
+        with self._cond:
+            self._instantes[slot] = instante
+            anterior_ultimo = self._ultimo
+            self._ultimo = (slot, indice)
+
+            if detectar:
+                anterior_pendiente = self._pendiente
+                self._pendiente = (slot, indice)
+                if anterior_pendiente is not None:
+                    self.descartados += 1
+                    self._devolver_si_libre(anterior_pendiente[0])
+                self._cond.notify_all()
+
+            if anterior_ultimo is not None:
+                self._devolver_si_libre(anterior_ultimo[0])
+            self.publicados += 1
+
+    def tomar(self, timeout=None):
+        """
+        Toma el frame pendiente de detección (el más reciente).
+
+        Retorna:
+            FrameCompartido | None: Vista de solo lectura o None si venció el timeout.
+        """
+        with self._cond:
+            if self._pendiente is None and not self._cond.wait_for(lambda: self._pendiente is not None, timeout):
+                return None
+            slot, indice = self._pendiente
+            self._pendiente = None
+            return self._referenciar(slot, indice)
+
+    def ver_ultimo(self):
+        """
+        Retorna el último frame publicado (para mostrar), sin consumirlo.
+
+        Retorna:
+            FrameCompartido | None
+        """
+        with self._cond:
+            if self._ultimo is None:
+                return None
+            return self._referenciar(*self._ultimo)
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                "publicados": self.publicados,
+                "descartados": self.descartados,
+                "reutilizaciones": self.reutilizaciones,
+                "slots_libres": len(self._libres),
+            }
+
+    def _referenciar(self, slot, indice):
+        self._refs[slot] += 1
+        vista = self._buffers[slot].view()
+        vista.flags.writeable = False
+        return FrameCompartido(self, slot, indice, vista, self._instantes[slot])
+
+    def _liberar(self, slot):
+        with self._cond:
+            self._refs[slot] -= 1
+            self._devolver_si_libre(slot)
+
+    def _devolver_si_libre(self, slot):
+        if self._refs[slot] > 0:
+            return
+        if self._pendiente is not None and self._pendiente[0] == slot:
+            return
+        if self._ultimo is not None and self._ultimo[0] == slot:
+            return
+        if slot not in self._libres:
+            self._libres.append(slot)
+
+class UltimoResultado:
+    def __init__(self):
+        """
+        Guarda solo el último resultado publicado. Reemplaza a una cola que el
+        consumidor tenía que vaciar con empty()/get().
+        """
+        self._lock = Lock()
+        self._valor = None
+        self.version = 0
+
+    def publicar(self, valor):
+        with self._lock:
+            self._valor = valor
+            self.version += 1
+
+    def obtener(self):
+        """
+        Retorna:
+            tuple: (version, valor). La versión permite saber si hay algo nuevo.
+        """
+        with self._lock:
+            return self.version, self._valor
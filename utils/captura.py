@@ -0,0 +1,368 @@
+import cv2, random, time
+from collections import deque
+from threading import Thread, Event, Lock, Condition
+from utils.metricas import metricas
+
+_LECTURA = metricas.histograma("captura_lectura_segundos", "Tiempo de decodificar un frame", ["camara"])
+_FRAMES = metricas.contador("frames_capturados_total", "Frames leídos del stream", ["camara"])
+_CONEXIONES = metricas.contador("conexiones_total", "Intentos de conexión al stream", ["camara"])
+_RECONEXIONES = metricas.contador("reconexiones_total", "Vueltas del stream después de un corte", ["camara"])
+_CAIDA = metricas.contador("captura_caida_segundos_total", "Segundos sin frames por cortes del stream", ["camara"])
+_CONECTADA = metricas.indicador("captura_conectada", "1 si el stream está entregando frames", ["camara"])
+_ALINEADOS = metricas.contador("stream_alta_frames_total", "Pedidos de frame del stream principal", ["camara", "resultado"])
+
+def abrir_ffmpeg(url, timeout_apertura=5.0, timeout_lectura=5.0):
+    """
+    VideoCapture de FFmpeg con timeouts de apertura y lectura. Sin ellos, un
+    stream caído puede dejar `read()` bloqueado ~30 s antes de fallar.
+    """
+    return cv2.VideoCapture(url, cv2.CAP_FFMPEG, [
+        cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(timeout_apertura * 1000),
+        cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(timeout_lectura * 1000),
+    ])
+
+def url_substream(url):
+    """
+    URL del substream de una cámara a partir de la del stream principal, con la
+    convención de Dahua/Amcrest (`subtype=0` principal, `subtype=1` secundario).
+    Otras marcas usan rutas propias: configurar la URL explícitamente.
+    """
+    return url.replace("subtype=0", "subtype=1")
+
+def escalar_cajas(cajas, origen, destino):
+    """
+    Lleva cajas (x1, y1, x2, y2) de un frame de forma `origen` a uno de forma
+    `destino` (p. ej. del substream al stream principal). Ambos streams muestran
+    el mismo campo visual, así que basta con escalar cada eje.
+
+    Retorna:
+        list[list[int]]
+    """
+    ex, ey = destino[1] / origen[1], destino[0] / origen[0]
+    return [[int(x1 * ex), int(y1 * ey), int(round(x2 * ex)), int(round(y2 * ey))] for x1, y1, x2, y2 in cajas]
+
+class CapturaStream:
+    def __init__(self, id_camara, url, leer, entregar, abrir=abrir_ffmpeg, al_reconectar=None,
+                 espera_inicial=0.05, espera_max=10.0, jitter=0.5, demanda=None):
+        """
+        Captura de un stream en su propio hilo: abre, decodifica y entrega cada
+        frame. Ante un corte reintenta con espera exponencial con jitter (50 ms,
+        100 ms, 200 ms... hasta `espera_max`), así un corte breve de red cuesta
+        milisegundos y un stream caído no se reabre en ráfaga. El jitter evita
+        que varias cámaras de un mismo NVR reintenten a la vez.
+
+        Lo que está después de la captura (pool de frames, detector, tracker,
+        modelos) no se toca al reconectar: solo se reabre el VideoCapture.
+
+        Parámetros:
+            id_camara: Identificador (para logs y métricas).
+            url (str): Stream RTSP, archivo o dispositivo.
+            leer (callable): Recibe el VideoCapture y devuelve (ok, dato); p. ej.
+                             Camara.leer, que decodifica directo en el pool de frames.
+            entregar (callable): Recibe el `dato` de cada frame leído.
+            abrir (callable): url -> VideoCapture (reemplazable por un stand-in en pruebas).
+            al_reconectar (callable | None): Recibe los segundos sin frames cuando el
+                                             stream vuelve después de un corte.
+            espera_inicial (float): Primera espera entre reintentos, en segundos.
+            espera_max (float): Tope de la espera entre reintentos.
+            jitter (float): Variación aleatoria relativa de cada espera (0.5 = ±50 %).
+            demanda (Event | None): Si se pasa, el stream solo se mantiene abierto
+                                    mientras el evento está activo; al apagarse se
+                                    cierra (sin contarlo como corte) hasta que vuelva.
+        """
+        self.id = id_camara
+        self.url = url
+        self.leer = leer
+        self.entregar = entregar
+        self.abrir = abrir
+        self.al_reconectar = al_reconectar
+        self.espera_inicial = espera_inicial
+        self.espera_max = espera_max
+        self.jitter = jitter
+        self.demanda = demanda
+
+        self._detenido = Event()
+        self._hilo = None
+        self._lock = Lock()
+
+        self.conectada = False
+        self.frames = 0
+        self.conexiones = 0
+        self.reconexiones = 0
+        self.caida_total = 0.0
+        self.caida_ultima = 0.0
+        self.caida_max = 0.0
+        self._caida_desde = None  # Instante del corte en curso
+
+        self._m_lectura = _LECTURA.con(camara=id_camara)
+        self._m_frames = _FRAMES.con(camara=id_camara)
+        self._m_conexiones = _CONEXIONES.con(camara=id_camara)
+        self._m_reconexiones = _RECONEXIONES.con(camara=id_camara)
+        self._m_caida = _CAIDA.con(camara=id_camara)
+        self._m_conectada = _CONECTADA.con(camara=id_camara)
+
+    def iniciar(self):
+        self._hilo = Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+
+    def detener(self, timeout=None):
+        """
+        Detiene la captura. Con `timeout`, espera hasta ese tiempo a que el hilo
+        termine (puede estar bloqueado en una lectura hasta el timeout de FFmpeg).
+        """
+        self._detenido.set()
+        if timeout is not None and self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def espera(self, intentos):
+        """
+        Segundos a esperar antes del reintento número `intentos` (desde 0). El
+        jitter nunca lleva la espera por encima de `espera_max`.
+        """
+        base = min(self.espera_max, self.espera_inicial * 2 ** intentos)
+        return min(self.espera_max, base * random.uniform(1 - self.jitter, 1 + self.jitter))
+
+    def estadisticas(self):
+        with self._lock:
+            caida_actual = time.monotonic() - self._caida_desde if self._caida_desde is not None else 0.0
+            return {
+                "conectada": self.conectada,
+                "frames": self.frames,
+                "conexiones": self.conexiones,
+                "reconexiones": self.reconexiones,
+                "caida_s_total": self.caida_total + caida_actual,
+                "caida_s_ultima": self.caida_ultima,
+                "caida_s_max": self.caida_max,
+                "caida_s_actual": caida_actual,
+            }
+
+    def _sin_demanda(self):
+        return self.demanda is not None and not self.demanda.is_set()
+
+    def _bucle(self):
+        intentos = 0
+        while not self._detenido.is_set():
+            if self._sin_demanda():
+                self.demanda.wait(0.5)
+                continue
+            self.conexiones += 1
+            self._m_conexiones.incrementar()
+            video = self.abrir(self.url)
+            if not video.isOpened():
+                video.release()
+                if intentos == 0:
+                    print(f"[CAM {self.id}] Error al abrir el stream, reintentando...")
+                self._detenido.wait(self.espera(intentos))
+                intentos += 1
+                continue
+
+            while not self._detenido.is_set() and not self._sin_demanda():
+                with self._m_lectura.cronometrar():
+                    ok, dato = self.leer(video)
+                if not ok:
+                    break
+                if not self.conectada:
+                    self._conectada(intentos)
+                    intentos = 0
+                self.entregar(dato)
+                self.frames += 1
+                self._m_frames.incrementar()
+            video.release()
+
+            if self._detenido.is_set():
+                break
+            if self._sin_demanda():
+                # Cierre voluntario: no es un corte
+                with self._lock:
+                    self.conectada = False
+                self._m_conectada.fijar(0)
+                intentos = 0
+                continue
+            if self.conectada:
+                print(f"[CAM {self.id}] Corte del stream, reconectando...")
+                with self._lock:
+                    self.conectada = False
+                    self._caida_desde = time.monotonic()
+                self._m_conectada.fijar(0)
+            self._detenido.wait(self.espera(intentos))
+            intentos += 1
+
+    def _conectada(self, intentos):
+        with self._lock:
+            self.conectada = True
+            caida = None
+            if self._caida_desde is not None:
+                caida = time.monotonic() - self._caida_desde
+                self._caida_desde = None
+                self.reconexiones += 1
+                self.caida_total += caida
+                self.caida_ultima = caida
+                self.caida_max = max(self.caida_max, caida)
+        self._m_conectada.fijar(1)
+        if caida is None:
+            if not self.frames:
+                print(f"[CAM {self.id}] Stream conectado")
+            return
+
+        print(f"[CAM {self.id}] Stream reconectado tras {caida:.2f} s ({intentos} reintentos)")
+        self._m_reconexiones.incrementar()
+        self._m_caida.incrementar(caida)
+        if self.al_reconectar:
+            self.al_reconectar(caida)
+
+class StreamAlta:
+    def __init__(self, id_camara, url, abrir=abrir_ffmpeg, inactividad=5.0, tolerancia=0.1, desfase=0.0,
+                 max_frames=4, **kwargs_captura):
+        """
+        Stream principal (alta resolución) de una cámara en modo doble stream: la
+        detección y el tracking corren sobre el substream y este stream solo se
+        usa para los recortes (mejor toma, caras).
+
+        Se abre bajo demanda: `activar()` (cuando hay personas a la vista) lo
+        mantiene abierto `inactividad` segundos; sin personas se cierra y no se
+        decodifica nada. Abierto, cada frame se demultiplexa y decodifica con
+        `grab()`, pero la conversión a BGR (`retrieve()`) y la copia solo se hacen
+        para los frames alineados con un frame del substream que va a detección
+        (`solicitar(instante)`).
+
+        Los streams se alinean por hora de llegada: el frame principal de
+        `instante + desfase` más cercano, dentro de `tolerancia` segundos.
+        `desfase` compensa una latencia fija distinta entre los dos codificadores.
+
+        Parámetros:
+            id_camara: Identificador de la cámara.
+            url (str): Stream principal.
+            abrir (callable): url -> VideoCapture.
+            inactividad (float): Segundos sin `activar()` tras los que el stream se cierra.
+            tolerancia (float): Diferencia máxima entre instantes para considerar dos
+                                frames alineados.
+            desfase (float): Segundos a sumar a la hora de llegada de cada frame principal.
+            max_frames (int): Frames principales alineados que se conservan.
+            **kwargs_captura: Esperas de reconexión de CapturaStream.
+        """
+        self.id = id_camara
+        self.inactividad = inactividad
+        self.tolerancia = tolerancia
+        self.desfase = desfase
+        self.demanda = Event()
+        self.captura = CapturaStream(f"{id_camara}/alta", url, self._leer, lambda _: None, abrir=abrir,
+                                     demanda=self.demanda, **kwargs_captura)
+
+        self._frames = deque(maxlen=max_frames)  # (instante alineado, imagen)
+        self._objetivos = deque()  # Instantes del substream esperando su frame principal
+        self._ultima_activacion = 0.0
+        self._cond = Condition()
+
+        self.activaciones = 0
+        self.decodificados = 0
+        self.convertidos = 0
+        self.alineados = 0
+        self.sin_frame = 0
+        self._m_alineados = _ALINEADOS.con(camara=id_camara, resultado="alineado")
+        self._m_sin_frame = _ALINEADOS.con(camara=id_camara, resultado="sin_frame")
+
+    def iniciar(self):
+        self.captura.iniciar()
+
+    def detener(self, timeout=None):
+        self.captura.detener(timeout)
+
+    def activar(self):
+        """
+        Pide mantener abierto el stream (hay personas de las que se quieren recortes).
+        """
+        with self._cond:
+            self._ultima_activacion = time.monotonic()
+            if not self.demanda.is_set():
+                self.activaciones += 1
+                self.demanda.set()
+
+    def solicitar(self, instante):
+        """
+        Marca que el frame del substream capturado en `instante` va a detección:
+        se convertirá el frame principal alineado con él. Se llama desde el hilo
+        de captura del substream. Sin demanda no hace nada.
+        """
+        if not self.demanda.is_set():
+            return
+        with self._cond:
+            self._objetivos.append(instante)
+
+    def frame_en(self, instante, espera=None):
+        """
+        Frame principal alineado con el frame del substream de `instante`.
+
+        Parámetros:
+            instante (float): Hora de captura del frame del substream.
+            espera (float | None): Segundos máximos a esperar si ese frame todavía no
+                                   llegó (por defecto, `tolerancia`). Solo se espera si
+                                   el stream está conectado y el pedido sigue pendiente.
+
+        Retorna:
+            np.array | None: Imagen BGR (no se reescribe; puede retenerse).
+        """
+        espera = self.tolerancia if espera is None else espera
+        with self._cond:
+            self._cond.wait_for(lambda: self._buscar(instante) is not None or not self._pendiente(instante),
+                                espera)
+            imagen = self._buscar(instante)
+            if imagen is None:
+                self.sin_frame += 1
+                self._m_sin_frame.incrementar()
+            else:
+                self.alineados += 1
+                self._m_alineados.incrementar()
+            return imagen
+
+    def estadisticas(self):
+        with self._cond:
+            pedidos = self.alineados + self.sin_frame
+            return {
+                "activo": self.demanda.is_set(),
+                "activaciones": self.activaciones,
+                "decodificados": self.decodificados,
+                "convertidos": self.convertidos,
+                "alineados": self.alineados,
+                "sin_frame": self.sin_frame,
+                "proporcion_alineados": self.alineados / pedidos if pedidos else 0.0,
+                "captura": self.captura.estadisticas(),
+            }
+
+    def _buscar(self, instante):
+        mejor, diferencia = None, self.tolerancia
+        for instante_frame, imagen in self._frames:
+            if abs(instante_frame - instante) <= diferencia:
+                mejor, diferencia = imagen, abs(instante_frame - instante)
+        return mejor
+
+    def _pendiente(self, instante):
+        return self.captura.conectada and any(abs(objetivo - instante) <= self.tolerancia
+                                              for objetivo in self._objetivos)
+
+    def _leer(self, video):
+        if not video.grab():
+            return False, None
+        instante = time.time() + self.desfase
+        with self._cond:
+            self.decodificados += 1
+            if time.monotonic() - self._ultima_activacion > self.inactividad:
+                self.demanda.clear()
+                self._objetivos.clear()
+            # Pedidos que ya quedaron atrás: su frame se perdió
+            while self._objetivos and self._objetivos[0] < instante - self.tolerancia:
+                self._objetivos.popleft()
+                self._cond.notify_all()
+            convertir = bool(self._objetivos) and self._objetivos[0] <= instante + self.tolerancia
+        if not convertir:
+            return True, None
+
+        ok, imagen = video.retrieve()
+        with self._cond:
+            if ok:
+                self.convertidos += 1
+                self._frames.append((instante, imagen))
+            # Este frame atiende a todos los pedidos que caen dentro de la tolerancia
+            while self._objetivos and self._objetivos[0] <= instante + self.tolerancia:
+                self._objetivos.popleft()
+            self._cond.notify_all()
+        return True, None
@@ -0,0 +1,234 @@
+import time, itertools
+from collections import OrderedDict
+from concurrent.futures import Future
+from threading import Thread, Condition
+from utils.metricas import metricas
+
+# Políticas de desborde de un carril lleno
+BLOQUEAR = "bloquear"                  # El productor espera lugar (como mucho `espera_max`)
+DESCARTAR_ANTIGUA = "descartar_antigua"  # Se cancela la tarea más vieja de la cola
+DESCARTAR_NUEVA = "descartar_nueva"    # Se rechaza la tarea que llega
+COALESCER = "coalescer"                # Una tarea con la misma clave reemplaza a la pendiente
+POLITICAS = (BLOQUEAR, DESCARTAR_ANTIGUA, DESCARTAR_NUEVA, COALESCER)
+
+_PENDIENTES = metricas.indicador("tareas_pendientes", "Tareas en cola por carril", ["carril"])
+_EJECUTADAS = metricas.contador("tareas_ejecutadas_total", "Tareas terminadas por carril", ["carril"])
+_DESCARTADAS = metricas.contador("tareas_descartadas_total", "Tareas descartadas o reemplazadas", ["carril", "motivo"])
+_ESPERA = metricas.histograma("tarea_espera_segundos", "Tiempo en cola hasta empezar", ["carril"])
+_DURACION = metricas.histograma("tarea_duracion_segundos", "Tiempo de ejecución de una tarea", ["carril"])
+
+# Carriles por defecto, en orden de prioridad
+CARRILES_POR_DEFECTO = {
+    # Callbacks de alertas: un solo hilo conserva el orden de los eventos
+    "alertas": {"trabajadores": 1, "capacidad": 1000, "politica": BLOQUEAR, "espera_max": 1.0},
+    # Upserts a la base: el último valor de un track es el que vale
+    "db": {"trabajadores": 2, "capacidad": 500, "politica": COALESCER},
+    # Recortes a disco: si la cola se llena se pierden los más viejos, no el frame actual
+    "imagenes": {"trabajadores": 2, "capacidad": 200, "politica": COALESCER},
+    # El planificador de descripciones ya limita cuántas hay en curso
+    "descripciones": {"trabajadores": 2, "capacidad": 50, "politica": BLOQUEAR, "espera_max": 5.0},
+}
+
+class CarrilTareas:
+    def __init__(self, nombre, trabajadores=1, capacidad=100, politica=BLOQUEAR, espera_max=None):
+        """
+        Cola acotada con sus propios hilos trabajadores para una clase de tareas.
+
+        Parámetros:
+            nombre (str): Nombre del carril (etiqueta de las métricas).
+            trabajadores (int): Hilos que ejecutan las tareas del carril.
+            capacidad (int): Tareas en cola como máximo (sin contar las que corren).
+            politica (str): Qué hacer con el carril lleno (ver POLITICAS).
+            espera_max (float | None): Con BLOQUEAR, segundos que espera el productor
+                                       antes de descartar la tarea (None = sin límite).
+        """
+        if politica not in POLITICAS:
+            raise ValueError(f"Política de desborde desconocida: {politica} (usar {', '.join(POLITICAS)})")
+        self.nombre = nombre
+        self.capacidad = capacidad
+        self.politica = politica
+        self.espera_max = espera_max
+
+        self._cola = OrderedDict()  # clave -> (futuro, funcion, args, kwargs, encolada)
+        self._secuencia = itertools.count()
+        self._cond = Condition()
+        self._cerrado = False
+        self.en_curso = 0
+        self.ejecutadas = 0
+        self.errores = 0
+        self.descartadas = 0
+        self.coalescidas = 0
+        self.bloqueos = 0
+
+        self._m_pendientes = _PENDIENTES.con(carril=nombre)
+        self._m_ejecutadas = _EJECUTADAS.con(carril=nombre)
+        self._m_espera = _ESPERA.con(carril=nombre)
+        self._m_duracion = _DURACION.con(carril=nombre)
+
+        self._hilos = [Thread(target=self._trabajar, daemon=True, name=f"carril-{nombre}-{i}")
+                       for i in range(trabajadores)]
+        for hilo in self._hilos:
+            hilo.start()
+
+    def enviar(self, funcion, *args, clave=None, **kwargs):
+        """
+        Encola `funcion(*args, **kwargs)`.
+
+        Parámetros:
+            clave: Con COALESCER, una tarea pendiente con la misma clave (p. ej. el
+                   ID de track) se reemplaza por esta y su futuro se cancela.
+
+        Retorna:
+            Future: Resultado de la tarea; cancelado si la tarea se descartó.
+        """
+        futuro = Future()
+        cancelados = []
+        try:
+            with self._cond:
+                if self._cerrado:
+                    return self._descartar(futuro, "cerrado", cancelados)
+
+                llave = (clave,) if self.politica == COALESCER and clave is not None else None
+                if llave in self._cola:
+                    anterior = self._cola[llave]
+                    self._cola[llave] = (futuro, funcion, args, kwargs, anterior[4])
+                    self.coalescidas += 1
+                    self._descartar(anterior[0], "coalescida", cancelados)
+                    return futuro
+
+                if len(self._cola) >= self.capacidad:
+                    if self.politica == BLOQUEAR:
+                        self.bloqueos += 1
+                        if not self._cond.wait_for(lambda: len(self._cola) < self.capacidad or self._cerrado,
+                                                   self.espera_max) or self._cerrado:
+                            print(f"[ADVERTENCIA] Carril {self.nombre} lleno, se descarta una tarea")
+                            return self._descartar(futuro, "espera_agotada", cancelados)
+                    elif self.politica == DESCARTAR_NUEVA:
+                        return self._descartar(futuro, "lleno", cancelados)
+                    else:
+                        _, entrada = self._cola.popitem(last=False)
+                        self._descartar(entrada[0], "lleno", cancelados)
+
+                # Con COALESCER la clave del track identifica la tarea; si no, una secuencia
+                self._cola[llave or next(self._secuencia)] = (futuro, funcion, args, kwargs, time.monotonic())
+                self._m_pendientes.fijar(len(self._cola))
+                self._cond.notify_all()
+            return futuro
+        finally:
+            # Los callbacks de los futuros cancelados corren fuera del lock
+            for cancelado in cancelados:
+                cancelado.cancel()
+
+    def detener(self, esperar=True):
+        """
+        Cierra el carril. Con `esperar`, las tareas encoladas se ejecutan antes de
+        terminar; si no, se cancelan.
+        """
+        cancelados = []
+        with self._cond:
+            self._cerrado = True
+            if not esperar:
+                while self._cola:
+                    _, entrada = self._cola.popitem(last=False)
+                    self._descartar(entrada[0], "cerrado", cancelados)
+                self._m_pendientes.fijar(0)
+            self._cond.notify_all()
+        for cancelado in cancelados:
+            cancelado.cancel()
+        for hilo in self._hilos:
+            hilo.join()
+
+    def estadisticas(self):
+        with self._cond:
+            return {
+                "pendientes": len(self._cola),
+                "capacidad": self.capacidad,
+                "en_curso": self.en_curso,
+                "ejecutadas": self.ejecutadas,
+                "errores": self.errores,
+                "descartadas": self.descartadas,
+                "coalescidas": self.coalescidas,
+                "bloqueos": self.bloqueos,
+            }
+
+    def _descartar(self, futuro, motivo, cancelados):
+        # Se llama con el lock tomado: el futuro se cancela después de soltarlo
+        if motivo != "coalescida":
+            self.descartadas += 1
+        _DESCARTADAS.con(carril=self.nombre, motivo=motivo).incrementar()
+        cancelados.append(futuro)
+        return futuro
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                while not self._cola and not self._cerrado:
+                    self._cond.wait()
+                if not self._cola:
+                    return
+                _, (futuro, funcion, args, kwargs, encolada) = self._cola.popitem(last=False)
+                self.en_curso += 1
+                self._m_pendientes.fijar(len(self._cola))
+                self._cond.notify_all()
+
+            if futuro.set_running_or_notify_cancel():
+                inicio = time.monotonic()
+                self._m_espera.observar(inicio - encolada)
+                try:
+                    resultado = funcion(*args, **kwargs)
+                except Exception as e:
+                    print(f"[ERROR] Tarea del carril {self.nombre}: {e}")
+                    with self._cond:
+                        self.errores += 1
+                    futuro.set_exception(e)
+                else:
+                    futuro.set_result(resultado)
+                self._m_duracion.observar(time.monotonic() - inicio)
+                self._m_ejecutadas.incrementar()
+                with self._cond:
+                    self.ejecutadas += 1
+
+            with self._cond:
+                self.en_curso -= 1
+
+class EjecutorPorClases:
+    def __init__(self, config=None):
+        """
+        Reemplaza al ThreadPoolExecutor compartido (una sola cola FIFO sin límite)
+        por un carril acotado por clase de tarea, cada uno con sus hilos y su
+        política de desborde. Si MySQL se pone lento, se llena solo el carril
+        'db' y se aplica su política; las alertas y los guardados de imágenes
+        siguen corriendo y la memoria (recortes retenidos en la cola) queda acotada.
+
+        Parámetros:
+            config (dict | None): {carril: {trabajadores, capacidad, politica, espera_max}}.
+                                  Se combina con CARRILES_POR_DEFECTO. El orden es
+                                  la prioridad: alertas > db > imagenes > descripciones.
+        """
+        config = config or {}
+        self.carriles = OrderedDict()
+        for nombre in list(CARRILES_POR_DEFECTO) + [n for n in config if n not in CARRILES_POR_DEFECTO]:
+            parametros = dict(CARRILES_POR_DEFECTO.get(nombre, {}), **config.get(nombre, {}))
+            self.carriles[nombre] = CarrilTareas(nombre, **parametros)
+
+    def enviar(self, carril, funcion, *args, clave=None, **kwargs):
+        """
+        Encola una tarea en el carril indicado ('alertas', 'db', 'imagenes',
+        'descripciones' u otro configurado).
+
+        Retorna:
+            Future: Cancelado si la política del carril descartó la tarea.
+        """
+        return self.carriles[carril].enviar(funcion, *args, clave=clave, **kwargs)
+
+    def detener(self, esperar=True):
+        """
+        Cierra los carriles de menor a mayor prioridad: una tarea puede encolar
+        otra en un carril más prioritario (la cara guardada registra su carpeta
+        en la base), así que ese carril tiene que seguir abierto.
+        """
+        for carril in reversed(self.carriles.values()):
+            carril.detener(esperar)
+
+    def estadisticas(self):
+        return {nombre: carril.estadisticas() for nombre, carril in self.carriles.items()}
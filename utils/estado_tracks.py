@@ -0,0 +1,141 @@
+import sys, time
+from collections import OrderedDict, Counter
+
+# Motivos de cierre de un track
+PERDIDO = "perdido"        # El tracker lo dio de baja
+VENCIDO = "vencido"        # No se lo vio en `ttl` segundos
+CAPACIDAD = "capacidad"    # Se superó `max_tracks` y era el más viejo
+FINAL = "final"            # Cierre de la aplicación
+
+class EstadoTrack:
+    """
+    Estado compacto de un track: sin __dict__, unos 100 bytes por registro.
+    `zonas` es un entero con un bit por zona (bit i = dentro de la zona i).
+    `id_track` es el ID del tracker cuando difiere de `id_persona` (ID global
+    de re-identificación).
+    """
+    __slots__ = ("id_persona", "id_track", "primer_visto", "ultimo_visto", "caja", "zonas",
+                 "confianza_cara", "mejor_puntaje", "descrito")
+
+    def __init__(self, id_persona, ahora):
+        self.id_persona = id_persona
+        self.id_track = id_persona
+        self.primer_visto = ahora
+        self.ultimo_visto = ahora
+        self.caja = None
+        self.zonas = 0
+        self.confianza_cara = 0.0
+        self.mejor_puntaje = 0.0
+        self.descrito = False
+
+class RegistroTracks:
+    def __init__(self, ttl=10.0, max_tracks=5000):
+        """
+        Estado por track de una cámara, acotado. Reemplaza a los diccionarios por
+        ID que crecían durante toda la vida del proceso (los IDs de BoT-SORT no se
+        reutilizan).
+
+        Un track se cierra cuando el tracker lo da de baja (`barrer` con los IDs
+        dados de baja), cuando no se lo ve en `ttl` segundos o, si hay más de
+        `max_tracks`, por ser el menos reciente. Al cerrarse se llama a cada
+        callback de `al_cerrar(estado, motivo)` para que los consumidores
+        (mejor toma, zonas, descripciones) guarden y liberen lo suyo; al abrirse,
+        a los de `al_abrir(estado)`.
+
+        No es thread-safe: una instancia por cámara, usada desde un hilo a la vez.
+
+        Parámetros:
+            ttl (float): Segundos sin ver un track para darlo por terminado.
+            max_tracks (int): Tracks abiertos como máximo (tope duro de memoria).
+        """
+        self.ttl = ttl
+        self.max_tracks = max_tracks
+        self._tracks = OrderedDict()  # id_persona -> EstadoTrack, del menos al más reciente
+        self._callbacks = []
+        self._callbacks_apertura = []
+        self.creados = 0
+        self.cerrados = Counter()
+
+    def al_cerrar(self, callback):
+        self._callbacks.append(callback)
+
+    def al_abrir(self, callback):
+        self._callbacks_apertura.append(callback)
+
+    def tocar(self, id_persona, ahora=None, id_track=None):
+        """
+        Marca el track como visto ahora, creándolo si es nuevo.
+
+        Retorna:
+            EstadoTrack
+        """
+        ahora = ahora or time.time()
+        estado = self._tracks.get(id_persona)
+        if estado is None:
+            estado = self._tracks[id_persona] = EstadoTrack(id_persona, ahora)
+            if id_track is not None:
+                estado.id_track = id_track
+            self.creados += 1
+            for callback in self._callbacks_apertura:
+                try:
+                    callback(estado)
+                except Exception as e:
+                    print(f"[ERROR] Apertura del track {id_persona}: {e}")
+            while len(self._tracks) > self.max_tracks:
+                self.cerrar(next(iter(self._tracks)), CAPACIDAD)
+        else:
+            estado.ultimo_visto = ahora
+            self._tracks.move_to_end(id_persona)
+        return estado
+
+    def obtener(self, id_persona):
+        return self._tracks.get(id_persona)
+
+    def __len__(self):
+        return len(self._tracks)
+
+    def __contains__(self, id_persona):
+        return id_persona in self._tracks
+
+    def cerrar(self, id_persona, motivo=PERDIDO):
+        estado = self._tracks.pop(id_persona, None)
+        if estado is None:
+            return
+        self.cerrados[motivo] += 1
+        for callback in self._callbacks:
+            try:
+                callback(estado, motivo)
+            except Exception as e:
+                print(f"[ERROR] Cierre del track {id_persona}: {e}")
+
+    def barrer(self, ahora=None, dados_de_baja=()):
+        """
+        Cierra los tracks vencidos y los `dados_de_baja` por el tracker desde el
+        último barrido. Los vencidos se encuentran desde el más viejo y los dados
+        de baja se buscan por ID: el costo es proporcional a los que se cierran,
+        no a los tracks abiertos.
+        """
+        ahora = ahora or time.time()
+        while self._tracks:
+            id_persona, estado = next(iter(self._tracks.items()))
+            if ahora - estado.ultimo_visto <= self.ttl:
+                break
+            self.cerrar(id_persona, VENCIDO)
+
+        for id_persona in dados_de_baja:
+            self.cerrar(id_persona, PERDIDO)
+
+    def vaciar(self):
+        """
+        Cierra todos los tracks (al terminar la aplicación).
+        """
+        for id_persona in list(self._tracks):
+            self.cerrar(id_persona, FINAL)
+
+    def estadisticas(self):
+        return {
+            "abiertos": len(self._tracks),
+            "creados": self.creados,
+            "cerrados": dict(self.cerrados),
+            "memoria_kb": len(self._tracks) * sys.getsizeof(EstadoTrack(0, 0.0)) / 1024,
+        }
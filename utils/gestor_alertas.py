@@ -1,51 +1,189 @@
-import time
-#from twilio.rest import Client
+import time, heapq, itertools
+from collections import namedtuple
+from queue import Queue, Empty, Full
+from threading import Thread
+from utils.metricas import metricas
+
+# Tipos de evento
+ENTRADA = "entrada"              # Entró al área monitoreada (cualquier zona)
+SALIDA = "salida"                # Salió del área monitoreada
+DESAPARICION = "desaparicion"    # Dejó de verse dentro del área por más de `timeout`
+ENTRADA_ZONA = "entrada_zona"
+SALIDA_ZONA = "salida_zona"
+PERMANENCIA = "permanencia"      # Superó la permanencia mínima de una zona
+
+EventoAlerta = namedtuple("EventoAlerta", "tipo id_camara id_persona zona instante segundos")
+
+_TIPOS_ZONA = {"entrada": ENTRADA_ZONA, "salida": SALIDA_ZONA, "permanencia": PERMANENCIA}
+
+# Lo que se notifica por defecto: una entrada a una zona genera también ENTRADA
+# (y una salida, SALIDA), así que los tipos por zona duplicarían cada mensaje.
+# PERMANENCIA solo existe por zona.
+TIPOS_NOTIFICACION = (ENTRADA, SALIDA, DESAPARICION, PERMANENCIA)
+
+_ALERTAS = metricas.contador("alertas_total", "Eventos de alerta emitidos", ["tipo"])
 
 class GestorAlertas:
-    def __init__(self, funcion_descripcion=None, umbral=0.7, timeout=5.0,
-                 account_sid="", auth_token="", from_wpp="", to_wpp=""):
+    def __init__(self, funcion_descripcion=None, umbral=0.7, timeout=5.0, despachador=None, max_cola=1000,
+                 ejecutor=None, tipos_notificacion=TIPOS_NOTIFICACION):
+        """
+        Procesa las detecciones de todas las cámaras en un único hilo consumidor
+        (sin carreras sobre el estado) y publica un flujo de EventoAlerta al que
+        otros componentes se suscriben.
+
+        Recibe una actualización por cámara y por frame (`actualizar`). Los
+        vencimientos por desaparición se llevan en un min-heap: cada vencimiento
+        cuesta O(log n) y nunca se recorre todo el estado.
+
+        Si se pasa `despachador` (DespachadorNotificaciones), los mensajes de los
+        eventos se envían por sus canales sin bloquear este hilo; solo los de
+        `tipos_notificacion` (None = todos), un mensaje por entrada o salida.
+
+        Si se pasa `ejecutor` (EjecutorPorClases), los suscriptores corren en su
+        carril 'alertas' y un suscriptor lento no demora los vencimientos.
+        """
         self.funcion_descripcion = funcion_descripcion
         self.umbral = umbral
         self.timeout = timeout
-        self.personas_en_area = {}  # id_persona -> timestamp_ultimo_visto
 
-        # Twilio
-        #self.twilio_client = Client(account_sid, auth_token)
-        self.from_whatsapp = from_wpp
-        self.to_whatsapp = to_wpp
+        # Estado, solo lo toca el hilo consumidor
+        self.personas_en_area = {}  # (id_camara, id_persona) -> (timestamp_entrada, timestamp_ultimo_visto)
+        self._vencimientos = []     # heap de (vence, secuencia, clave)
+        self._secuencia = itertools.count()
 
-    def enviar_wpp(self, mensaje):
-        try:
-            self.twilio_client.messages.create(
-                body=mensaje,
-                from_=self.from_whatsapp,
-                to=self.to_whatsapp
-            )
-            print(f"✅ WhatsApp enviado: {mensaje}")
-        except Exception as e:
-            print(f"❌ Error enviando WhatsApp: {e}")
-
-    def actualizar(self, id_persona, imagen_cuerpo, dentro_del_area):
-        ahora = time.time()
-
-        if dentro_del_area:
-            if id_persona not in self.personas_en_area:
-                mensaje = f"🚶 Persona {id_persona} entró al área."
-                #self.enviar_wpp(mensaje)
-                self.personas_en_area[id_persona] = ahora
+        self._suscriptores = []
+        self._cola = Queue(maxsize=max_cola)
+        self.descartadas = 0
+        self.eventos_emitidos = 0
+
+        self.despachador = despachador
+        self.ejecutor = ejecutor
+
+        self.suscribir(self.notificar, tipos_notificacion)
+
+        self._hilo = Thread(target=self._consumir, daemon=True)
+        self._hilo.start()
+
+    def notificar(self, evento):
+        if evento.tipo == ENTRADA:
+            mensaje = f"🚶 Persona {evento.id_persona} entró al área."
+        elif evento.tipo == SALIDA:
+            mensaje = f"👋 Persona {evento.id_persona} salió del área."
+        elif evento.tipo == DESAPARICION:
+            mensaje = f"⚠️ Persona {evento.id_persona} desapareció del área (timeout)."
+        elif evento.tipo == ENTRADA_ZONA:
+            mensaje = f"🚶 Persona {evento.id_persona} entró a {evento.zona}."
+        elif evento.tipo == SALIDA_ZONA:
+            mensaje = f"👋 Persona {evento.id_persona} salió de {evento.zona} ({evento.segundos:.0f} s)."
         else:
-            if id_persona in self.personas_en_area:
-                mensaje = f"👋 Persona {id_persona} salió del área."
-                #self.enviar_wpp(mensaje)
-                del self.personas_en_area[id_persona]
-
-    def verificar_desapariciones(self):
-        ahora = time.time()
-        desaparecidos = [
-            idp for idp, t in self.personas_en_area.items()
-            if ahora - t > self.timeout
-        ]
-        for idp in desaparecidos:
-            mensaje = f"⚠️ Persona {idp} desapareció del área (timeout)."
-            #self.enviar_wpp(mensaje)
-            del self.personas_en_area[idp]
+            mensaje = f"⏱️ Persona {evento.id_persona} lleva {evento.segundos:.0f} s en {evento.zona}."
+        if self.despachador:
+            self.despachador.notificar(mensaje)
+
+    def suscribir(self, callback, tipos=None):
+        """
+        Registra un consumidor de eventos. Se llama desde el hilo del gestor, por lo
+        que debe ser rápido (o encolar el trabajo en otro lado).
+
+        Parámetros:
+            callback (callable): Recibe un EventoAlerta.
+            tipos (iterable | None): Tipos de evento a recibir. None = todos.
+        """
+        self._suscriptores.append((callback, set(tipos) if tipos else None))
+
+    def actualizar(self, id_camara, ahora, ids, dentro_del_area, eventos_zona=()):
+        """
+        Encola la actualización de un frame completo de una cámara. No bloquea:
+        si la cola está llena la actualización se descarta.
+
+        Parámetros:
+            id_camara: Cámara de origen.
+            ahora (float): Timestamp del frame.
+            ids (list): IDs de track del frame.
+            dentro_del_area (list[bool]): Si cada track está dentro de alguna zona.
+            eventos_zona (list[dict]): Eventos por zona generados por MotorZonas.
+        """
+        try:
+            self._cola.put_nowait((id_camara, ahora, list(ids), list(dentro_del_area), list(eventos_zona)))
+        except Full:
+            self.descartadas += 1
+
+    def detener(self):
+        self._cola.put(None)
+        self._hilo.join()
+
+    def estadisticas(self):
+        return {
+            "cola": self._cola.qsize(),
+            "personas_en_area": len(self.personas_en_area),
+            "vencimientos": len(self._vencimientos),
+            "eventos_emitidos": self.eventos_emitidos,
+            "descartadas": self.descartadas,
+        }
+
+    def _consumir(self):
+        while True:
+            espera = None
+            if self._vencimientos:
+                espera = max(0.0, self._vencimientos[0][0] - time.time())
+            try:
+                item = self._cola.get(timeout=espera)
+            except Empty:
+                item = False
+
+            if item is None:
+                return
+            if item:
+                self._procesar_frame(*item)
+            self.verificar_desapariciones()
+
+    def _procesar_frame(self, id_camara, ahora, ids, dentro_del_area, eventos_zona):
+        for id_persona, dentro in zip(ids, dentro_del_area):
+            if id_persona == -1:
+                continue
+            clave = (id_camara, id_persona)
+            estado = self.personas_en_area.get(clave)
+
+            if dentro:
+                if estado is None:
+                    self.personas_en_area[clave] = (ahora, ahora)
+                    self._emitir(EventoAlerta(ENTRADA, id_camara, id_persona, None, ahora, 0.0))
+                else:
+                    self.personas_en_area[clave] = (estado[0], ahora)
+                heapq.heappush(self._vencimientos, (ahora + self.timeout, next(self._secuencia), clave))
+            elif estado is not None:
+                del self.personas_en_area[clave]
+                self._emitir(EventoAlerta(SALIDA, id_camara, id_persona, None, ahora, ahora - estado[0]))
+
+        for evento in eventos_zona:
+            self._emitir(EventoAlerta(_TIPOS_ZONA[evento["tipo"]], id_camara, evento["id"], evento["zona"],
+                                      ahora, evento["segundos"]))
+
+    def verificar_desapariciones(self, ahora=None):
+        """
+        Emite DESAPARICION para los tracks cuyo último avistamiento dentro del área
+        venció. Solo mira el tope del heap; las entradas obsoletas (el track se volvió
+        a ver o ya salió) se descartan al llegar al tope.
+        """
+        ahora = ahora or time.time()
+        while self._vencimientos and self._vencimientos[0][0] <= ahora:
+            vence, _, clave = heapq.heappop(self._vencimientos)
+            estado = self.personas_en_area.get(clave)
+            if estado is None or estado[1] + self.timeout != vence:
+                continue
+            del self.personas_en_area[clave]
+            id_camara, id_persona = clave
+            self._emitir(EventoAlerta(DESAPARICION, id_camara, id_persona, None, ahora, estado[1] - estado[0]))
+
+    def _emitir(self, evento):
+        self.eventos_emitidos += 1
+        _ALERTAS.con(tipo=evento.tipo).incrementar()
+        for callback, tipos in self._suscriptores:
+            if tipos is None or evento.tipo in tipos:
+                if self.ejecutor:
+                    self.ejecutor.enviar("alertas", callback, evento)
+                    continue
+                try:
+                    callback(evento)
+                except Exception as e:
+                    print(f"[ERROR] Suscriptor de alertas: {e}")
@@ -1,14 +1,25 @@
-import cv2, os, datetime, base64, mediapipe as mp
-from insightface.app import FaceAnalysis
+import cv2, os, datetime, base64
 from PIL import Image, ImageDraw, ImageFont
+from utils.registro_modelos import registro
+from utils.metricas import metricas
 
-# Inicialización del modelo de rostros
-face_model = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])
-face_model.prepare(ctx_id=0)
+_IMAGENES = metricas.contador("imagenes_guardadas_total", "Imágenes escritas en disco", ["tipo"])
+_GUARDADO = metricas.histograma("imagen_guardado_segundos", "Tiempo de codificar y escribir una imagen")
 
-# Inicialización de MediaPipe para posturas
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=True)
+def _cargar_modelo_rostros():
+    from insightface.app import FaceAnalysis
+    face_model = FaceAnalysis(name='buffalo_l', providers=['CPUExecutionProvider'])
+    face_model.prepare(ctx_id=0)
+    return face_model
+
+def _cargar_pose():
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(static_image_mode=True)
+
+# Los modelos se cargan recién en su primer uso (importar este módulo no los carga).
+# MediaPipe Pose no es thread-safe: sus accesos se serializan.
+registro.registrar("rostros_insightface", _cargar_modelo_rostros, thread_safe=True)
+registro.registrar("pose_mediapipe", _cargar_pose, thread_safe=False)
 
 def mejorar_imagen(img):
     """
@@ -29,7 +40,11 @@ def obtener_orientacion(img):
     Retorna:
         str: 'frente', 'perfil', 'espaldas' o 'desconocido'.
     """
-    resultado = pose.process(img)
+    import mediapipe as mp
+    mp_pose = mp.solutions.pose
+
+    with registro.usar("pose_mediapipe") as pose:
+        resultado = pose.process(img)
     if not resultado.pose_landmarks:
         return "desconocido"
 
@@ -59,7 +74,8 @@ def detectar_rostro_si_frente(img):
     if orientacion == "espaldas":
         return None, "espaldas"
 
-    rostros = face_model.get(img_rgb)
+    with registro.usar("rostros_insightface") as face_model:
+        rostros = face_model.get(img_rgb)
     if not rostros:
         return None, orientacion
 
@@ -94,9 +110,12 @@ def guardar_imagen(imagen, id_interno, carpeta_salida, tipo):
     ruta_completa = os.path.join(carpeta_persona, nombre_archivo)
 
     # Guardar imagen localmente
-    if not cv2.imwrite(ruta_completa, imagen):
+    with _GUARDADO.cronometrar():
+        guardada = cv2.imwrite(ruta_completa, imagen)
+    if not guardada:
         print(f"[ERROR] No se pudo guardar la imagen para ID {id_interno}")
         return None
+    _IMAGENES.con(tipo=tipo).incrementar()
 
     #print(f"[INFO] Imagen guardada: {ruta_completa}")
 
@@ -115,6 +134,18 @@ def encode_image(image_path):
     with open(image_path, "rb") as image_file:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
+def codificar_imagen(imagen, formato=".jpg"):
+    """
+    Codifica una imagen en memoria (ndarray BGR) como base64, sin pasar por disco.
+
+    Retorna:
+        str | None: Imagen codificada o None si falló la codificación.
+    """
+    ok, buffer = cv2.imencode(formato, imagen)
+    if not ok:
+        return None
+    return base64.b64encode(buffer.tobytes()).decode("utf-8")
+
 def crear_collage_con_titulos(img_path1, img_path2, titulo1="imgOriginal", titulo2="imgComparacion"):
     """
     Crea un collage horizontal de dos imágenes con títulos encima y lo devuelve como objeto PIL.Image.
@@ -0,0 +1,263 @@
+import numpy as np
+
+def normalizar(vectores):
+    """
+    Lleva vectores a norma 1 (float32), para comparar por producto interno (coseno).
+    """
+    vectores = np.asarray(vectores, dtype=np.float32)
+    normas = np.linalg.norm(vectores, axis=-1, keepdims=True)
+    return vectores / np.maximum(normas, 1e-12)
+
+def _mejores(ids, similitudes, k):
+    if len(similitudes) > k:
+        elegidos = np.argpartition(-similitudes, k - 1)[:k]
+        ids, similitudes = ids[elegidos], similitudes[elegidos]
+    orden = np.argsort(-similitudes)
+    return [(int(ids[i]), float(similitudes[i])) for i in orden if similitudes[i] > -np.inf]
+
+class IndiceBruto:
+    def __init__(self, capacidad=100_000):
+        """
+        Índice de vectores por fuerza bruta: una matriz NumPy y un producto
+        matricial por consulta. Exacto; alcanza para sitios chicos (hasta unas
+        decenas de miles de vectores).
+
+        Es un buffer circular: con `capacidad` vectores, cada nuevo reemplaza al
+        más viejo. No es thread-safe (lo protege quien lo usa).
+
+        Parámetros:
+            capacidad (int): Vectores guardados como máximo.
+        """
+        self.capacidad = capacidad
+        self._vectores = None  # Se crea con la dimensión del primer vector
+        self._ids = np.full(capacidad, -1, dtype=np.int64)
+        self._instantes = np.full(capacidad, -np.inf)
+        self._siguiente = 0
+        self._cantidad = 0
+
+    def __len__(self):
+        return self._cantidad
+
+    def agregar(self, id_global, vector, instante):
+        self.agregar_lote([id_global], np.asarray(vector).reshape(1, -1), [instante])
+
+    def agregar_lote(self, ids, vectores, instantes):
+        vectores = normalizar(vectores).reshape(len(ids), -1)[-self.capacidad:]
+        ids, instantes = np.asarray(ids)[-self.capacidad:], np.asarray(instantes)[-self.capacidad:]
+        if self._vectores is None:
+            self._vectores = np.zeros((self.capacidad, vectores.shape[1]), dtype=np.float32)
+        slots = (self._siguiente + np.arange(len(ids))) % self.capacidad
+        self._vectores[slots] = vectores
+        self._ids[slots] = ids
+        self._instantes[slots] = instantes
+        self._siguiente = int(slots[-1] + 1) % self.capacidad if len(ids) else self._siguiente
+        self._cantidad = min(self._cantidad + len(ids), self.capacidad)
+
+    def buscar(self, vector, k=5, desde=None):
+        """
+        Los `k` vectores más parecidos, opcionalmente solo entre los agregados
+        desde el instante `desde`.
+
+        Retorna:
+            list[tuple]: Pares (id_global, similitud coseno), de mayor a menor.
+        """
+        if not self._cantidad:
+            return []
+        n = self._cantidad
+        similitudes = self._vectores[:n] @ normalizar(vector).ravel()
+        similitudes[self._ids[:n] < 0] = -np.inf
+        if desde is not None:
+            similitudes[self._instantes[:n] < desde] = -np.inf
+        return _mejores(self._ids[:n], similitudes, k)
+
+    def olvidar_antes(self, instante):
+        """
+        Descarta los vectores agregados antes de `instante`.
+        """
+        viejos = self._instantes[:self._cantidad] < instante
+        self._ids[:self._cantidad][viejos] = -1
+        self._instantes[:self._cantidad][viejos] = -np.inf
+        return int(viejos.sum())
+
+    def estadisticas(self):
+        return {
+            "tipo": "bruto",
+            "vectores": int((self._ids[:self._cantidad] >= 0).sum()),
+            "memoria_mb": self._vectores.nbytes / 2**20 if self._vectores is not None else 0.0,
+        }
+
+class _Lista:
+    # Lista invertida de un centroide: arreglos que crecen al doble, en orden de llegada
+    def __init__(self, dim, capacidad=64):
+        self.vectores = np.empty((capacidad, dim), dtype=np.float32)
+        self.ids = np.empty(capacidad, dtype=np.int64)
+        self.instantes = np.empty(capacidad)
+        self.inicio = 0
+        self.fin = 0
+
+    def agregar(self, vectores, ids, instantes):
+        n = len(ids)
+        if self.fin + n > len(self.ids):
+            vivos = self.fin - self.inicio
+            capacidad = max(2 * (vivos + n), 64)
+            for nombre in ("vectores", "ids", "instantes"):
+                viejo = getattr(self, nombre)
+                nuevo = np.empty((capacidad,) + viejo.shape[1:], dtype=viejo.dtype)
+                nuevo[:vivos] = viejo[self.inicio:self.fin]
+                setattr(self, nombre, nuevo)
+            self.inicio, self.fin = 0, vivos
+        self.vectores[self.fin:self.fin + n] = vectores
+        self.ids[self.fin:self.fin + n] = ids
+        self.instantes[self.fin:self.fin + n] = instantes
+        self.fin += n
+
+    def desde(self, instante):
+        # Los instantes están ordenados: la ventana de tiempo es un sufijo
+        if instante is None:
+            return self.inicio
+        return self.inicio + int(np.searchsorted(self.instantes[self.inicio:self.fin], instante))
+
+class IndiceCuantizado:
+    def __init__(self, listas=256, sondeos=8, min_entrenamiento=None, iteraciones=10, semilla=0):
+        """
+        Índice de vectores cuantizado en grueso (IVF): los vectores se reparten
+        entre `listas` centroides (k-means esférico) y cada consulta revisa solo
+        las `sondeos` listas de centroides más cercanos. Aproximado; para sitios
+        grandes (cientos de miles a millones de vectores).
+
+        Hasta juntar `min_entrenamiento` vectores busca por fuerza bruta; ahí
+        entrena los centroides y reparte lo acumulado. Cada lista guarda sus
+        vectores en orden de llegada, así que la ventana de tiempo (`desde`) y
+        `olvidar_antes` son una búsqueda binaria por lista.
+
+        No es thread-safe (lo protege quien lo usa).
+
+        Parámetros:
+            listas (int): Cantidad de centroides.
+            sondeos (int): Listas revisadas por consulta (más = más preciso y más lento).
+            min_entrenamiento (int | None): Vectores para entrenar (por defecto 20 por lista).
+            iteraciones (int): Iteraciones de k-means.
+            semilla (int): Semilla de la inicialización de k-means.
+        """
+        self.n_listas = listas
+        self.sondeos = sondeos
+        self.min_entrenamiento = min_entrenamiento or 20 * listas
+        self.iteraciones = iteraciones
+        self._rng = np.random.default_rng(semilla)
+
+        self.centroides = None
+        self._listas = []
+        self._pendientes = []  # (vector, id, instante) hasta entrenar
+        self._ultimo = -np.inf
+
+    def __len__(self):
+        if self.centroides is None:
+            return len(self._pendientes)
+        return sum(lista.fin - lista.inicio for lista in self._listas)
+
+    def agregar(self, id_global, vector, instante):
+        self.agregar_lote([id_global], np.asarray(vector).reshape(1, -1), [instante])
+
+    def agregar_lote(self, ids, vectores, instantes):
+        vectores = normalizar(vectores).reshape(len(ids), -1)
+        # Instantes no decrecientes dentro de cada lista (varios hilos pueden llegar desordenados)
+        instantes = np.maximum.accumulate(np.maximum(np.asarray(instantes, dtype=np.float64), self._ultimo))
+        self._ultimo = instantes[-1]
+        ids = np.asarray(ids, dtype=np.int64)
+
+        if self.centroides is None:
+            faltan = self.min_entrenamiento - len(self._pendientes)
+            self._pendientes.extend(zip(vectores[:faltan], ids[:faltan], instantes[:faltan]))
+            if len(self._pendientes) < self.min_entrenamiento:
+                return
+            self._entrenar()
+            vectores, ids, instantes = vectores[faltan:], ids[faltan:], instantes[faltan:]
+        # Por bloques, para no armar la matriz vectores x centroides completa
+        for inicio in range(0, len(ids), 65536):
+            bloque = slice(inicio, inicio + 65536)
+            self._repartir(ids[bloque], vectores[bloque], instantes[bloque])
+
+    def buscar(self, vector, k=5, desde=None):
+        """
+        Retorna:
+            list[tuple]: Pares (id_global, similitud coseno), de mayor a menor.
+        """
+        vector = normalizar(vector).ravel()
+        if self.centroides is None:
+            if not self._pendientes:
+                return []
+            vectores, ids, instantes = (np.array(c) for c in zip(*self._pendientes))
+            similitudes = vectores @ vector
+            if desde is not None:
+                similitudes[instantes < desde] = -np.inf
+            return _mejores(ids, similitudes, k)
+
+        cercanos = np.argpartition(-(self.centroides @ vector), min(self.sondeos, self.n_listas) - 1)[:self.sondeos]
+        ids, similitudes = [], []
+        for indice_lista in cercanos:
+            lista = self._listas[indice_lista]
+            inicio = lista.desde(desde)
+            if inicio < lista.fin:
+                ids.append(lista.ids[inicio:lista.fin])
+                similitudes.append(lista.vectores[inicio:lista.fin] @ vector)
+        if not ids:
+            return []
+        return _mejores(np.concatenate(ids), np.concatenate(similitudes), k)
+
+    def olvidar_antes(self, instante):
+        """
+        Descarta los vectores agregados antes de `instante`.
+        """
+        if self.centroides is None:
+            cantidad = len(self._pendientes)
+            self._pendientes = [p for p in self._pendientes if p[2] >= instante]
+            return cantidad - len(self._pendientes)
+
+        olvidados = 0
+        for lista in self._listas:
+            nuevo_inicio = lista.desde(instante)
+            olvidados += nuevo_inicio - lista.inicio
+            lista.inicio = nuevo_inicio
+            if lista.inicio == lista.fin:
+                lista.inicio = lista.fin = 0
+        return olvidados
+
+    def estadisticas(self):
+        tamanos = [lista.fin - lista.inicio for lista in self._listas]
+        return {
+            "tipo": "cuantizado",
+            "entrenado": self.centroides is not None,
+            "vectores": len(self),
+            "listas": self.n_listas,
+            "sondeos": self.sondeos,
+            "lista_max": max(tamanos, default=0),
+            "memoria_mb": sum(lista.vectores.nbytes for lista in self._listas) / 2**20,
+        }
+
+    def _entrenar(self):
+        vectores, ids, instantes = (np.array(c) for c in zip(*self._pendientes))
+        self._pendientes = []
+
+        # k-means esférico: los vectores están normalizados, se asigna por coseno
+        muestra = vectores[self._rng.permutation(len(vectores))]
+        centroides = muestra[:self.n_listas]
+        for _ in range(self.iteraciones):
+            asignacion = (muestra @ centroides.T).argmax(axis=1)
+            sumas = np.zeros_like(centroides)
+            np.add.at(sumas, asignacion, muestra)
+            vacios = np.bincount(asignacion, minlength=self.n_listas) == 0
+            # Un centroide sin vectores se reinicia en un vector al azar
+            sumas[vacios] = muestra[self._rng.choice(len(muestra), int(vacios.sum()))]
+            centroides = normalizar(sumas)
+
+        self.centroides = centroides
+        self._listas = [_Lista(vectores.shape[1]) for _ in range(self.n_listas)]
+        self._repartir(ids, vectores, instantes)
+
+    def _repartir(self, ids, vectores, instantes):
+        asignacion = (vectores @ self.centroides.T).argmax(axis=1)
+        # Orden estable: dentro de cada lista se conserva el orden de llegada
+        orden = np.argsort(asignacion, kind="stable")
+        listas, cortes = np.unique(asignacion[orden], return_index=True)
+        for indice_lista, filas in zip(listas, np.split(orden, cortes[1:])):
+            self._listas[indice_lista].agregar(vectores[filas], ids[filas], instantes[filas])
@@ -0,0 +1,182 @@
+import cv2, time, heapq, itertools, numpy as np
+
+TAM_NITIDEZ = (32, 64)  # (ancho, alto) al que se reduce cada recorte para medir nitidez
+
+def puntuar_cajas(frame, cajas, margen_borde=4, nitidez_ref=100.0):
+    """
+    Calcula un puntaje de calidad para todas las cajas de un frame a la vez.
+
+    Combina nitidez (varianza del Laplaciano), tamaño, oclusión por otras cajas
+    y truncamiento contra el borde del frame. Todo salvo el reescalado de los
+    recortes se calcula vectorizado con NumPy.
+
+    Parámetros:
+        frame (np.array): Imagen BGR completa.
+        cajas (list | np.array): Cajas (x1, y1, x2, y2) en coordenadas del frame.
+        margen_borde (int): Píxeles al borde a partir de los cuales una caja se considera cortada.
+        nitidez_ref (float): Varianza del Laplaciano que se considera "nítida" (puntaje ~0.5).
+
+    Retorna:
+        np.array: Puntaje en [0, 1] por caja.
+    """
+    cajas = np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+    n = len(cajas)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    alto, ancho = frame.shape[:2]
+    x1, y1, x2, y2 = np.clip(cajas, 0, [ancho, alto, ancho, alto]).T
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+
+    # Tamaño: relativo a la caja más grande del frame
+    tam = np.sqrt(areas / max(areas.max(), 1.0))
+
+    # Oclusión: fracción máxima de cada caja cubierta por otra (intersección / área propia)
+    ix = np.maximum(0, np.minimum(x2[:, None], x2[None, :]) - np.maximum(x1[:, None], x1[None, :]))
+    iy = np.maximum(0, np.minimum(y2[:, None], y2[None, :]) - np.maximum(y1[:, None], y1[None, :]))
+    inter = ix * iy
+    np.fill_diagonal(inter, 0)
+    oclusion = (inter / np.maximum(areas[:, None], 1.0)).max(axis=1) if n > 1 else np.zeros(n, np.float32)
+
+    # Truncamiento: cantidad de lados que tocan el borde del frame
+    bordes = ((x1 <= margen_borde).astype(np.float32) + (y1 <= margen_borde)
+              + (x2 >= ancho - margen_borde) + (y2 >= alto - margen_borde))
+
+    # Nitidez: los recortes se llevan a un tamaño fijo y se procesan en bloque
+    gris = np.zeros((n, TAM_NITIDEZ[1], TAM_NITIDEZ[0]), dtype=np.float32)
+    vacias = np.zeros(n, dtype=bool)
+    for i, (a, b, c, d) in enumerate(np.round(np.stack([x1, y1, x2, y2], axis=1)).astype(int)):
+        recorte = frame[b:d, a:c]
+        if recorte.size == 0:
+            # Caja sobre el borde derecho/inferior (o degenerada): cv2 no acepta recortes vacíos
+            vacias[i] = True
+            continue
+        if recorte.ndim == 3:
+            recorte = cv2.cvtColor(recorte, cv2.COLOR_BGR2GRAY)
+        gris[i] = cv2.resize(recorte, TAM_NITIDEZ, interpolation=cv2.INTER_AREA)
+    laplaciano = (gris[:, 1:-1, :-2] + gris[:, 1:-1, 2:] + gris[:, :-2, 1:-1] + gris[:, 2:, 1:-1]
+                  - 4 * gris[:, 1:-1, 1:-1])
+    var = laplaciano.reshape(n, -1).var(axis=1)
+    nitidez = var / (var + nitidez_ref)
+
+    puntaje = nitidez * tam * (1.0 - np.clip(oclusion, 0, 1)) * (1.0 - 0.25 * bordes)
+    puntaje[vacias] = 0.0
+    return np.clip(puntaje, 0, 1).astype(np.float32)
+
+class SelectorMejorToma:
+    def __init__(self, funcion_guardar, k=3, intervalo_guardado=60.0, tiempo_perdido=3.0):
+        """
+        Conserva en memoria solo los K mejores recortes de cada track y los entrega
+        a `funcion_guardar` cuando el track termina o cada `intervalo_guardado`.
+        Así las escrituras a disco y a la base escalan con la cantidad de personas
+        y no con frames x personas.
+
+        Parámetros:
+            funcion_guardar (callable): Recibe (id_persona, [(puntaje, imagen), ...])
+                                        ordenados de mejor a peor.
+            k (int): Recortes a conservar por track.
+            intervalo_guardado (float | None): Segundos entre guardados de un track que
+                                               sigue activo. None = solo al terminar.
+            tiempo_perdido (float | None): Segundos sin ver un track para darlo por terminado.
+                                           None = lo decide quien llame a `cerrar_track`
+                                           (p. ej. el cierre de RegistroTracks).
+        """
+        self.funcion_guardar = funcion_guardar
+        self.k = k
+        self.intervalo_guardado = intervalo_guardado
+        self.tiempo_perdido = tiempo_perdido
+
+        self.tracks = {}  # id_persona -> {"tomas": heap, "ultimo_visto": t, "ultimo_guardado": t}
+        self._secuencia = itertools.count()
+
+        self.ofrecidas = 0
+        self.aceptadas = 0
+        self.guardadas = 0
+
+    def ofrecer(self, id_persona, frame, caja, puntaje, ahora=None):
+        """
+        Propone un recorte para el track. Solo se copia si entra en el top-K.
+
+        Retorna:
+            bool: True si el recorte quedó entre los K mejores.
+        """
+        ahora = ahora or time.time()
+        estado = self.tracks.get(id_persona)
+        if estado is None:
+            estado = self.tracks[id_persona] = {"tomas": [], "ultimo_visto": ahora, "ultimo_guardado": ahora}
+        estado["ultimo_visto"] = ahora
+        self.ofrecidas += 1
+
+        tomas = estado["tomas"]
+        if len(tomas) >= self.k and puntaje <= tomas[0][0]:
+            return False
+
+        x1, y1, x2, y2 = map(int, caja)
+        imagen = frame[max(y1, 0):y2, max(x1, 0):x2].copy()
+        if imagen.size == 0:
+            return False
+
+        entrada = (float(puntaje), next(self._secuencia), imagen)
+        if len(tomas) < self.k:
+            heapq.heappush(tomas, entrada)
+        else:
+            heapq.heapreplace(tomas, entrada)
+        self.aceptadas += 1
+        return True
+
+    def mejor(self, id_persona):
+        """
+        Retorna:
+            tuple | None: (puntaje, imagen) del mejor recorte en memoria del track.
+        """
+        estado = self.tracks.get(id_persona)
+        if not estado or not estado["tomas"]:
+            return None
+        puntaje, _, imagen = max(estado["tomas"])
+        return puntaje, imagen
+
+    def revisar(self, ahora=None):
+        """
+        Guarda los tracks terminados (no vistos en `tiempo_perdido`) y los que
+        cumplieron `intervalo_guardado`. Se llama una vez por frame procesado.
+        """
+        ahora = ahora or time.time()
+        for id_persona in list(self.tracks):
+            estado = self.tracks[id_persona]
+            if self.tiempo_perdido is not None and ahora - estado["ultimo_visto"] > self.tiempo_perdido:
+                self._guardar(id_persona, estado)
+                del self.tracks[id_persona]
+            elif self.intervalo_guardado and ahora - estado["ultimo_guardado"] >= self.intervalo_guardado:
+                self._guardar(id_persona, estado)
+                estado["tomas"] = []
+                estado["ultimo_guardado"] = ahora
+
+    def cerrar_track(self, id_persona):
+        """
+        Guarda y olvida un track de inmediato (por ejemplo, cuando el tracker lo da por perdido).
+        """
+        estado = self.tracks.pop(id_persona, None)
+        if estado is not None:
+            self._guardar(id_persona, estado)
+
+    def vaciar(self):
+        """
+        Guarda todos los tracks pendientes. Usar al cerrar la aplicación.
+        """
+        for id_persona in list(self.tracks):
+            self.cerrar_track(id_persona)
+
+    def estadisticas(self):
+        return {
+            "tracks_activos": len(self.tracks),
+            "ofrecidas": self.ofrecidas,
+            "aceptadas": self.aceptadas,
+            "guardadas": self.guardadas,
+        }
+
+    def _guardar(self, id_persona, estado):
+        if not estado["tomas"]:
+            return
+        tomas = [(puntaje, imagen) for puntaje, _, imagen in sorted(estado["tomas"], reverse=True)]
+        self.guardadas += len(tomas)
+        self.funcion_guardar(id_persona, tomas)
@@ -0,0 +1,353 @@
+import sys, math, time, bisect, threading, traceback
+from collections import Counter as _ContadorPilas
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread, Event
+from urllib.parse import urlparse, parse_qs
+
+# Cubetas por defecto (segundos): de 1 ms a 10 s
+# Muestrear más seguido que esto ocupa un núcleo entero recorriendo pilas
+INTERVALO_PERFIL_MIN = 0.001
+
+CUBETAS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _etiquetas_texto(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(f'{n}="{str(v)}"' for n, v in zip(nombres, valores))
+    return "{" + pares + "}"
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre, ayuda, etiquetas):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._hijos = {}
+        self._lock = Lock()
+
+    def con(self, **valores):
+        """
+        Serie con valores de etiquetas concretos, p. ej. `metrica.con(camara=1)`.
+        """
+        clave = tuple(str(valores[n]) for n in self.etiquetas)
+        hijo = self._hijos.get(clave)
+        if hijo is None:
+            with self._lock:
+                hijo = self._hijos.setdefault(clave, self._nuevo_hijo())
+        return hijo
+
+    def _series(self):
+        if not self.etiquetas:
+            return [((), self.con())]
+        with self._lock:
+            return list(self._hijos.items())
+
+class _ValorContador:
+    def __init__(self):
+        self.valor = 0.0
+        self._lock = Lock()
+
+    def incrementar(self, cantidad=1):
+        with self._lock:
+            self.valor += cantidad
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def _nuevo_hijo(self):
+        return _ValorContador()
+
+    def incrementar(self, cantidad=1):
+        self.con().incrementar(cantidad)
+
+    def exportar(self):
+        return [f"{self.nombre}{_etiquetas_texto(self.etiquetas, clave)} {hijo.valor}"
+                for clave, hijo in self._series()]
+
+class _ValorIndicador:
+    def __init__(self):
+        self.valor = 0.0
+
+    def fijar(self, valor):
+        self.valor = valor
+
+class Indicador(_Metrica):
+    tipo = "gauge"
+
+    def _nuevo_hijo(self):
+        return _ValorIndicador()
+
+    def fijar(self, valor):
+        self.con().fijar(valor)
+
+    def exportar(self):
+        return [f"{self.nombre}{_etiquetas_texto(self.etiquetas, clave)} {hijo.valor}"
+                for clave, hijo in self._series()]
+
+class _ValorHistograma:
+    def __init__(self, cubetas):
+        self.cubetas = cubetas
+        self.conteos = [0] * (len(cubetas) + 1)
+        self.suma = 0.0
+        self.cantidad = 0
+        self._lock = Lock()
+
+    def observar(self, valor):
+        indice = bisect.bisect_left(self.cubetas, valor)
+        with self._lock:
+            self.conteos[indice] += 1
+            self.suma += valor
+            self.cantidad += 1
+
+    @contextmanager
+    def cronometrar(self):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio)
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas, cubetas=CUBETAS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas))
+
+    def _nuevo_hijo(self):
+        return _ValorHistograma(self.cubetas)
+
+    def observar(self, valor):
+        self.con().observar(valor)
+
+    def cronometrar(self):
+        return self.con().cronometrar()
+
+    def exportar(self):
+        lineas = []
+        for clave, hijo in self._series():
+            with hijo._lock:
+                conteos, suma, cantidad = list(hijo.conteos), hijo.suma, hijo.cantidad
+            acumulado = 0
+            for limite, conteo in zip(self.cubetas + (float("inf"),), conteos):
+                acumulado += conteo
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                etiquetas = _etiquetas_texto(self.etiquetas + ("le",), clave + (le,))
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _etiquetas_texto(self.etiquetas, clave)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {suma}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {cantidad}")
+        return lineas
+
+class PerfiladorMuestreo:
+    def __init__(self):
+        """
+        Perfilador por muestreo: cada `intervalo` segundos toma la pila de todos los
+        hilos (sys._current_frames) y cuenta pilas repetidas. El costo es
+        proporcional a la frecuencia de muestreo, no al código perfilado, y se
+        puede prender y apagar con la aplicación corriendo.
+
+        La salida está en formato "folded" (una línea `f1;f2;f3 N` por pila),
+        compatible con flamegraph.pl y speedscope.
+        """
+        self._pilas = _ContadorPilas()
+        self._lock = Lock()
+        self._detener = Event()
+        self._hilo = None
+        self.intervalo = 0.01
+        self.muestras = 0
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self, intervalo=0.01):
+        if self.activo:
+            return
+        self.intervalo = max(INTERVALO_PERFIL_MIN, intervalo)
+        self._detener.clear()
+        self._hilo = Thread(target=self._muestrear, daemon=True, name="perfilador")
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo:
+            self._hilo.join()
+        self._hilo = None
+
+    def reiniciar(self):
+        with self._lock:
+            self._pilas.clear()
+            self.muestras = 0
+
+    def pilas_plegadas(self):
+        with self._lock:
+            return "\n".join(f"{pila} {n}" for pila, n in self._pilas.most_common())
+
+    def _muestrear(self):
+        propio = threading.get_ident()
+        nombres = {}
+        while not self._detener.wait(self.intervalo):
+            nombres.update({h.ident: h.name for h in threading.enumerate()})
+            muestra = []
+            for ident, marco in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = [f"{f.name} ({f.filename.rsplit('/', 1)[-1]}:{f.lineno})"
+                        for f in traceback.extract_stack(marco)]
+                muestra.append(";".join([nombres.get(ident, str(ident))] + pila))
+            with self._lock:
+                self._pilas.update(muestra)
+                self.muestras += 1
+
+class RegistroMetricas:
+    def __init__(self, prefijo="seguridad_"):
+        """
+        Registro de métricas de la aplicación en formato Prometheus.
+
+        Las métricas se crean una vez (por nombre) y se actualizan desde el código
+        instrumentado; los colectores son funciones que se llaman al exportar para
+        leer valores que ya existen en otro lado (colas, `estadisticas()`).
+        """
+        self.prefijo = prefijo
+        self._metricas = {}
+        self._colectores = []
+        self._lock = Lock()
+        self.perfilador = PerfiladorMuestreo()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas, **kwargs):
+        nombre = self.prefijo + nombre
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = clase(nombre, ayuda, etiquetas, **kwargs)
+            return metrica
+
+    def contador(self, nombre, ayuda="", etiquetas=()):
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def indicador(self, nombre, ayuda="", etiquetas=()):
+        return self._obtener(Indicador, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre, ayuda="", etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, cubetas=cubetas)
+
+    def registrar_colector(self, colector):
+        """
+        Agrega una función sin argumentos que, al exportar, devuelve una lista de
+        (nombre, valor, {etiqueta: valor}) a publicar como indicadores.
+        """
+        self._colectores.append(colector)
+
+    def registrar_estadisticas(self, nombre, funcion, etiquetas=None):
+        """
+        Publica como indicadores los valores numéricos de un método `estadisticas()`
+        existente (se aplanan los diccionarios anidados: {"pool": {"descartados": 3}}
+        se exporta como <nombre>_pool_descartados).
+        """
+        etiquetas = etiquetas or {}
+
+        def colector():
+            muestras = []
+
+            def aplanar(prefijo, valor):
+                if isinstance(valor, dict):
+                    for clave, sub in valor.items():
+                        aplanar(f"{prefijo}_{clave}", sub)
+                elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+                    muestras.append((prefijo, valor, etiquetas))
+                elif isinstance(valor, bool):
+                    muestras.append((prefijo, int(valor), etiquetas))
+
+            aplanar(nombre, funcion())
+            return muestras
+
+        self.registrar_colector(colector)
+
+    def exportar(self):
+        """
+        Retorna:
+            str: Todas las métricas en el formato de texto de Prometheus.
+        """
+        lineas = []
+        with self._lock:
+            metricas = list(self._metricas.values())
+        for metrica in metricas:
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.exportar())
+
+        vistos = set()
+        for colector in self._colectores:
+            try:
+                muestras = colector()
+            except Exception as e:
+                print(f"[ERROR] Colector de métricas: {e}")
+                continue
+            for nombre, valor, etiquetas in muestras:
+                nombre = self.prefijo + "".join(c if c.isalnum() else "_" for c in nombre)
+                if nombre not in vistos:
+                    vistos.add(nombre)
+                    lineas.append(f"# TYPE {nombre} gauge")
+                lineas.append(f"{nombre}{_etiquetas_texto(tuple(etiquetas), tuple(etiquetas.values()))} {valor}")
+        return "\n".join(lineas) + "\n"
+
+    def servir(self, puerto=9100, host="127.0.0.1"):
+        """
+        Expone /metrics (Prometheus) y el control del perfilador:
+            /perfil/iniciar?intervalo=0.01, /perfil/detener, /perfil (pilas plegadas).
+
+        Por defecto escucha solo en la interfaz local: no hay autenticación y
+        el perfilador se controla por GET. `host="0.0.0.0"` lo expone en todas.
+
+        Retorna:
+            ThreadingHTTPServer: El servidor, ya corriendo en un hilo propio.
+        """
+        registro_metricas = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                perfilador = registro_metricas.perfilador
+                if url.path == "/metrics":
+                    self._responder(registro_metricas.exportar(), "text/plain; version=0.0.4")
+                elif url.path == "/perfil/iniciar":
+                    try:
+                        intervalo = float(parse_qs(url.query).get("intervalo", [0.01])[0])
+                        if not math.isfinite(intervalo) or intervalo <= 0:
+                            raise ValueError(intervalo)
+                    except ValueError:
+                        self._responder("intervalo inválido: segundos entre muestras, p. ej. 0.01\n", codigo=400)
+                        return
+                    perfilador.reiniciar()
+                    perfilador.iniciar(intervalo)
+                    self._responder(f"perfilador activo cada {perfilador.intervalo} s\n")
+                elif url.path == "/perfil/detener":
+                    perfilador.detener()
+                    self._responder(f"perfilador detenido ({perfilador.muestras} muestras)\n")
+                elif url.path == "/perfil":
+                    self._responder(perfilador.pilas_plegadas() + "\n")
+                else:
+                    self.send_error(404)
+
+            def _responder(self, texto, tipo="text/plain; charset=utf-8", codigo=200):
+                datos = texto.encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, puerto), Manejador)
+        servidor.daemon_threads = True
+        Thread(target=servidor.serve_forever, daemon=True, name="servidor-metricas").start()
+        print(f"[INFO] Métricas en http://{host}:{servidor.server_address[1]}/metrics")
+        return servidor
+
+# Registro compartido por toda la aplicación
+metricas = RegistroMetricas()
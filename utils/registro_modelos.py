@@ -0,0 +1,127 @@
+import time
+from contextlib import contextmanager
+from threading import Lock, RLock, Thread
+
+try:
+    import psutil
+except ImportError:  # La medición de memoria es opcional
+    psutil = None
+
+def _memoria_mb():
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+class _EntradaModelo:
+    def __init__(self, nombre, cargador, thread_safe):
+        self.nombre = nombre
+        self.cargador = cargador
+        self.thread_safe = thread_safe
+        self.modelo = None
+        self.lock_carga = Lock()
+        self.lock_uso = RLock()
+        self.segundos_carga = None
+        self.memoria_mb = None
+        self.usos = 0
+
+class RegistroModelos:
+    def __init__(self):
+        """
+        Registro de modelos que se cargan recién en su primer uso y se comparten
+        entre hilos. Importar un módulo que registra modelos no los carga.
+        """
+        self._modelos = {}
+        self._lock = Lock()
+
+    def registrar(self, nombre, cargador, thread_safe=True):
+        """
+        Registra un modelo sin cargarlo.
+
+        Parámetros:
+            nombre (str): Clave única del modelo.
+            cargador (callable): Función sin argumentos que construye el modelo.
+            thread_safe (bool): Si es False, `usar` serializa los accesos con un lock.
+        """
+        with self._lock:
+            if nombre not in self._modelos:
+                self._modelos[nombre] = _EntradaModelo(nombre, cargador, thread_safe)
+
+    def registrado(self, nombre):
+        return nombre in self._modelos
+
+    def obtener(self, nombre):
+        """
+        Retorna el modelo, cargándolo si es la primera vez (una sola carga aunque
+        lo pidan varios hilos a la vez).
+        """
+        entrada = self._modelos[nombre]
+        if entrada.modelo is None:
+            with entrada.lock_carga:
+                if entrada.modelo is None:
+                    memoria_inicial = _memoria_mb()
+                    inicio = time.perf_counter()
+                    modelo = entrada.cargador()
+                    entrada.segundos_carga = time.perf_counter() - inicio
+                    if memoria_inicial is not None:
+                        # Aproximado: incluye lo que otros hilos reserven durante la carga
+                        entrada.memoria_mb = _memoria_mb() - memoria_inicial
+                    entrada.modelo = modelo
+                    print(f"[INFO] Modelo '{nombre}' cargado en {entrada.segundos_carga:.2f} s")
+        return entrada.modelo
+
+    @contextmanager
+    def usar(self, nombre):
+        """
+        Context manager que entrega el modelo; si no es thread-safe, mantiene
+        tomado su lock mientras se usa.
+        """
+        entrada = self._modelos[nombre]
+        modelo = self.obtener(nombre)
+        if entrada.thread_safe:
+            entrada.usos += 1
+            yield modelo
+        else:
+            with entrada.lock_uso:
+                entrada.usos += 1
+                yield modelo
+
+    def precargar(self, nombres=None, en_segundo_plano=True):
+        """
+        Carga los modelos indicados (o todos) por adelantado.
+
+        Retorna:
+            Thread | None: El hilo de precarga si `en_segundo_plano`.
+        """
+        nombres = list(nombres or self._modelos)
+
+        def cargar():
+            for nombre in nombres:
+                try:
+                    self.obtener(nombre)
+                except Exception as e:
+                    print(f"[ERROR] Precarga del modelo '{nombre}': {e}")
+
+        if not en_segundo_plano:
+            cargar()
+            return None
+        hilo = Thread(target=cargar, daemon=True, name="precarga-modelos")
+        hilo.start()
+        return hilo
+
+    def estadisticas(self):
+        """
+        Retorna:
+            dict: Por modelo: si está cargado, tiempo de carga, memoria (MB) y usos.
+        """
+        return {
+            nombre: {
+                "cargado": entrada.modelo is not None,
+                "segundos_carga": entrada.segundos_carga,
+                "memoria_mb": entrada.memoria_mb,
+                "usos": entrada.usos,
+            }
+            for nombre, entrada in self._modelos.items()
+        }
+
+# Registro compartido por toda la aplicación
+registro = RegistroModelos()
@@ -0,0 +1,219 @@
+import cv2, os, glob, time, numpy as np
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Event, Condition
+
+# Resultado estructurado de un frame: lo que produce la detección, sin dibujar nada.
+# `discontinuidad`: segundos sin frames antes de este (corte del stream), 0.0 si no hubo
+DeteccionFrame = namedtuple("DeteccionFrame", "instante cajas ids clases nombres dentro_zonas caras discontinuidad",
+                            defaults=(0.0,))
+
+def deteccion_vacia(instante=None, num_zonas=0, discontinuidad=0.0):
+    return DeteccionFrame(instante or time.time(), [], [], [], {}, np.zeros((0, num_zonas), bool), {}, discontinuidad)
+
+def dibujar(imagen, deteccion=None, zonas=()):
+    """
+    Dibuja zonas, personas y caras sobre una copia de `imagen`.
+
+    Parámetros:
+        imagen (np.array): Frame BGR (puede ser de solo lectura).
+        deteccion (DeteccionFrame | None): Resultado a dibujar.
+        zonas (list[Zona]): Zonas de la cámara.
+
+    Retorna:
+        np.array: Frame anotado.
+    """
+    lienzo = imagen.copy()
+    for zona in zonas:
+        cv2.polylines(lienzo, [zona.poligono.astype(np.int32)], True, (0, 255, 0), 2)
+    if deteccion is None:
+        return lienzo
+
+    for caja, clase, id_persona in zip(deteccion.cajas, deteccion.clases, deteccion.ids):
+        x1, y1, x2, y2 = map(int, caja)
+        cv2.rectangle(lienzo, (x1, y1), (x2, y2), (255, 0, 0), 2)
+        cv2.putText(lienzo, f"{deteccion.nombres.get(clase, clase)} ID:{id_persona}", (x1, y1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 0, 0), 2)
+
+    for id_persona, (cx1, cy1, cx2, cy2) in deteccion.caras.items():
+        cv2.rectangle(lienzo, (cx1, cy1), (cx2, cy2), (0, 255, 0), 2)
+        cv2.putText(lienzo, f"Cara ID:{id_persona}", (cx1, cy1 - 10),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+    if deteccion.discontinuidad:
+        cv2.putText(lienzo, f"Corte del stream: {deteccion.discontinuidad:.1f} s", (10, 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    return lienzo
+
+def componer_camara(camara):
+    """
+    Último frame capturado de una cámara con la última detección dibujada encima.
+    La detección puede ser de unos frames atrás; a cambio no se copia nada en el
+    camino de la inferencia.
+
+    Retorna:
+        np.array | None
+    """
+    ultimo = camara.pool.ver_ultimo() if camara.pool else None
+    if ultimo is None:
+        return None
+    _, publicado = camara.resultado.obtener()
+    deteccion = publicado[1] if publicado is not None else None
+    with ultimo:
+        return dibujar(ultimo.imagen, deteccion, camara.detector.zonas.zonas)
+
+class Renderizador:
+    def __init__(self, camaras, fps=5.0, puerto_mjpeg=None, carpeta_grabacion=None,
+                 segundos_segmento=300, max_segmentos=12, calidad_jpeg=80, host_mjpeg="127.0.0.1"):
+        """
+        Etapa de visualización separada de la detección, para correr sin pantalla.
+        Un solo hilo compone los frames anotados a `fps` (independiente de la tasa de
+        inferencia) y solo para las cámaras que alguien está mirando o grabando.
+
+        Parámetros:
+            camaras (dict): id_camara -> Camara (las del SupervisorCamaras).
+            fps (float): Frames por segundo de la salida.
+            puerto_mjpeg (int | None): Si se indica, sirve http://<host>:<puerto>/camara/<id>
+                                       como MJPEG; sin clientes conectados no se dibuja nada.
+            host_mjpeg (str): Interfaz donde escucha el MJPEG. Por defecto solo local: el
+                              video en vivo se sirve sin autenticación ("0.0.0.0" lo
+                              expone en todas las interfaces).
+            carpeta_grabacion (str | None): Si se indica, graba por cámara en segmentos de
+                                            `segundos_segmento` y conserva los últimos `max_segmentos`.
+        """
+        self.camaras = camaras
+        self.intervalo = 1.0 / fps
+        self.fps = fps
+        self.calidad_jpeg = calidad_jpeg
+        self.carpeta_grabacion = carpeta_grabacion
+        self.segundos_segmento = segundos_segmento
+        self.max_segmentos = max_segmentos
+
+        self._clientes = {str(id_camara): 0 for id_camara in camaras}
+        self._jpeg = {}  # id_camara (str) -> (version, bytes)
+        self._cond = Condition()
+        self._grabadores = {}  # id_camara -> (VideoWriter, inicio_segmento)
+        self._detenido = Event()
+
+        self._servidor = self._crear_servidor(host_mjpeg, puerto_mjpeg) if puerto_mjpeg else None
+        self._hilo = Thread(target=self._renderizar, daemon=True, name="renderizador")
+
+        self.frames_renderizados = 0
+
+    def iniciar(self):
+        if self._servidor:
+            Thread(target=self._servidor.serve_forever, daemon=True, name="servidor-mjpeg").start()
+            host, puerto = self._servidor.server_address[:2]
+            print(f"[INFO] MJPEG en http://{host}:{puerto}/camara/<id>")
+        self._hilo.start()
+
+    def detener(self):
+        self._detenido.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._hilo.join()
+        if self._servidor:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+        for grabador, _ in self._grabadores.values():
+            grabador.release()
+        self._grabadores.clear()
+
+    def _renderizar(self):
+        siguiente = time.monotonic()
+        while not self._detenido.is_set():
+            for id_camara, camara in self.camaras.items():
+                clave = str(id_camara)
+                with self._cond:
+                    mirando = self._clientes.get(clave, 0) > 0
+                if not mirando and not self.carpeta_grabacion:
+                    continue
+
+                anotado = componer_camara(camara)
+                if anotado is None:
+                    continue
+                self.frames_renderizados += 1
+
+                if mirando:
+                    ok, jpeg = cv2.imencode(".jpg", anotado, [cv2.IMWRITE_JPEG_QUALITY, self.calidad_jpeg])
+                    if ok:
+                        with self._cond:
+                            version = self._jpeg.get(clave, (0, None))[0] + 1
+                            self._jpeg[clave] = (version, jpeg.tobytes())
+                            self._cond.notify_all()
+                if self.carpeta_grabacion:
+                    self._grabar(clave, anotado)
+
+            siguiente += self.intervalo
+            espera = siguiente - time.monotonic()
+            if espera > 0:
+                self._detenido.wait(espera)
+            else:
+                siguiente = time.monotonic()  # Atrasado: no se intenta recuperar frames
+
+    def _grabar(self, id_camara, imagen):
+        ahora = time.time()
+        grabador, inicio = self._grabadores.get(id_camara, (None, 0))
+        if grabador is None or ahora - inicio >= self.segundos_segmento:
+            if grabador is not None:
+                grabador.release()
+            carpeta = os.path.join(self.carpeta_grabacion, f"camara_{id_camara}")
+            os.makedirs(carpeta, exist_ok=True)
+            ruta = os.path.join(carpeta, time.strftime("%Y%m%d_%H%M%S") + ".mp4")
+            alto, ancho = imagen.shape[:2]
+            grabador = cv2.VideoWriter(ruta, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (ancho, alto))
+            self._grabadores[id_camara] = (grabador, ahora)
+            self._rotar(carpeta)
+        grabador.write(imagen)
+
+    def _rotar(self, carpeta):
+        segmentos = sorted(glob.glob(os.path.join(carpeta, "*.mp4")))
+        for ruta in segmentos[:-self.max_segmentos]:
+            try:
+                os.remove(ruta)
+            except OSError as e:
+                print(f"[ERROR] No se pudo borrar el segmento {ruta}: {e}")
+
+    def _crear_servidor(self, host, puerto):
+        renderizador = self
+
+        class ManejadorMJPEG(BaseHTTPRequestHandler):
+            def do_GET(self):
+                partes = self.path.strip("/").split("/")
+                if len(partes) != 2 or partes[0] != "camara" or partes[1] not in renderizador._clientes:
+                    self.send_error(404)
+                    return
+                renderizador._transmitir(self, partes[1])
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, puerto), ManejadorMJPEG)
+        servidor.daemon_threads = True
+        return servidor
+
+    def _transmitir(self, manejador, id_camara):
+        manejador.send_response(200)
+        manejador.send_header("Content-Type", "multipart/x-mixed-replace; boundary=frame")
+        manejador.send_header("Cache-Control", "no-cache")
+        manejador.end_headers()
+
+        with self._cond:
+            self._clientes[id_camara] += 1
+        try:
+            version = 0
+            while not self._detenido.is_set():
+                with self._cond:
+                    self._cond.wait_for(lambda: self._detenido.is_set() or
+                                        self._jpeg.get(id_camara, (0, None))[0] != version, timeout=1.0)
+                    version, jpeg = self._jpeg.get(id_camara, (0, None))
+                if jpeg is None:
+                    continue
+                manejador.wfile.write(b"--frame\r\nContent-Type: image/jpeg\r\n")
+                manejador.wfile.write(f"Content-Length: {len(jpeg)}\r\n\r\n".encode())
+                manejador.wfile.write(jpeg + b"\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            with self._cond:
+                self._clientes[id_camara] -= 1
@@ -0,0 +1,166 @@
+import cv2, time
+from collections import deque
+from threading import Lock
+
+class DetectorMovimiento:
+    def __init__(self, ancho=160, umbral_pixel=25, fraccion_min=0.002, alpha=0.05):
+        """
+        Detector de movimiento barato: compara una versión reducida y en grises del
+        frame contra un fondo que se actualiza lentamente (media móvil).
+
+        Parámetros:
+            ancho (int): Ancho de la imagen reducida (se mantiene la proporción).
+            umbral_pixel (int): Diferencia de intensidad a partir de la cual un píxel cambió.
+            fraccion_min (float): Fracción de píxeles cambiados que cuenta como movimiento.
+            alpha (float): Velocidad de adaptación del fondo (cambios de luz, sombras).
+        """
+        self.ancho = ancho
+        self.umbral_pixel = umbral_pixel
+        self.fraccion_min = fraccion_min
+        self.alpha = alpha
+        self._fondo = None
+        self.ultima_fraccion = 0.0
+
+    def hay_movimiento(self, frame):
+        # Submuestreo por saltos antes de promediar: no se lee el frame completo
+        paso = max(1, frame.shape[1] // (2 * self.ancho))
+        frame = frame[::paso, ::paso]
+        alto = max(1, round(frame.shape[0] * self.ancho / frame.shape[1]))
+        chico = cv2.resize(frame, (self.ancho, alto), interpolation=cv2.INTER_AREA)
+        gris = cv2.GaussianBlur(cv2.cvtColor(chico, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._fondo is None or self._fondo.shape != gris.shape:
+            self._fondo = gris.astype("float32")
+            return True
+
+        diferencia = cv2.absdiff(gris, cv2.convertScaleAbs(self._fondo))
+        _, cambiados = cv2.threshold(diferencia, self.umbral_pixel, 255, cv2.THRESH_BINARY)
+        self.ultima_fraccion = cv2.countNonZero(cambiados) / diferencia.size
+        cv2.accumulateWeighted(gris, self._fondo, self.alpha)
+        return self.ultima_fraccion >= self.fraccion_min
+
+class ControladorTasa:
+    def __init__(self, fps_min=0.5, fps_max=10.0, capacidad=1.0, retencion=2.0,
+                 detector_movimiento=None, ventana_metricas=10.0):
+        """
+        Decide, frame a frame, si un frame capturado se envía a detección. Reemplaza
+        al "uno de cada N frames" fijo.
+
+        - Con tracks activos (o hasta `retencion` segundos después) o con movimiento
+          en la escena se detecta a `fps_max`.
+        - En una escena quieta no se corre YOLO, salvo un latido a `fps_min` para
+          que el tracker y las alertas no se queden sin datos (`fps_min=0`: sin
+          latido, solo el movimiento despierta la detección).
+        - Si la latencia medida de la inferencia sube, la tasa baja: nunca se piden
+          más de `capacidad / latencia` frames por segundo.
+
+        Parámetros:
+            fps_min (float): Tasa mínima de detección (escena quieta); 0 = nunca.
+            fps_max (float): Tasa máxima de detección.
+            capacidad (float): Fracción de un trabajador de inferencia que le toca a
+                               esta cámara (trabajadores / cámaras).
+            retencion (float): Segundos que se sigue a tasa máxima después del último track.
+            detector_movimiento (DetectorMovimiento | None): Compuerta de movimiento.
+            ventana_metricas (float): Segundos sobre los que se calcula la tasa efectiva.
+        """
+        if fps_min < 0 or fps_max <= 0 or fps_min > fps_max:
+            raise ValueError(f"Tasas de detección inválidas: fps_min={fps_min}, fps_max={fps_max} "
+                             f"(usar 0 <= fps_min <= fps_max, fps_max > 0)")
+        self.fps_min = fps_min
+        self.fps_max = fps_max
+        self.capacidad = capacidad
+        self.retencion = retencion
+        self.movimiento = detector_movimiento or DetectorMovimiento()
+        self.ventana_metricas = ventana_metricas
+
+        self.latencia = None  # media móvil exponencial, en segundos
+        self._ultimo_envio = float("-inf")
+        self._ultimo_chequeo = float("-inf")
+        self._ultimo_track = float("-inf")
+        self._envios = deque()  # Lo escribe el hilo de captura y lo lee estadisticas()
+        self._lock = Lock()
+
+        self.frames = 0
+        self.enviados = 0
+        self.saltados_tasa = 0
+        self.saltados_quietud = 0
+
+    def fps_objetivo(self):
+        """
+        Tasa máxima permitida ahora mismo, acotada por la latencia medida.
+        """
+        fps = self.fps_max
+        if self.latencia:
+            fps = min(fps, self.capacidad / self.latencia)
+        return max(self.fps_min, fps)
+
+    def decidir(self, frame, ahora=None):
+        """
+        Parámetros:
+            frame (np.array): Frame recién capturado (solo se lee).
+            ahora (float | None): time.monotonic() del frame.
+
+        Retorna:
+            bool: True si el frame debe ir a detección.
+        """
+        ahora = ahora or time.monotonic()
+        self.frames += 1
+
+        # Compuerta de tasa: antes de mirar el frame, que es lo más barato
+        if ahora - self._ultimo_envio < 1.0 / self.fps_objetivo():
+            self.saltados_tasa += 1
+            return False
+
+        activo = ahora - self._ultimo_track <= self.retencion
+        latido = self.fps_min > 0 and ahora - self._ultimo_envio >= 1.0 / self.fps_min
+        if not activo and not latido:
+            # El movimiento se evalúa como mucho a fps_max
+            if ahora - self._ultimo_chequeo < 1.0 / self.fps_max:
+                self.saltados_quietud += 1
+                return False
+            self._ultimo_chequeo = ahora
+            if not self.movimiento.hay_movimiento(frame):
+                self.saltados_quietud += 1
+                return False
+
+        self._ultimo_envio = ahora
+        self.enviados += 1
+        with self._lock:
+            self._envios.append(ahora)
+            self._recortar_envios(ahora)
+        return True
+
+    def registrar(self, num_tracks, latencia, ahora=None):
+        """
+        Informa el resultado de una detección: cuántos tracks había y cuánto tardó.
+        """
+        ahora = ahora or time.monotonic()
+        if num_tracks:
+            self._ultimo_track = ahora
+        self.latencia = latencia if self.latencia is None else 0.8 * self.latencia + 0.2 * latencia
+
+    def _recortar_envios(self, ahora):
+        # Con self._lock tomado
+        while self._envios and ahora - self._envios[0] > self.ventana_metricas:
+            self._envios.popleft()
+
+    def estadisticas(self, ahora=None):
+        """
+        Retorna:
+            dict: Tasa efectiva (detecciones por segundo en la última ventana), tasa
+                  objetivo, proporción de frames salteados y latencia media.
+        """
+        ahora = ahora or time.monotonic()
+        with self._lock:
+            self._recortar_envios(ahora)
+            envios = len(self._envios)
+        frames = self.frames or 1
+        return {
+            "fps_efectivo": envios / self.ventana_metricas,
+            "fps_objetivo": self.fps_objetivo(),
+            "proporcion_salteados": (self.saltados_tasa + self.saltados_quietud) / frames,
+            "saltados_tasa": self.saltados_tasa,
+            "saltados_quietud": self.saltados_quietud,
+            "enviados": self.enviados,
+            "latencia_ms": 1000 * self.latencia if self.latencia else None,
+        }
@@ -0,0 +1,220 @@
+import json, numpy as np
+
+# Área que antes estaba fija en main.py y en procesar_frame
+ZONA_POR_DEFECTO = {"nombre": "area", "poligono": [[860, 550], [1640, 550], [1640, 1000], [860, 1000]]}
+
+class Zona:
+    def __init__(self, nombre, poligono, permanencia_min=None):
+        """
+        Zona de interés de una cámara.
+
+        Parámetros:
+            nombre (str): Identificador (p. ej. 'surtidor_1', 'puerta_tienda', 'caja').
+            poligono (list): Vértices [[x, y], ...] en coordenadas del frame.
+            permanencia_min (float | None): Segundos dentro de la zona a partir de los
+                                            cuales se emite un evento de permanencia.
+        """
+        self.nombre = nombre
+        self.poligono = np.asarray(poligono, dtype=np.float32).reshape(-1, 2)
+        self.permanencia_min = permanencia_min
+
+class MotorZonas:
+    def __init__(self, zonas, ancla="centro", forma_frame=None):
+        """
+        Evalúa en una sola operación NumPy qué puntos de anclaje de las cajas caen
+        dentro de qué zonas, y mantiene por track la pertenencia para emitir
+        eventos de entrada, salida y permanencia por zona.
+
+        Parámetros:
+            zonas (list[Zona]): Zonas de la cámara.
+            ancla (str): 'centro' (centro de la caja) o 'pie' (centro del borde inferior).
+            forma_frame (tuple | None): (alto, ancho). Si se indica y hay 64 zonas o
+                                        menos, se precalcula un mapa de bits por píxel
+                                        y la consulta pasa a ser una lectura indexada.
+        """
+        self.zonas = list(zonas)
+        self.nombres = [z.nombre for z in self.zonas]
+        self.ancla = ancla
+        self._precalcular_aristas()
+
+        self.mascara = None
+        if forma_frame is not None and 0 < len(self.zonas) <= 64:
+            self._precalcular_mascara(forma_frame)
+
+        self._permanencia = np.array(
+            [z.permanencia_min if z.permanencia_min is not None else np.inf for z in self.zonas], dtype=np.float64)
+
+        # Estado por track en matrices (fila por track) para actualizar todo el frame a la vez
+        self._filas = {}    # id_persona -> fila
+        self._libres = []
+        self._dentro = np.zeros((0, len(self.zonas)), bool)
+        self._entrada = np.zeros((0, len(self.zonas)), np.float64)  # nan si está fuera
+        self._avisado = np.zeros((0, len(self.zonas)), bool)        # permanencia ya notificada
+
+    def _precalcular_aristas(self):
+        """
+        Tabla de aristas de todas las zonas rellenada al máximo de vértices:
+        (Z, E) para x1, y1, x2, y2 y una máscara de aristas válidas.
+        """
+        z = len(self.zonas)
+        e = max((len(zona.poligono) for zona in self.zonas), default=0)
+        self._ax1 = np.zeros((z, e), np.float32)
+        self._ay1 = np.zeros((z, e), np.float32)
+        self._ax2 = np.zeros((z, e), np.float32)
+        self._ay2 = np.zeros((z, e), np.float32)
+        self._valida = np.zeros((z, e), bool)
+        for i, zona in enumerate(self.zonas):
+            p = zona.poligono
+            q = np.roll(p, -1, axis=0)
+            n = len(p)
+            self._ax1[i, :n], self._ay1[i, :n] = p[:, 0], p[:, 1]
+            self._ax2[i, :n], self._ay2[i, :n] = q[:, 0], q[:, 1]
+            self._valida[i, :n] = True
+
+        # Pendiente inversa precalculada; aristas horizontales nunca cruzan el rayo
+        dy = self._ay2 - self._ay1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._pendiente_inv = np.where(dy != 0, (self._ax2 - self._ax1) / dy, 0).astype(np.float32)
+
+    def _precalcular_mascara(self, forma_frame):
+        import cv2
+        alto, ancho = forma_frame
+        self.mascara = np.zeros((alto, ancho), dtype=np.uint64)
+        for i, zona in enumerate(self.zonas):
+            capa = np.zeros((alto, ancho), dtype=np.uint8)
+            cv2.fillPoly(capa, [np.round(zona.poligono).astype(np.int32)], 1)
+            self.mascara[capa.astype(bool)] |= np.uint64(1) << np.uint64(i)
+
+    def anclas(self, cajas):
+        cajas = np.asarray(cajas, dtype=np.float32).reshape(-1, 4)
+        x = (cajas[:, 0] + cajas[:, 2]) / 2
+        y = cajas[:, 3] if self.ancla == "pie" else (cajas[:, 1] + cajas[:, 3]) / 2
+        return np.stack([x, y], axis=1)
+
+    def contener(self, puntos):
+        """
+        Prueba todos los puntos contra todas las zonas a la vez.
+
+        Parámetros:
+            puntos (np.array): (N, 2) puntos (x, y).
+
+        Retorna:
+            np.array: Matriz booleana (N, Z); [i, j] indica si el punto i está en la zona j.
+        """
+        puntos = np.asarray(puntos, dtype=np.float32).reshape(-1, 2)
+        if self.mascara is not None:
+            alto, ancho = self.mascara.shape
+            xs = np.clip(puntos[:, 0].astype(np.int64), 0, ancho - 1)
+            ys = np.clip(puntos[:, 1].astype(np.int64), 0, alto - 1)
+            bits = self.mascara[ys, xs]
+            fuera = (puntos[:, 0] < 0) | (puntos[:, 0] >= ancho) | (puntos[:, 1] < 0) | (puntos[:, 1] >= alto)
+            bits[fuera] = 0
+            desplazamientos = np.arange(len(self.zonas), dtype=np.uint64)
+            return ((bits[:, None] >> desplazamientos[None, :]) & np.uint64(1)).astype(bool)
+
+        # Regla par-impar (ray casting) vectorizada sobre (N, Z, E)
+        px = puntos[:, 0, None, None]
+        py = puntos[:, 1, None, None]
+        cruza_y = (self._ay1 > py) != (self._ay2 > py)
+        x_cruce = self._ax1 + (py - self._ay1) * self._pendiente_inv
+        cruces = cruza_y & (px < x_cruce) & self._valida
+        return (cruces.sum(axis=2) % 2).astype(bool)
+
+    def actualizar(self, ids, cajas, ahora):
+        """
+        Actualiza la pertenencia de los tracks del frame y genera eventos por zona.
+
+        Parámetros:
+            ids (list): ID de track por caja (se ignoran los -1).
+            cajas (list): Cajas (x1, y1, x2, y2).
+            ahora (float): Timestamp del frame.
+
+        Los tracks terminados deben liberarse con `olvidar` (ver RegistroTracks).
+
+        Retorna:
+            tuple: (dentro, eventos). `dentro` es la matriz (N, Z) de pertenencia;
+                   `eventos` es una lista de dicts {"tipo": 'entrada'|'salida'|'permanencia',
+                   "id": id_persona, "zona": nombre, "segundos": float}.
+        """
+        dentro = self.contener(self.anclas(cajas)) if len(cajas) else np.zeros((0, len(self.zonas)), bool)
+        validos = np.array([id_persona != -1 for id_persona in ids], dtype=bool)
+        ids_validos = [id_persona for id_persona in ids if id_persona != -1]
+        if not ids_validos:
+            return dentro, []
+
+        filas = np.array([self._fila(id_persona) for id_persona in ids_validos], dtype=np.int64)
+        actual = dentro[validos]
+        anterior = self._dentro[filas]
+        entrada_anterior = self._entrada[filas]
+
+        entra = actual & ~anterior
+        sale = ~actual & anterior
+        entrada = np.where(entra, ahora, np.where(sale, np.nan, entrada_anterior))
+        avisado = self._avisado[filas] & ~entra
+        with np.errstate(invalid="ignore"):
+            avisa = actual & ~avisado & ((ahora - entrada) >= self._permanencia)
+
+        self._dentro[filas] = actual
+        self._entrada[filas] = entrada
+        self._avisado[filas] = avisado | avisa
+
+        # Solo se recorren las celdas con cambios
+        eventos = []
+        for i, j in np.argwhere(entra):
+            eventos.append({"tipo": "entrada", "id": ids_validos[i], "zona": self.nombres[j], "segundos": 0.0})
+        for i, j in np.argwhere(sale):
+            eventos.append({"tipo": "salida", "id": ids_validos[i], "zona": self.nombres[j],
+                            "segundos": float(ahora - entrada_anterior[i, j])})
+        for i, j in np.argwhere(avisa):
+            eventos.append({"tipo": "permanencia", "id": ids_validos[i], "zona": self.nombres[j],
+                            "segundos": float(ahora - entrada[i, j])})
+        return dentro, eventos
+
+    def _fila(self, id_persona):
+        fila = self._filas.get(id_persona)
+        if fila is not None:
+            return fila
+
+        if not self._libres:
+            capacidad = len(self._dentro)
+            nueva = max(64, 2 * capacidad)
+            z = len(self.zonas)
+            self._dentro = np.vstack([self._dentro, np.zeros((nueva - capacidad, z), bool)])
+            self._entrada = np.vstack([self._entrada, np.full((nueva - capacidad, z), np.nan)])
+            self._avisado = np.vstack([self._avisado, np.zeros((nueva - capacidad, z), bool)])
+            self._libres = list(range(nueva - 1, capacidad - 1, -1))
+
+        fila = self._libres.pop()
+        self._dentro[fila] = False
+        self._entrada[fila] = np.nan
+        self._avisado[fila] = False
+        self._filas[id_persona] = fila
+        return fila
+
+    def olvidar(self, id_persona):
+        """
+        Elimina el estado de un track terminado.
+        """
+        fila = self._filas.pop(id_persona, None)
+        if fila is not None:
+            self._libres.append(fila)
+
+def cargar_zonas(ruta_config, id_camara=None):
+    """
+    Lee las zonas desde un JSON. Formatos aceptados:
+        [{"nombre": ..., "poligono": [[x, y], ...], "permanencia_min": 10}, ...]
+        {"<id_camara>": [zonas...], "*": [zonas por defecto...]}
+    Sin archivo, se usa el área rectangular histórica.
+
+    Retorna:
+        list[Zona]
+    """
+    if not ruta_config:
+        configs = [ZONA_POR_DEFECTO]
+    else:
+        with open(ruta_config, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+        if isinstance(configs, dict):
+            configs = configs.get(str(id_camara), configs.get("*", [ZONA_POR_DEFECTO]))
+
+    return [Zona(c["nombre"], c["poligono"], c.get("permanencia_min")) for c in configs]